@@ -0,0 +1,276 @@
+"""
+Asyncio front-end for chain generation.
+
+Chain generation is CPU-bound and can take milliseconds to seconds for
+large scalars, which would stall an event loop if called inline. A
+ChainService runs it in a bounded executor instead:
+
+- concurrent requests for the same (n, strategy) are coalesced into one
+  in-flight computation whose result every caller receives
+- at most ``max_pending`` distinct computations are queued or running;
+  further callers wait for a slot, which propagates backpressure to them
+- with threads (the default) all requests share the process's subchain
+  cache; with ``processes=True`` each worker process keeps its own warm
+  cache, like batch.chains_batch
+
+:func:`serve` exposes a service over a local TCP or Unix socket with a
+JSON-lines protocol, so other services can share one warm cache (see
+``cli.py serve``). Each request line is an object such as
+``{"id": 1, "n": 87, "strategy": "alpha"}`` (n may be a decimal string);
+the response line echoes the id and carries ``chain`` and ``length``, or
+``error``. ``{"op": "stats"}`` returns the service counters. A connection
+with ``max_pending`` unanswered requests is not read from until one is
+answered.
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import batch
+import contfrac as cf
+import diskcache as dc
+import table as tb
+
+
+class ChainService:
+    """
+    Coalescing, bounded asynchronous chain generator.
+
+    Args:
+        workers (int): Executor size (None = os.cpu_count())
+        processes (bool): Use worker processes instead of threads
+        max_pending (int): Most distinct computations queued or running
+        cache_size (int): Subchain cache bound in each worker process
+        table (str): Chain table file for contfrac leaves
+        disk_cache (str): diskcache database shared with other processes
+
+    Raises:
+        ValueError: If workers or max_pending is less than 1
+    """
+
+    def __init__(self, workers=1, processes=False, max_pending=256,
+                 cache_size=4096, table=None, disk_cache=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1 or max_pending < 1:
+            raise ValueError("workers and max_pending must be at least 1")
+        self.max_pending = max_pending
+        self.requests = 0
+        self.coalesced = 0
+        self.computed = 0
+        self._inflight = {}
+        self._slots = None
+        self._loop = None
+        self._table = None
+        self._disk_cache = None
+        self._processes = processes
+
+        if processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=batch._init_worker,
+                initargs=(cache_size, table, disk_cache))
+        else:
+            # Threads share this process's caches, so open them here
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            if table is not None:
+                self._table = tb.load(table)
+            if disk_cache is not None:
+                # Kept per service rather than in batch's module global, so
+                # services in one process do not share or close each
+                # other's connection
+                self._disk_cache = dc.DiskCache(disk_cache)
+
+    async def chain(self, n, strategy=None):
+        """
+        Generate a chain without blocking the event loop.
+
+        Args:
+            n (int): Target integer
+            strategy: Chain strategy, see batch.generate
+
+        Returns:
+            list: Chain for n (a fresh list for every caller)
+
+        Raises:
+            ValueError: If the strategy is unknown
+        """
+        batch._check_strategy(strategy)
+        self.requests += 1
+        key = (n, strategy)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._compute(n, strategy))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        else:
+            self.coalesced += 1
+        # Shield so that one cancelled caller does not cancel the others
+        return list(await asyncio.shield(future))
+
+    def _finished(self, key, future):
+        del self._inflight[key]
+        if not future.cancelled():
+            # Mark errors as retrieved even if every caller went away
+            future.exception()
+
+    async def _compute(self, n, strategy):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Semaphores belong to the loop they were first used on
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            if self._processes:
+                # Worker processes use the disk cache their initializer opened
+                call = (batch._generate, n, strategy)
+            else:
+                call = (batch._generate_cached, self._disk_cache, n, strategy)
+            result = await loop.run_in_executor(self._executor, *call)
+        self.computed += 1
+        return result
+
+    def stats(self):
+        """
+        Return request counters.
+
+        Returns:
+            dict: requests, coalesced (served by another request's
+                  computation), computed, in_flight and max_pending
+        """
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'computed': self.computed,
+            'in_flight': len(self._inflight),
+            'max_pending': self.max_pending,
+        }
+
+    def close(self):
+        """Shut down the executor and release the table and disk cache."""
+        self._executor.shutdown(wait=True)
+        if self._table is not None:
+            if cf._table is self._table:
+                cf.set_leaf_table(None)
+            self._table.close()
+            self._table = None
+        if self._disk_cache is not None:
+            self._disk_cache.close()
+            self._disk_cache = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+_default = None
+
+
+async def achain(n, strategy=None):
+    """
+    Generate a chain on a shared default ChainService.
+
+    The default service uses one worker thread; create a ChainService for
+    other settings.
+
+    Examples:
+        >>> asyncio.run(achain(87))
+        [1, 2, 3, 6, 7, 10, 20, 40, 80, 87]
+    """
+    global _default
+    if _default is None:
+        _default = ChainService()
+    return await _default.chain(n, strategy)
+
+
+def _parse_request(request):
+    """Return (n, strategy) from a decoded request object."""
+    n = request.get('n')
+    if isinstance(n, str):
+        n = int(n)
+    if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+        raise ValueError("n must be a positive integer")
+    strategy = request.get('strategy')
+    if isinstance(strategy, str) and strategy.isdigit():
+        strategy = int(strategy)
+    return n, strategy
+
+
+async def _respond(service, line, writer, lock, slots):
+    """Answer one request line, then free its connection slot."""
+    request_id = None
+    try:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get('id')
+            if request.get('op') == 'stats':
+                response = dict(service.stats(), cache=cf.cache_info())
+            else:
+                n, strategy = _parse_request(request)
+                result = await service.chain(n, strategy)
+                response = {'n': n, 'length': len(result), 'chain': result}
+        except Exception as e:
+            response = {'error': str(e)}
+        response['id'] = request_id
+        async with lock:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+    finally:
+        slots.release()
+
+
+async def _handle(service, reader, writer):
+    """
+    Serve one connection, answering requests concurrently.
+
+    At most ``service.max_pending`` requests per connection are unanswered
+    at once; the next line is not read until one of them is written back,
+    so a client that streams requests is throttled by the socket buffers
+    instead of queueing tasks and responses without bound.
+    """
+    lock = asyncio.Lock()
+    slots = asyncio.Semaphore(service.max_pending)
+    tasks = set()
+    try:
+        while True:
+            await slots.acquire()
+            line = await reader.readline()
+            if not line.strip():
+                slots.release()
+                if not line:
+                    break
+                continue
+            task = asyncio.ensure_future(
+                _respond(service, line, writer, lock, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=0, path=None):
+    """
+    Start a JSON-lines server for a ChainService.
+
+    Args:
+        service (ChainService): Service answering the requests
+        host (str): TCP interface (ignored with path)
+        port (int): TCP port; 0 picks a free one
+        path (str): Unix socket path; serves on it instead of TCP
+
+    Returns:
+        asyncio.AbstractServer: The started server
+    """
+    def handler(reader, writer):
+        return _handle(service, reader, writer)
+
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path=path)
+    return await asyncio.start_server(handler, host, port)
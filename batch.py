@@ -0,0 +1,251 @@
+"""
+Batch chain generation across a process pool.
+
+This module fans chain generation for many scalars out to worker processes.
+Inputs are consumed lazily in chunks so that inter-process overhead is
+amortized and memory stays bounded, and each worker keeps its own warm
+subchain cache for the lifetime of the pool.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import contfrac as cf
+import diskcache as dc
+import gcf_chain as gcf
+import table as tb
+import window as win
+
+
+# Strategy Reference:
+# None / 'alpha': contfrac.chain(n, contfrac.alpha(n))
+# 'minchain':     contfrac.minchain(n)
+# 'kary', 'sliding', 'wnaf', 'fractional': window engines (window module)
+# Any key of gcf_chain.strategies(): gcf_chain.minchain(n, strategy)
+STRATEGIES = (None, 'alpha', 'minchain',
+              'kary', 'sliding', 'wnaf', 'fractional')
+
+_WINDOW_ENGINES = {
+    'kary': win.kary_chain,
+    'sliding': win.sliding_window_chain,
+    'wnaf': win.wnaf_chain,
+    'fractional': win.fractional_window_chain,
+}
+
+
+def generate(n, strategy=None):
+    """
+    Generate a single chain with the given strategy.
+
+    Args:
+        n (int): Target integer
+        strategy: None or 'alpha' (contfrac with alpha(n)), 'minchain'
+            (contfrac.minchain), a window engine name ('kary', 'sliding',
+            'wnaf', 'fractional'), or any strategy registered in gcf_chain
+
+    Returns:
+        list: Addition chain for n
+
+    Raises:
+        ValueError: If the strategy is unknown
+    """
+    if strategy is None or strategy == 'alpha':
+        return cf.chain(n, cf.alpha(n))
+    if strategy == 'minchain':
+        return cf.minchain(n)
+    if isinstance(strategy, str) and strategy in _WINDOW_ENGINES:
+        return _WINDOW_ENGINES[strategy](n)
+    # gcf_chain raises ValueError for unknown strategies
+    return gcf.minchain(n, strategy)
+
+
+def _cache_key(strategy):
+    """Return the disk cache (engine, strategy, params) for a strategy."""
+    if strategy is None or strategy == 'alpha':
+        engine, name = 'contfrac', 'alpha'
+    elif strategy == 'minchain':
+        engine, name = 'contfrac', 'minchain'
+    elif strategy in _WINDOW_ENGINES:
+        # Window chains do not depend on contfrac leaves
+        return 'window', strategy, None
+    else:
+        engine, name = 'gcf_chain', strategy
+    table = cf._table
+    if table is None:
+        params = None
+    else:
+        # The bound alone does not tell tables with different chains apart
+        params = {'table': table.bound,
+                  'digest': getattr(table, 'digest', None)}
+    return engine, name, params
+
+
+def _generate(n, strategy):
+    """Generate a chain, through the process's disk cache if one is open."""
+    return _generate_cached(_disk_cache, n, strategy)
+
+
+def _generate_cached(cache, n, strategy):
+    """Generate a chain through a DiskCache, or directly if cache is None."""
+    if cache is None:
+        return generate(n, strategy)
+    engine, name, params = _cache_key(strategy)
+    return cache.get_or_compute(n, engine, name, params,
+                                lambda: generate(n, strategy))
+
+
+def _check_strategy(strategy):
+    """
+    Raise ValueError for strategies the workers would reject.
+
+    gcf_chain strategies are checked against the registry of this process;
+    worker processes must register the same custom strategies on import.
+    """
+    if isinstance(strategy, bool) or (strategy not in STRATEGIES and
+                                      strategy not in gcf.strategies()):
+        raise ValueError(f"Unknown strategy: {strategy!r}")
+
+
+# Disk cache of this process, opened by _init_worker or an in-process batch
+_disk_cache = None
+
+
+def _init_worker(cache_size, table=None, disk_cache=None):
+    """Size the subchain cache and open the leaf table of a new worker."""
+    global _disk_cache
+    cf.set_cache_size(cache_size)
+    if table is not None:
+        tb.load(table)
+    if disk_cache is not None:
+        _disk_cache = dc.DiskCache(disk_cache)
+
+
+def _timed(n, strategy):
+    """Generate a chain and return (n, chain, seconds)."""
+    start = time.perf_counter()
+    result = _generate(n, strategy)
+    return n, result, time.perf_counter() - start
+
+
+def _run_chunk(chunk, strategy, timing=False):
+    """Generate the chains of one chunk inside a worker."""
+    if timing:
+        return [_timed(n, strategy) for n in chunk]
+    return [(n, _generate(n, strategy)) for n in chunk]
+
+
+def _chunks(numbers, chunksize):
+    """Split an iterable into lists of at most chunksize items."""
+    iterator = iter(numbers)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def chains_batch(numbers, strategy=None, workers=None, chunksize=256,
+                 ordered=True, cache_size=4096, timing=False, table=None,
+                 disk_cache=None):
+    """
+    Generate chains for many scalars using a process pool.
+
+    Inputs are read lazily and at most ``2 * workers`` chunks are in flight
+    at any time, so arbitrarily long (even unbounded) iterables can be
+    processed with bounded memory.
+
+    Args:
+        numbers (iterable): Target integers
+        strategy: Chain strategy, see :func:`generate`
+        workers (int): Number of worker processes. None uses
+            ``os.cpu_count()``; 1 or less runs in the calling process
+        chunksize (int): Number of scalars sent to a worker per task
+        ordered (bool): Yield results in input order. When False, results
+            are yielded chunk by chunk as soon as they complete
+        cache_size (int): Subchain cache bound inside each worker
+        timing (bool): Also report the generation time of every chain
+        table (str): Path of a chain table file (see table.generate) to
+            use for contfrac leaves. Each worker memory-maps it, so the
+            pages are shared; in-process runs install it for the duration
+            of the batch only
+        disk_cache (str): Path of a diskcache.DiskCache database. Chains
+            found there are reused and new ones are added, so restarted
+            workers and later batches skip recomputation
+
+    Yields:
+        tuple: (n, chain) pairs, or (n, chain, seconds) with timing
+
+    Raises:
+        ValueError: If the strategy or chunksize is invalid
+
+    Examples:
+        >>> for n, chain in chains_batch([29, 87], workers=2):
+        ...     print(n, chain)
+        29 [1, 2, 4, 6, 7, 14, 28, 29]
+        87 [1, 2, 3, 6, 7, 10, 20, 40, 80, 87]
+    """
+    _check_strategy(strategy)
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return _iter_batch(numbers, strategy, workers, chunksize, ordered,
+                       cache_size, timing, table, disk_cache)
+
+
+def _iter_batch(numbers, strategy, workers, chunksize, ordered, cache_size,
+                timing, table, disk_cache):
+    """Generator behind chains_batch, so argument errors raise eagerly."""
+    global _disk_cache
+    if workers <= 1:
+        previous = cf._table
+        previous_disk = _disk_cache
+        if table is not None:
+            installed = tb.load(table)
+        if disk_cache is not None:
+            _disk_cache = dc.DiskCache(disk_cache)
+        try:
+            for n in numbers:
+                if timing:
+                    yield _timed(n, strategy)
+                else:
+                    yield n, _generate(n, strategy)
+        finally:
+            if table is not None:
+                cf.set_leaf_table(previous)
+                installed.close()
+            if disk_cache is not None:
+                _disk_cache.close()
+                _disk_cache = previous_disk
+        return
+
+    chunks = _chunks(numbers, chunksize)
+    max_pending = 2 * workers
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_size, table,
+                                       disk_cache)) as pool:
+        def submit(chunk):
+            return pool.submit(_run_chunk, chunk, strategy, timing)
+
+        pending = deque()
+        for chunk in islice(chunks, max_pending):
+            pending.append(submit(chunk))
+
+        if ordered:
+            while pending:
+                results = pending.popleft().result()
+                for chunk in islice(chunks, 1):
+                    pending.append(submit(chunk))
+                yield from results
+        else:
+            pending = set(pending)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    for chunk in islice(chunks, 1):
+                        pending.add(submit(chunk))
+                    yield from future.result()
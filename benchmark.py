@@ -0,0 +1,273 @@
+"""
+Reproducible benchmark suite for the chain engines.
+
+Sweeps bit sizes over seeded random scalars and a few known hard cases,
+runs every engine on each, and reports wall-clock percentiles
+(``time.perf_counter``), peak traced memory (``tracemalloc``), chain length
+and length / log2(n). Reports are plain JSON so runs from different
+releases can be stored and compared with :func:`compare`.
+"""
+
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import contfrac as cf
+import gcf_chain as gcf
+import portfolio as pf
+import window as win
+
+
+# Default sweep
+BIT_SIZES = (16, 32, 64, 128, 256, 384, 521, 1024, 2048, 4096)
+
+# Group orders used as fixed hard cases
+SECP256K1_ORDER = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+ED25519_ORDER = 2**252 + 27742317777372353535851937790883648493
+
+# Engine name -> (chain function, largest bit size it is run on). Limits
+# keep the exponential or superlinear engines out of sizes where a single
+# chain takes seconds.
+ENGINES = {
+    'alpha': (lambda n: cf.chain(n, cf.alpha(n)), None),
+    'minchain': (cf.minchain, None),
+    'gcf-binary': (lambda n: gcf.minchain(n, 1), None),
+    'gcf-sqrt': (lambda n: gcf.minchain(n, 2), None),
+    'gcf-factor': (lambda n: gcf.minchain(n, 3), None),
+    'gcf-pi': (lambda n: gcf.minchain(n, 4), None),
+    'gcf-golden': (lambda n: gcf.minchain(n, 5), None),
+    'gcf-ones': (lambda n: gcf.minchain(n, 8), None),
+    'portfolio': (lambda n: pf.best_chain(n, sweep=1), 1024),
+    'kary': (win.kary_chain, None),
+    'sliding': (win.sliding_window_chain, None),
+    'wnaf': (win.wnaf_chain, None),
+    'fractional': (win.fractional_window_chain, None),
+}
+
+
+def scalars(bits, samples, seed=0):
+    """
+    Return seeded random scalars with exactly the given bit length.
+
+    The same (bits, samples, seed) always gives the same scalars.
+    """
+    rng = random.Random(f"{seed}:{bits}")
+    return [rng.getrandbits(bits) | 1 << (bits - 1) for _ in range(samples)]
+
+
+def hard_cases(bit_sizes):
+    """
+    Return named scalars that stress the engines.
+
+    Mersenne numbers 2^b - 1 are all ones in binary (worst case for binary
+    and window methods), plus the secp256k1 and Ed25519 group orders.
+
+    Returns:
+        list: (name, n) pairs
+    """
+    cases = [(f"mersenne-{bits}", (1 << bits) - 1) for bits in bit_sizes]
+    cases.append(('secp256k1-order', SECP256K1_ORDER))
+    cases.append(('ed25519-order', ED25519_ORDER))
+    return cases
+
+
+def percentile(values, q):
+    """
+    Return the q-th percentile (0-100) of values by linear interpolation.
+
+    Examples:
+        >>> percentile([1, 2, 3, 4], 50)
+        2.5
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def measure(engine, n, repeat=5, cold=True):
+    """
+    Time one engine on one scalar.
+
+    Args:
+        engine (callable): Chain function
+        n (int): Scalar
+        repeat (int): Timed runs
+        cold (bool): Clear the contfrac subchain cache before every run, so
+            results do not depend on what ran before
+
+    Returns:
+        dict: times (seconds per run), peak (bytes traced during one extra
+              run) and length of the chain. Any active tracemalloc session
+              is stopped to measure the peak.
+    """
+    times = []
+    for _ in range(repeat):
+        if cold:
+            cf.cache_clear()
+        start = time.perf_counter()
+        result = engine(n)
+        times.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate run, since tracemalloc slows
+    # allocation, and in a fresh tracing session so the peak covers
+    # this run only
+    if cold:
+        cf.cache_clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start()
+    try:
+        engine(n)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'times': times, 'peak': peak, 'length': len(result)}
+
+
+def _summary(engine, label, bits, numbers, repeat, cold):
+    """Aggregate measurements of one engine over a group of scalars."""
+    func, _ = ENGINES[engine]
+    times, peaks, lengths, ratios = [], [], [], []
+    for n in numbers:
+        result = measure(func, n, repeat, cold)
+        times.extend(result['times'])
+        peaks.append(result['peak'])
+        lengths.append(result['length'])
+        ratios.append(result['length'] / n.bit_length())
+    return {
+        'engine': engine,
+        'case': label,
+        'bits': bits,
+        'samples': len(numbers),
+        'seconds': {
+            'min': min(times),
+            'p50': percentile(times, 50),
+            'p90': percentile(times, 90),
+            'p99': percentile(times, 99),
+            'max': max(times),
+        },
+        'peak_bytes': max(peaks),
+        'length': {
+            'min': min(lengths),
+            'mean': sum(lengths) / len(lengths),
+            'max': max(lengths),
+        },
+        'length_per_bit': sum(ratios) / len(ratios),
+    }
+
+
+def run(bit_sizes=BIT_SIZES, engines=None, samples=8, repeat=5, seed=0,
+        hard=True, cold=True, progress=None):
+    """
+    Run the benchmark sweep.
+
+    Args:
+        bit_sizes (iterable): Bit sizes of the random scalars
+        engines (iterable): Names from ENGINES; None runs all of them
+        samples (int): Random scalars per bit size
+        repeat (int): Timed runs per scalar
+        seed (int): Seed for the random scalars
+        hard (bool): Also run the hard cases
+        cold (bool): Clear the subchain cache before every timed run
+        progress (callable): Called with each result record as it completes
+
+    Returns:
+        dict: JSON-serializable report with 'meta' and 'results'
+
+    Raises:
+        ValueError: If an engine name is unknown
+    """
+    engines = list(ENGINES) if engines is None else list(engines)
+    for name in engines:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown engine: {name!r}")
+    bit_sizes = list(bit_sizes)
+
+    groups = [('random', bits, scalars(bits, samples, seed))
+              for bits in bit_sizes]
+    if hard:
+        groups += [(name, n.bit_length(), [n])
+                   for name, n in hard_cases(bit_sizes)]
+
+    results = []
+    for label, bits, numbers in groups:
+        for name in engines:
+            limit = ENGINES[name][1]
+            if limit is not None and bits > limit:
+                continue
+            record = _summary(name, label, bits, numbers, repeat, cold)
+            results.append(record)
+            if progress is not None:
+                progress(record)
+
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'bit_sizes': bit_sizes,
+            'samples': samples,
+            'repeat': repeat,
+            'seed': seed,
+            'cold': cold,
+        },
+        'results': results,
+    }
+
+
+def save(report, path):
+    """Write a report as indented JSON."""
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+def load(path):
+    """Read a report written by :func:`save`."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, tolerance=0.10):
+    """
+    Find regressions between two reports.
+
+    Records are matched by (engine, case, bits). A record regresses if its
+    median time grew by more than ``tolerance`` (relative) or its mean
+    chain length grew at all; chain lengths are deterministic for seeded
+    scalars, so any growth is a real change.
+
+    Args:
+        baseline (dict): Earlier report
+        current (dict): New report
+        tolerance (float): Allowed relative slowdown of the median time
+
+    Returns:
+        list: dicts with engine, case, bits, metric, before and after
+    """
+    before = {(r['engine'], r['case'], r['bits']): r
+              for r in baseline['results']}
+    regressions = []
+    for record in current['results']:
+        key = (record['engine'], record['case'], record['bits'])
+        old = before.get(key)
+        if old is None:
+            continue
+        checks = (
+            ('seconds.p50', old['seconds']['p50'], record['seconds']['p50'],
+             old['seconds']['p50'] * (1 + tolerance)),
+            ('length.mean', old['length']['mean'], record['length']['mean'],
+             old['length']['mean']),
+        )
+        for metric, was, now, limit in checks:
+            if now > limit:
+                regressions.append({'engine': key[0], 'case': key[1],
+                                    'bits': key[2], 'metric': metric,
+                                    'before': was, 'after': now})
+    return regressions
@@ -8,10 +8,13 @@ NAF is useful for reducing the number of non-zero digits in binary
 representations, which is valuable for cryptographic operations.
 """
 
-import numpy as np
+import heapq
+from array import array
 
+import contfrac as cf
 
-def NAF(x):
+
+def NAF(x, compact=False):
     """
     Convert an integer to Non-Adjacent Form (NAF).
 
@@ -21,6 +24,7 @@ def NAF(x):
 
     Args:
         x (int): Input integer (signed)
+        compact (bool): Return an ``array('b')`` instead of a list
 
     Returns:
         list: NAF representation with elements in {-1, 0, 1}
@@ -32,16 +36,114 @@ def NAF(x):
         # This represents: 16 - 4 + 1 = 13
 
     Notes:
-        - For signed integers only
-        - For unsigned integers, slight modification needed
+        - Works for signed integers; NAF(-x) is NAF(x) with negated digits
+        - Runs in time linear in the bit length of x (see :func:`wNAF`)
+    """
+    return wNAF(x, 2, compact)
+
+
+def wNAF(x, w, compact=False):
+    """
+    Convert an integer to width-w Non-Adjacent Form (wNAF).
+
+    Every non-zero digit is odd with absolute value below 2^(w-1), and any
+    w consecutive digits contain at most one non-zero digit. ``wNAF(x, 2)``
+    is the ordinary NAF.
+
+    The digits are produced from the binary expansion of x in a single
+    right-to-left pass over its bits (least significant first) with a
+    carry, so the cost is linear in the bit length instead of the
+    quadratic cost of repeatedly shifting a big integer.
+
+    Args:
+        x (int): Input integer (signed)
+        w (int): Window width, at least 2
+        compact (bool): Return an ``array`` of machine-size digits instead
+            of a list (``'b'`` for w <= 8, ``'h'`` for w <= 16, ``'q'`` for
+            w <= 64)
+
+    Returns:
+        list: wNAF digits, most significant first
+
+    Raises:
+        ValueError: If w < 2, or w > 64 with compact=True
+
+    Examples:
+        >>> wNAF(1122, 3)
+        [1, 0, 0, 0, 0, 3, 0, 0, 0, 1, 0]
     """
-    if x == 0:
-        return []
-    z = 0 if x % 2 == 0 else 2 - (x % 4)
-    return NAF((x - z) // 2) + [z]
+    if w < 2:
+        raise ValueError("Window width w must be at least 2")
+    if compact and w > 64:
+        raise ValueError("Compact wNAF output supports w <= 64")
 
+    negative = x < 0
+    bits = bin(-x if negative else x)[:1:-1]  # Least significant bit first
+    length = len(bits)
+    mask = (1 << w) - 1
+    half = 1 << (w - 1)
+    zeros = [0] * (w - 1)
 
-# TODO: Implement NAF_inverse function to convert NAF back to integer
+    digits = []
+    carry = 0
+    i = 0
+    while i < length or carry:
+        bit = 1 if i < length and bits[i] == '1' else 0
+        if bit == carry:
+            # Even position: 0 + 0, or a carry rippling through a set bit
+            digits.append(0)
+            i += 1
+            continue
+        window = (int(bits[i:i + w][::-1] or '0', 2) + carry) & mask
+        if window >= half:
+            digits.append(window - (1 << w))
+            carry = 1
+        else:
+            digits.append(window)
+            carry = 0
+        digits.extend(zeros)
+        i += w
+
+    while digits and digits[-1] == 0:
+        digits.pop()
+    if negative:
+        digits = [-d for d in digits]
+    digits.reverse()
+
+    if compact:
+        typecode = 'b' if w <= 8 else 'h' if w <= 16 else 'q'
+        return array(typecode, digits)
+    return digits
+
+
+def NAF_inverse(digits):
+    """
+    Convert a (w)NAF digit sequence back to an integer.
+
+    Accepts any signed-digit sequence, most significant digit first, as
+    returned by :func:`NAF` or :func:`wNAF` (list or array). Digits are
+    combined pairwise in a balanced tree, so large inputs cost a few big
+    integer additions per level rather than one per digit.
+
+    Args:
+        digits (sequence): Signed binary digits, most significant first
+
+    Returns:
+        int: The represented integer, sum(d * 2^i)
+
+    Examples:
+        >>> NAF_inverse([1, 0, -1, 0, 1])
+        13
+    """
+    values = list(reversed(digits))
+    width = 1
+    while len(values) > 1:
+        if len(values) % 2:
+            values.append(0)
+        values = [values[i] + (values[i + 1] << width)
+                  for i in range(0, len(values), 2)]
+        width <<= 1
+    return values[0] if values else 0
 
 
 def compute_naf_statistics(n):
@@ -78,6 +180,122 @@ def compute_naf_statistics(n):
     }
 
 
+def _addition_steps(values):
+    """
+    Recover how each element of an addition chain is formed.
+
+    Args:
+        values (list): Sorted addition chain starting with 1
+
+    Yields:
+        tuple: (x, y, z) with x = y + z, y >= z, both earlier in values
+
+    Raises:
+        ValueError: If some element is not a sum of two earlier ones
+    """
+    seen = set()
+    for x in values:
+        if x != 1:
+            if x % 2 == 0 and x >> 1 in seen:
+                yield x, x >> 1, x >> 1
+            else:
+                for z in seen:
+                    if z < x - z and x - z in seen:
+                        yield x, x - z, z
+                        break
+                else:
+                    raise ValueError(f"{x} is not a sum of earlier elements")
+        seen.add(x)
+
+
+def addition_sequence(targets):
+    """
+    Build a joint addition sequence for several exponents (Bos-Coster).
+
+    The pending values live in a binary max-heap. The largest value a is
+    repeatedly reduced by the second largest b: if a < 2b it is formed as
+    b + (a - b); otherwise a = q*b + r is formed from a window of multiples
+    of b, taken from a short chain for q. The remainder joins the heap,
+    and the last remaining value is expanded with contfrac.minchain.
+    Computing g^a * h^b this way needs far fewer group operations than
+    building a separate chain for each exponent.
+
+    Args:
+        targets (iterable): Positive integer exponents
+
+    Returns:
+        dict: Dictionary with the addition sequence including:
+            - sequence: Sorted list of all values, from 1 up to max(targets)
+            - steps: (value, left, right, op) for every value but 1, in
+              sequence order, where value = left + right and op is
+              'double' when left == right, 'add' otherwise
+            - operations: Counts of 'additions', 'doublings' and 'total'
+
+    Raises:
+        ValueError: If targets is empty or contains a non-positive value
+
+    Examples:
+        >>> addition_sequence([87, 29])['sequence']
+        [1, 2, 3, 5, 8, 16, 24, 29, 58, 87]
+    """
+    targets = set(targets)
+    if not targets:
+        raise ValueError("At least one target is required")
+    if min(targets) < 1:
+        raise ValueError("Targets must be positive integers")
+
+    # value -> (left, right) with value = left + right
+    provenance = {}
+    queued = set(targets)
+    heap = [-t for t in targets]
+    heapq.heapify(heap)
+
+    def derive(value, left, right):
+        if value != 1 and value not in provenance:
+            provenance[value] = (left, right)
+
+    while heap:
+        a = -heapq.heappop(heap)
+        if a == 1 or a in provenance:
+            continue
+
+        if not heap:
+            # Last value: expand it with a short chain
+            for x, y, z in _addition_steps(cf.minchain(a)):
+                derive(x, y, z)
+            continue
+
+        b = -heap[0]
+        q, r = divmod(a, b)
+        if q == 1:
+            derive(a, b, r)
+        else:
+            # Window of multiples of b along a short chain for q
+            for x, y, z in _addition_steps(cf.minchain(q)):
+                derive(x * b, y * b, z * b)
+            if r:
+                derive(a, q * b, r)
+
+        if r and r not in queued:
+            queued.add(r)
+            heapq.heappush(heap, -r)
+
+    steps = []
+    counts = {'additions': 0, 'doublings': 0}
+    for value in sorted(provenance):
+        left, right = provenance[value]
+        op = 'double' if left == right else 'add'
+        counts['doublings' if op == 'double' else 'additions'] += 1
+        steps.append((value, left, right, op))
+    counts['total'] = len(steps)
+
+    return {
+        'sequence': [1] + [step[0] for step in steps],
+        'steps': steps,
+        'operations': counts
+    }
+
+
 if __name__ == "__main__":
     # Example usage as in Doche 9.35
     n = 587257
@@ -87,11 +305,8 @@ if __name__ == "__main__":
     print(f"Zeros: {stats['zeros']}, Length: {stats['length']}")
     print(f"Probability p: {stats['p']:.3f}, q_1: {stats['q_1']:.3f}")
 
-    # Bos-Coster tree structure (partial implementation)
-    # k = 4 as in 9.35 from Doche
-    # leaves are initially 1, just the root initially
-    k = 4
-    tree = {"root": 1}
-    signed_appending = {stats['p']: 0, stats['q_1']: [-10, 10]}
-    tree.update(signed_appending)
-    print(f"Tree structure: {tree}")
+    # Bos-Coster joint addition sequence for g^a * h^b
+    targets = [n, 1000003]
+    result = addition_sequence(targets)
+    print(f"Addition sequence for {targets}: {result['sequence']}")
+    print(f"Operations: {result['operations']}")
@@ -6,26 +6,44 @@ Provides easy access to chain generation from the command line.
 """
 
 import argparse
+import csv
+import json
+import os
 import sys
 import contfrac as cf
 import gcf_chain as gcf
 import bos_coster as bc
+import batch
+import codec
 
 
-def generate_chain(args):
-    """Generate an addition chain."""
+def _build_chain(args):
+    """Build the chain requested by the `chain` command."""
     n = args.number
 
     if args.strategy:
         # Use strategy-based generation
-        chain = gcf.minchain(n, args.strategy)
+        return gcf.minchain(n, args.strategy)
     elif args.parameter:
         # Use explicit parameter
-        chain = cf.chain(n, args.parameter)
+        return cf.chain(n, args.parameter)
     else:
         # Use automatic optimal parameter
         k = cf.alpha(n)
-        chain = cf.chain(n, k)
+        return cf.chain(n, k)
+
+
+def generate_chain(args):
+    """Generate an addition chain."""
+    n = args.number
+
+    if args.profile:
+        import instrument
+        with instrument.profile() as prof:
+            chain = _build_chain(args)
+        prof.write_collapsed(args.profile)
+    else:
+        chain = _build_chain(args)
 
     # Display results
     print(f"Number: {n}")
@@ -39,6 +57,16 @@ def generate_chain(args):
     print(f"Bit length of n: {n.bit_length()}")
     print(f"Efficiency ratio: {len(chain) / n.bit_length():.2f}")
 
+    if args.profile:
+        print(f"\nProfile (collapsed stacks written to {args.profile}):")
+        print(f"Max call depth: {prof.max_depth}, "
+              f"max work list: {prof.max_worklist}, "
+              f"cache hit rate: {prof.cache['hit_rate']:.1%}")
+        for name, seconds in prof.total.most_common():
+            print(f"  {name:<24} {prof.calls[name]:>8} calls  "
+                  f"{seconds * 1e3:10.3f} ms total  "
+                  f"{prof.own[name] * 1e3:10.3f} ms self")
+
 
 def compute_naf(args):
     """Compute NAF representation."""
@@ -54,8 +82,13 @@ def compute_naf(args):
 
 
 def benchmark(args):
-    """Benchmark chain generation."""
+    """Benchmark chain generation for one number, or run the full suite."""
     import time
+    import benchmark as bm
+
+    if args.number is None:
+        run_suite(args)
+        return
 
     n = args.number
     iterations = args.iterations
@@ -63,18 +96,180 @@ def benchmark(args):
     print(f"Benchmarking chain generation for n={n}")
     print(f"Running {iterations} iterations...\n")
 
-    start = time.time()
+    times = []
     for _ in range(iterations):
+        start = time.perf_counter()
         k = cf.alpha(n)
         chain = cf.chain(n, k)
-    elapsed = time.time() - start
+        times.append(time.perf_counter() - start)
+    elapsed = sum(times)
 
     print(f"Total time: {elapsed:.6f} seconds")
     print(f"Average time per iteration: {elapsed/iterations:.6f} seconds")
+    print(f"Median / p99: {bm.percentile(times, 50):.6f} / "
+          f"{bm.percentile(times, 99):.6f} seconds")
     print(f"Operations per second: {iterations/elapsed:.2f}")
     print(f"\nFinal chain length: {len(chain)}")
 
 
+def run_suite(args):
+    """Run the benchmark suite and optionally save or compare JSON reports."""
+    import benchmark as bm
+
+    bits = bm.BIT_SIZES if args.bits is None else args.bits
+    engines = None if args.engines is None else args.engines.split(',')
+
+    def progress(record):
+        print(f"{record['engine']:<11} {record['case']:<16} "
+              f"{record['bits']:>5}  p50 {record['seconds']['p50']*1e3:10.3f} ms  "
+              f"len {record['length']['mean']:8.1f}  "
+              f"len/bit {record['length_per_bit']:.3f}  "
+              f"peak {record['peak_bytes'] / 1024:9.1f} KiB")
+
+    report = bm.run(bits, engines, samples=args.samples, repeat=args.repeat,
+                    seed=args.seed, hard=not args.no_hard, progress=progress)
+    if args.output:
+        bm.save(report, args.output)
+        print(f"\nReport written to {args.output}")
+    if args.compare:
+        regressions = bm.compare(bm.load(args.compare), report,
+                                 args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['engine']} {r['case']} {r['bits']} "
+                  f"{r['metric']}: {r['before']:.6g} -> {r['after']:.6g}")
+        if regressions:
+            sys.exit(2)
+        print(f"\nNo regressions against {args.compare}")
+
+
+def read_numbers(stream):
+    """
+    Parse one positive integer per line, lazily.
+
+    Blank lines and lines starting with '#' are skipped.
+
+    Args:
+        stream: Iterable of text lines
+
+    Yields:
+        int: Parsed numbers
+
+    Raises:
+        ValueError: On a line that is not a positive integer
+    """
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            n = int(line)
+        except ValueError:
+            raise ValueError(f"line {lineno}: invalid integer {line!r}") from None
+        if n < 1:
+            raise ValueError(f"line {lineno}: {n} is not a positive integer")
+        yield n
+
+
+def _parse_strategy(name):
+    """Map a --strategy value to a batch strategy."""
+    return int(name) if name.isdigit() else name
+
+
+def run_batch(args):
+    """Generate chains for a stream of numbers, one result per line."""
+    strategy = _parse_strategy(args.strategy)
+    if args.format == 'archive':
+        if args.output == '-':
+            raise ValueError("--format archive needs an output file (-o)")
+        if args.unordered:
+            raise ValueError("--format archive keeps input order; "
+                             "drop --unordered")
+    source = sys.stdin if args.input == '-' else open(args.input)
+    if args.format == 'archive':
+        out = codec.ArchiveWriter(args.output)
+    elif args.output == '-':
+        out = sys.stdout
+    else:
+        out = open(args.output, 'w', newline='')
+    try:
+        results = batch.chains_batch(read_numbers(source), strategy=strategy,
+                                     workers=args.workers,
+                                     chunksize=args.chunksize,
+                                     ordered=not args.unordered, timing=True,
+                                     table=args.table,
+                                     disk_cache=args.disk_cache)
+        if args.format == 'archive':
+            # Chain i belongs to input line i; records hold only gaps, so
+            # n must be recoverable as the last element
+            for n, chain, seconds in results:
+                if chain[-1] != n:
+                    raise ValueError(f"Chain for {n} ends at {chain[-1]}; "
+                                     "it cannot be archived")
+                out.append(chain)
+        elif args.format == 'csv':
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(['n', 'length', 'strategy', 'seconds', 'chain'])
+            for n, chain, seconds in results:
+                writer.writerow([n, len(chain), args.strategy, f"{seconds:.6f}",
+                                 ' '.join(map(str, chain))])
+                out.flush()
+        else:
+            for n, chain, seconds in results:
+                record = {'n': n, 'length': len(chain),
+                          'strategy': args.strategy,
+                          'seconds': round(seconds, 6), 'chain': chain}
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+    except BrokenPipeError:
+        # Downstream closed the pipe (e.g. `| head`); stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+def run_table(args):
+    """Precompute a chain table file."""
+    import search
+    import table as tb
+
+    seeds = search.exact_upto(args.exact) if args.exact else None
+    total = tb.generate(args.bound, args.output, seeds)
+    print(f"Wrote chains for n <= {args.bound} to {args.output}")
+    print(f"Average length: {total / args.bound:.2f}")
+
+
+def run_serve(args):
+    """Serve chains over a local socket until interrupted."""
+    import asyncio
+    import aio
+
+    async def main():
+        service = aio.ChainService(workers=args.workers,
+                                   processes=args.processes,
+                                   max_pending=args.max_pending,
+                                   table=args.table,
+                                   disk_cache=args.disk_cache)
+        try:
+            server = await aio.serve(service, args.host, args.port,
+                                     args.unix)
+            where = args.unix or '{}:{}'.format(
+                *server.sockets[0].getsockname()[:2])
+            print(f"Serving chains on {where}", flush=True)
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -87,6 +282,10 @@ Examples:
   %(prog)s chain 255 -k 15            # Use explicit parameter k=15
   %(prog)s naf 587257                 # Compute NAF representation
   %(prog)s benchmark 10000 -n 100     # Benchmark with 100 iterations
+  %(prog)s benchmark -o report.json   # Full suite, JSON report
+  %(prog)s batch -i scalars.txt -w 4  # One JSON line per input number
+  %(prog)s batch -i scalars.txt -f archive -o chains.car  # Binary archive
+  %(prog)s serve --unix /tmp/chains.sock  # JSON-lines chain service
 
 For more information, visit:
 https://github.com/face-al/Addition-Subtraction-Chains
@@ -101,10 +300,15 @@ https://github.com/face-al/Addition-Subtraction-Chains
     chain_parser.add_argument('number', type=int,
                              help='Target number (positive integer)')
     chain_parser.add_argument('-s', '--strategy', type=int,
-                             choices=[1, 2],
-                             help='Strategy: 1=Binary, 2=Square-root')
+                             choices=gcf.strategies(),
+                             help='gcf_chain strategy: 1=Binary, '
+                                  '2=Square-root, 3=Factor, 4=Pi, '
+                                  '5=Golden-ratio, 8=Ones')
     chain_parser.add_argument('-k', '--parameter', type=int,
                              help='Explicit parameter k for chain generation')
+    chain_parser.add_argument('-p', '--profile', metavar='PATH',
+                             help='Instrument the engines and write '
+                                  'collapsed stacks to PATH')
     chain_parser.set_defaults(func=generate_chain)
 
     # NAF command
@@ -117,12 +321,105 @@ https://github.com/face-al/Addition-Subtraction-Chains
     # Benchmark command
     bench_parser = subparsers.add_parser('benchmark',
                                          help='Benchmark chain generation')
-    bench_parser.add_argument('number', type=int,
-                             help='Target number for benchmark')
+    bench_parser.add_argument('number', type=int, nargs='?',
+                             help='Target number for benchmark; omit to run '
+                                  'the full suite')
     bench_parser.add_argument('-n', '--iterations', type=int, default=1000,
                              help='Number of iterations (default: 1000)')
+    bench_parser.add_argument('-b', '--bits', type=int, nargs='+',
+                             help='Suite: bit sizes (default: 16 ... 4096)')
+    bench_parser.add_argument('-e', '--engines',
+                             help='Suite: comma-separated engine names '
+                                  '(default: all)')
+    bench_parser.add_argument('--samples', type=int, default=8,
+                             help='Suite: random scalars per bit size '
+                                  '(default: 8)')
+    bench_parser.add_argument('--repeat', type=int, default=5,
+                             help='Suite: timed runs per scalar (default: 5)')
+    bench_parser.add_argument('--seed', type=int, default=0,
+                             help='Suite: random seed (default: 0)')
+    bench_parser.add_argument('--no-hard', action='store_true',
+                             help='Suite: skip Mersenne and group-order cases')
+    bench_parser.add_argument('-o', '--output',
+                             help='Suite: write the JSON report here')
+    bench_parser.add_argument('--compare',
+                             help='Suite: baseline JSON report; exit with '
+                                  'status 2 on regressions')
+    bench_parser.add_argument('--tolerance', type=float, default=0.10,
+                             help='Suite: allowed median slowdown '
+                                  '(default: 0.10)')
     bench_parser.set_defaults(func=benchmark)
 
+    # Batch command
+    batch_parser = subparsers.add_parser(
+        'batch', help='Generate chains for a stream of numbers')
+    batch_parser.add_argument('-i', '--input', default='-',
+                              help='File with one number per line '
+                                   '(default: stdin)')
+    batch_parser.add_argument('-o', '--output', default='-',
+                              help='Output file (default: stdout)')
+    batch_parser.add_argument('-f', '--format',
+                              choices=['jsonl', 'csv', 'archive'],
+                              default='jsonl',
+                              help='Output format (default: jsonl); archive '
+                                   'writes a binary codec.Archive file')
+    batch_parser.add_argument('-s', '--strategy',
+                              choices=['alpha', 'minchain']
+                              + [str(s) for s in gcf.strategies()]
+                              + ['kary', 'sliding', 'wnaf', 'fractional'],
+                              default='alpha',
+                              help='alpha=contfrac with alpha(n), '
+                                   'minchain=contfrac.minchain, a gcf_chain '
+                                   'strategy (1=Binary, 2=Square-root, '
+                                   '3=Factor, 4=Pi, 5=Golden-ratio, 8=Ones), '
+                                   'or a window engine (default: alpha)')
+    batch_parser.add_argument('-w', '--workers', type=int, default=1,
+                              help='Worker processes (default: 1, in-process)')
+    batch_parser.add_argument('-c', '--chunksize', type=int, default=256,
+                              help='Numbers per worker task (default: 256)')
+    batch_parser.add_argument('--unordered', action='store_true',
+                              help='Emit results as they complete')
+    batch_parser.add_argument('-t', '--table',
+                              help='Chain table file for contfrac leaves')
+    batch_parser.add_argument('-d', '--disk-cache', metavar='PATH',
+                              help='Persistent chain cache (SQLite file) '
+                                   'shared across runs and workers')
+    batch_parser.set_defaults(func=run_batch)
+
+    # Table command
+    table_parser = subparsers.add_parser(
+        'table', help='Precompute a chain table for small n')
+    table_parser.add_argument('bound', type=int,
+                              help='Largest n to tabulate')
+    table_parser.add_argument('-o', '--output', required=True,
+                              help='Table file to write')
+    table_parser.add_argument('-e', '--exact', type=int, default=0,
+                              help='Seed n up to this bound with exact '
+                                   'optimal chains (slow above ~1000)')
+    table_parser.set_defaults(func=run_table)
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        'serve', help='Serve chains as JSON lines over a local socket')
+    serve_parser.add_argument('--unix', metavar='PATH',
+                              help='Unix socket path (default: TCP)')
+    serve_parser.add_argument('--host', default='127.0.0.1',
+                              help='TCP interface (default: 127.0.0.1)')
+    serve_parser.add_argument('--port', type=int, default=8765,
+                              help='TCP port (default: 8765)')
+    serve_parser.add_argument('-w', '--workers', type=int, default=1,
+                              help='Worker threads or processes (default: 1)')
+    serve_parser.add_argument('--processes', action='store_true',
+                              help='Use worker processes instead of threads')
+    serve_parser.add_argument('--max-pending', type=int, default=256,
+                              help='Most distinct chains queued or running '
+                                   '(default: 256)')
+    serve_parser.add_argument('-t', '--table',
+                              help='Chain table file for contfrac leaves')
+    serve_parser.add_argument('-d', '--disk-cache', metavar='PATH',
+                              help='Persistent chain cache (SQLite file)')
+    serve_parser.set_defaults(func=run_serve)
+
     # Parse arguments
     args = parser.parse_args()
 
@@ -0,0 +1,365 @@
+"""
+Compact binary storage for chains.
+
+A sorted chain starting with 1 is stored as the gaps between consecutive
+elements. Each gap is written as one varint (7 bits per byte, least
+significant group first, high bit set on every byte but the last) whose
+lowest bit is a tag:
+
+- tag 0: the remaining bits are the gap itself. Used for gaps of up to
+  INLINE_BITS bits, so the small gaps of table chains take one or two
+  bytes.
+- tag 1: the remaining bits are a byte count, and that many little-endian
+  bytes of the gap follow. Gaps of multi-thousand-bit chains are thus
+  converted by int.to_bytes / int.from_bytes at C speed, instead of seven
+  bits at a time.
+
+The leading 1 is implicit. :func:`decode` reads any buffer (bytes, mmap,
+memoryview) through a memoryview, so decoding a record inside a larger
+buffer copies nothing but the gaps it converts.
+
+:class:`ArchiveWriter` and :class:`Archive` store any number of chains in
+one file with an offset index for random access to the i-th chain. A
+record is a kind byte followed by either the :func:`encode` gaps or, for a
+tape.ChainTape, its to_bytes() steps (opcodes and operand indices, 9 bytes
+per element). Gaps are smaller for word-sized scalars. For chains of a few
+thousand bits the gaps are about as large as the elements themselves,
+and tapes are some 25x smaller. File layout (all integers
+little-endian)::
+
+    header   magic b'ACAR', version (uint16), reserved (uint16),
+             count (uint64), index position (uint64)
+    data     records, back to back
+    index    count + 1 uint64 offsets of the records within data
+
+The writer streams chains to disk and keeps only the offsets (8 bytes per
+chain) in memory until it writes the index on close.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+from tape import ChainTape
+
+
+# Largest gap, in bits, stored inline in its varint
+INLINE_BITS = 48
+
+_MAGIC = b'ACAR'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHQQ')
+
+# Offsets are serialized as 8-byte little-endian integers
+_OFFSET = 'Q'
+
+# Record kinds
+_GAPS, _TAPE = b'\x00', b'\x01'
+
+
+def write_varint(out, x):
+    """
+    Append a non-negative integer to a bytearray as a varint.
+
+    Examples:
+        >>> out = bytearray()
+        >>> write_varint(out, 300)
+        >>> bytes(out)
+        b'\\xac\\x02'
+    """
+    while x >= 0x80:
+        out.append(x & 0x7F | 0x80)
+        x >>= 7
+    out.append(x)
+
+
+def read_varint(data, i):
+    """
+    Read a varint starting at data[i].
+
+    Returns:
+        tuple: (value, index just past the varint)
+
+    Raises:
+        ValueError: If the buffer ends inside the varint
+    """
+    x = shift = 0
+    try:
+        while True:
+            byte = data[i]
+            i += 1
+            x |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return x, i
+            shift += 7
+    except IndexError:
+        raise ValueError("Truncated varint") from None
+
+
+def encode(chain):
+    """
+    Encode a sorted chain starting with 1.
+
+    Args:
+        chain (list): Strictly increasing integers starting with 1, such
+            as contfrac.chain or gcf_chain.minchain return
+
+    Returns:
+        bytearray: Encoded gaps
+
+    Raises:
+        ValueError: If the chain does not start with 1 or is not strictly
+            increasing
+
+    Examples:
+        >>> bytes(encode([1, 2, 3, 6, 7, 10, 20, 40, 80, 87]))
+        b'\\x02\\x02\\x06\\x02\\x06\\x14(P\\x0e'
+    """
+    if not chain or chain[0] != 1:
+        raise ValueError("Chain must be sorted and start with 1")
+    out = bytearray()
+    previous = 1
+    for x in chain[1:]:
+        gap = x - previous
+        if gap < 1:
+            raise ValueError("Chain must be strictly increasing")
+        previous = x
+        bits = gap.bit_length()
+        if bits <= INLINE_BITS:
+            write_varint(out, gap << 1)
+        else:
+            size = (bits + 7) >> 3
+            write_varint(out, size << 1 | 1)
+            out += gap.to_bytes(size, 'little')
+    return out
+
+
+def decode(data, start=0, end=None):
+    """
+    Decode a chain written by :func:`encode`.
+
+    Args:
+        data: Buffer holding the encoding (bytes, bytearray, mmap or
+            memoryview)
+        start (int): Position of the encoding in data
+        end (int): Position just past it (default: end of data)
+
+    Returns:
+        list: The chain
+
+    Raises:
+        ValueError: If the encoding is truncated
+    """
+    with memoryview(data) as view:
+        if end is None:
+            end = len(view)
+        chain = [1]
+        value = 1
+        i = start
+        while i < end:
+            header, i = read_varint(view, i)
+            if header & 1:
+                size = header >> 1
+                if i + size > end:
+                    raise ValueError("Truncated chain encoding")
+                value += int.from_bytes(view[i:i + size], 'little')
+                i += size
+            else:
+                value += header >> 1
+            chain.append(value)
+        if i != end:
+            raise ValueError("Truncated chain encoding")
+        return chain
+
+
+class ArchiveWriter:
+    """
+    Write chains to an archive file, one at a time.
+
+    Use as a context manager or call close(); the archive is only valid
+    once closed.
+
+    Args:
+        path (str): Output file, replaced if it exists
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0, 0))
+        self._offsets = array(_OFFSET, [0])
+        self._size = 0
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def append(self, chain):
+        """
+        Add a chain.
+
+        Args:
+            chain (list or ChainTape): Sorted chain starting with 1, or a
+                tape, which is stored as its steps
+
+        Returns:
+            int: Index of the chain in the archive
+
+        Raises:
+            ValueError: If the chain cannot be encoded (see encode)
+        """
+        if isinstance(chain, ChainTape):
+            kind, data = _TAPE, chain.to_bytes()
+        else:
+            kind, data = _GAPS, encode(chain)
+        self._file.write(kind)
+        self._file.write(data)
+        self._size += 1 + len(data)
+        self._offsets.append(self._size)
+        return len(self._offsets) - 2
+
+    def extend(self, chains):
+        """Add every chain of an iterable."""
+        for chain in chains:
+            self.append(chain)
+
+    def close(self):
+        """Write the index and header and close the file."""
+        if self._file.closed:
+            return
+        offsets = self._offsets
+        if sys.byteorder == 'big':
+            offsets = array(_OFFSET, offsets)
+            offsets.byteswap()
+        position = _HEADER.size + self._size
+        self._file.write(offsets.tobytes())
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, 0, len(self),
+                                      position))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Archive:
+    """
+    Read-only, memory-mapped view of an archive file.
+
+    ``archive[i]`` decodes the i-th chain on demand; nothing else is read
+    into memory. Chains are not verified: check chains from untrusted
+    archives with verify.check_chain.
+
+    Args:
+        path (str): File written by :class:`ArchiveWriter`
+
+    Raises:
+        ValueError: If the file is not a valid archive
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            size = f.seek(0, 2)
+            self._map = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                         if size else b'')
+        try:
+            if len(self._map) < _HEADER.size:
+                raise ValueError("Truncated chain archive")
+            magic, version, _, count, position = _HEADER.unpack_from(
+                self._map)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("Not a chain archive file")
+            if position + 8 * (count + 1) != len(self._map):
+                raise ValueError("Chain archive has the wrong length")
+            self._count = count
+            self._index = position
+            if self._offset(count) != position - _HEADER.size:
+                raise ValueError("Chain archive index is corrupt")
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    def _offset(self, i):
+        return struct.unpack_from('<Q', self._map, self._index + 8 * i)[0]
+
+    def __len__(self):
+        return self._count
+
+    def _bounds(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Archive index out of range")
+        start = _HEADER.size + self._offset(i)
+        end = _HEADER.size + self._offset(i + 1)
+        if not start < end <= self._index:
+            raise ValueError(f"Chain archive index is corrupt at {i}")
+        return self._map[start:start + 1], start + 1, end
+
+    def __getitem__(self, i):
+        """
+        Return the i-th chain as a sorted list, for tapes as well.
+
+        Negative i counts from the end.
+        """
+        kind, start, end = self._bounds(i)
+        if kind == _TAPE:
+            return self._tape(start, end).chain()
+        return decode(self._map, start, end)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def tape(self, i):
+        """
+        Return the i-th chain as a ChainTape.
+
+        Raises:
+            ValueError: If the chain was stored as gaps, not as a tape
+        """
+        kind, start, end = self._bounds(i)
+        if kind != _TAPE:
+            raise ValueError(f"Chain {i} is not stored as a tape")
+        return self._tape(start, end)
+
+    def _tape(self, start, end):
+        with memoryview(self._map) as view:
+            return ChainTape.from_bytes(view[start:end])
+
+    def record(self, i):
+        """
+        Return the stored i-th chain without copying it.
+
+        Returns:
+            memoryview: The :func:`encode` output, or ChainTape.to_bytes()
+                output for a tape; a view into the file, so release it
+                before close()
+        """
+        _, start, end = self._bounds(i)
+        return memoryview(self._map)[start:end]
+
+    def close(self):
+        """Release the memory map."""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_archive(path, chains):
+    """
+    Write chains to a new archive file.
+
+    Returns:
+        int: Number of chains written
+    """
+    with ArchiveWriter(path) as writer:
+        writer.extend(chains)
+        return len(writer)
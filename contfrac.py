@@ -5,34 +5,191 @@ This module provides the main algorithms for generating optimal or near-optimal
 addition chains for positive integers, useful in cryptographic operations.
 """
 
-import math as m
-import numpy as np
+import threading
+from collections import OrderedDict
 
+# ceil, floor, isqrt and log_2 are re-exported for existing callers
+from intmath import (ceil, floor, floor_power_of_two, is_power_of_two,
+                     isqrt, log_2)
 
-def floor(num):
+
+class ChainCache:
     """
-    Return the floor of a number.
+    Bounded, thread-safe LRU cache for subchains.
+
+    Keys are ``n`` for :func:`minchain` and ``(n, k)`` for :func:`chain`.
+    Values are stored as tuples so that a cached chain can never be
+    corrupted by the in-place :func:`product`/:func:`addition` mutations;
+    callers always receive a fresh list. When ``minchain(n)`` delegates to
+    ``chain(n, k)`` both keys refer to the same tuple, so the alias costs
+    one entry but no extra chain storage.
 
     Args:
-        num: Number to floor
+        maxsize (int): Maximum number of cached entries. ``None`` means
+            unbounded, ``0`` disables caching.
+
+    Raises:
+        ValueError: If maxsize is not None or a non-negative integer
+    """
+
+    def __init__(self, maxsize=4096):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.maxsize = _check_maxsize(maxsize)
+        self.enabled = maxsize != 0
+
+    def get(self, key):
+        """
+        Look up a cached chain.
+
+        Args:
+            key: ``n`` or ``(n, k)``
+
+        Returns:
+            tuple: Cached chain, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a chain, evicting the least recently used entries if needed.
+
+        Args:
+            key: ``n`` or ``(n, k)``
+            value (tuple): Chain to store
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize):
+        """
+        Change the size bound, evicting entries if the cache shrinks.
+
+        Args:
+            maxsize (int): New bound (``None`` = unbounded, ``0`` = disabled)
+
+        Raises:
+            ValueError: If maxsize is not None or a non-negative integer
+        """
+        _check_maxsize(maxsize)
+        with self._lock:
+            self.maxsize = maxsize
+            self.enabled = maxsize != 0
+            self._evict()
+
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: hits, misses, size, maxsize and enabled flag
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'enabled': self.enabled
+            }
+
+    def _evict(self):
+        # Caller must hold the lock
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def _check_maxsize(maxsize):
+    """Validate a cache bound, returning it unchanged."""
+    if maxsize is not None and (
+            isinstance(maxsize, bool) or not isinstance(maxsize, int)
+            or maxsize < 0):
+        raise ValueError(
+            f"maxsize must be None or a non-negative integer, got {maxsize!r}")
+    return maxsize
+
+
+_cache = ChainCache()
+
+# Lengths computed by chain_length/minchain_length, under the same keys
+_length_cache = ChainCache()
+
+
+def cache_info():
+    """
+    Return statistics of the subchain cache.
 
     Returns:
-        int: Floor of the input number
+        dict: hits, misses, size, maxsize and enabled flag
     """
-    return m.floor(num)
+    return _cache.info()
+
 
+def cache_clear():
+    """Empty the subchain and chain length caches and reset the counters."""
+    _cache.clear()
+    _length_cache.clear()
 
-def ceil(num):
+
+def set_cache_size(maxsize):
     """
-    Return the ceiling of a number.
+    Bound the subchain cache.
 
     Args:
-        num: Number to ceil
+        maxsize (int): Maximum number of cached chains (and, separately,
+            of cached chain lengths). ``None`` means unbounded, ``0``
+            disables the caches.
+    """
+    _cache.resize(maxsize)
+    _length_cache.resize(maxsize)
 
-    Returns:
-        int: Ceiling of the input number
+
+# Optional table of precomputed chains used at minchain leaves
+_table = None
+
+
+def set_leaf_table(table):
+    """
+    Use a table of precomputed chains for small minchain subproblems.
+
+    Every minchain subproblem n with n <= table.bound, including those
+    inside chain(n, k), is answered by ``table[n]`` instead of being
+    decomposed further. The subchain cache is cleared, since chains built
+    with and without the table differ.
+
+    Args:
+        table: Object with a ``bound`` attribute whose ``table[n]`` returns
+            a sorted tuple chain ending at n (e.g. table.ChainTable), or
+            None to stop using a table
     """
-    return m.ceil(num)
+    global _table
+    _table = table
+    _cache.clear()
+    _length_cache.clear()
 
 
 def sign(n):
@@ -51,11 +208,23 @@ def sign(n):
         return 1
 
 
+# Operand size (bits) above which gcdExtended uses Lehmer steps
+_LEHMER_THRESHOLD = 1024
+
+# Width of the leading words used by Lehmer steps
+_LEHMER_WORD = 62
+
+
 def gcdExtended(a, b):
     """
     Extended Euclidean Algorithm.
 
     Computes GCD and Bézout coefficients such that a*x + b*y = gcd(a,b).
+    Runs iteratively, so arbitrarily large operands never hit the recursion
+    limit. Non-negative operands above about 1024 bits take a Lehmer fast
+    path that performs most quotient steps on leading words only; it
+    follows the same quotient sequence, so the coefficients are identical
+    to the classic recursive formulation.
 
     Args:
         a (int): First integer
@@ -64,18 +233,60 @@ def gcdExtended(a, b):
     Returns:
         tuple: (gcd, x, y) where gcd is the greatest common divisor,
                and x, y are the Bézout coefficients
+
+    Examples:
+        >>> gcdExtended(240, 46)
+        (2, -9, 47)
     """
-    # Base Case
-    if a == 0:
-        return b, 0, 1
+    # Invariants: small = a*xs + b*ys and big = a*xb + b*yb. Each step
+    # maps (small, big) to (big % small, small), as the recursion did.
+    small, big = a, b
+    xs, ys, xb, yb = 1, 0, 0, 1
+
+    if small >= 0 and big >= 0:
+        while small.bit_length() > _LEHMER_THRESHOLD:
+            A, B, C, D = _lehmer_step(big, small)
+            big, small = A * big + B * small, C * big + D * small
+            xb, xs = A * xb + B * xs, C * xb + D * xs
+            yb, ys = A * yb + B * ys, C * yb + D * ys
 
-    gcd, x1, y1 = gcdExtended(b % a, a)
+    while small:
+        q, r = divmod(big, small)
+        big, small = small, r
+        xb, xs = xs, xb - q * xs
+        yb, ys = ys, yb - q * ys
 
-    # Update x and y using results of recursive call
-    x = y1 - (b // a) * x1
-    y = x1
+    return big, xb, yb
 
-    return gcd, x, y
+
+def _lehmer_step(big, small):
+    """
+    Run Euclid on the leading words of (big, small).
+
+    Returns the cosequence matrix (A, B, C, D) such that
+    (A*big + B*small, C*big + D*small) is the pair reached after the
+    quotient steps that are certain to agree with full-precision Euclid
+    (Knuth, TAOCP vol. 2, Algorithm 4.5.2L). If no step can be certified
+    from the leading words, the matrix of one exact division step is
+    returned instead.
+    """
+    if big < small:
+        # The first exact step just swaps the operands
+        return 0, 1, 1, 0
+    shift = max(big.bit_length() - _LEHMER_WORD, 0)
+    x, y = big >> shift, small >> shift
+    A, B, C, D = 1, 0, 0, 1
+    while y + C and y + D:
+        q = (x + A) // (y + C)
+        if q != (x + B) // (y + D):
+            break
+        A, C = C, A - q * C
+        B, D = D, B - q * D
+        x, y = y, x - q * y
+    if B == 0:
+        q = big // small
+        return 0, 1, 1, -q
+    return A, B, C, D
 
 
 def gcf(n, k):
@@ -98,7 +309,9 @@ def gcf(n, k):
     if a1 == 0:
         u2 = 0
     else:
-        u2 = (-1) * int(a2 / a1)
+        # Exact truncating division, equivalent to int(a2 / a1)
+        q = abs(a2) // abs(a1)
+        u2 = q if (a1 < 0) != (a2 < 0) else -q
     u = sorted([u1, u2])
     return u
 
@@ -108,7 +321,8 @@ def product(v, w):
     Combine two chains via multiplication operation.
 
     Multiplies each element in chain w by the last element of chain v,
-    then extends v with these products.
+    then extends v with these products. Uses plain Python ints, so the
+    products are exact for arbitrary-size elements.
 
     Args:
         v (list): First chain
@@ -117,8 +331,8 @@ def product(v, w):
     Returns:
         list: Combined chain
     """
-    intermediate_result = np.multiply(w, v[-1]).tolist()
-    v.extend(intermediate_result)
+    last = v[-1]
+    v.extend([x * last for x in w])
     return v
 
 
@@ -156,23 +370,6 @@ def subtraction(v, j):
     return v
 
 
-def log_2(x):
-    """
-    Compute floor of log base 2.
-
-    Args:
-        x (int): Input integer
-
-    Returns:
-        int: Floor of log2(x)
-    """
-    result = 0
-    while x > 1:
-        x >>= 1
-        result += 1
-    return result
-
-
 def alpha(n):
     """
     Determine optimal parameter k for chain generation.
@@ -186,8 +383,8 @@ def alpha(n):
     Returns:
         int: Optimal parameter k
     """
-    fraction = 1 << int(ceil(floor(log_2(n)) / 2))
-    return floor(n / fraction)
+    # n // 2^ceil(log2(n) / 2), computed with shifts only
+    return n >> ((log_2(n) + 1) >> 1)
 
 
 def minchain(n):
@@ -195,7 +392,7 @@ def minchain(n):
     Generate a minimal or near-minimal addition chain for n.
 
     Uses optimized algorithms for special cases (powers of 2, small numbers)
-    and recursive chain generation for general cases.
+    and the work-list chain builder for general cases.
 
     Args:
         n (int): Target integer (positive)
@@ -207,20 +404,16 @@ def minchain(n):
         >>> minchain(87)
         [1, 2, 3, 6, 7, 10, 20, 40, 80, 87]
     """
-    l = n.bit_length() - 1
-    if n == 1 << l:  # Power of 2
-        return [2**(i) for i in range(l+1)]
-    if n == 3:
-        return [1, 2, 3]
-    return chain(n, 1 << floor(log_2(int(n/2))))
+    return list(_minchain(n))
 
 
 def chain(n, k):
     """
     Generate an addition chain for n using parameter k.
 
-    Recursive algorithm that builds the chain by decomposing n
-    using the parameter k and combining subchains.
+    Decomposes n using the parameter k and combines the subchains. The
+    decomposition is driven by an explicit work list rather than Python
+    recursion, so it never raises RecursionError however large n is.
 
     Args:
         n (int): Target integer
@@ -233,9 +426,245 @@ def chain(n, k):
         >>> chain(28, 7)
         [1, 2, 3, 4, 7, 14, 21, 28]
     """
-    q = floor(n / k)
-    r = n % k
+    return list(_chain(n, k))
+
+
+def minchain_length(n):
+    """
+    Return len(minchain(n)) without building the chain.
+
+    Examples:
+        >>> minchain_length(87) == len(minchain(87))
+        True
+    """
+    return _lengths([(n, None)])[0]
+
+
+def chain_length(n, k):
+    """
+    Return len(chain(n, k)) without building the chain.
+
+    The decomposition is the one chain uses, but no elements are
+    produced, sorted or deduplicated. The two halves of a split share exactly one
+    element, k: every element of k * minchain(q) is at least k, and
+    everything in minchain(k) or chain(k, r) is at most k. So
+
+        |chain(n, k)| = |minchain(k)| + |minchain(q)| - 1     if r == 0
+        |chain(n, k)| = |chain(k, r)| + |minchain(q)|         otherwise
+
+    where the second case adds n itself. Leaves have known lengths: l + 1
+    for 2^l, 3 for n = 3, and len(table[n]) for tabulated n.
+
+    Args:
+        n (int): Target integer
+        k (int): Chain generation parameter
+
+    Returns:
+        int: Number of elements of chain(n, k)
+
+    Examples:
+        >>> chain_length(28, 7), len(chain(28, 7))
+        (7, 7)
+    """
+    return _lengths([(n, k)])[0]
+
+
+def chain_lengths(numbers, k=None):
+    """
+    Return chain lengths for many scalars, sharing work between them.
+
+    Args:
+        numbers (iterable): Target integers
+        k (int): Parameter for every scalar; None uses alpha(n) for each
+
+    Returns:
+        list: len(chain(n, k)) per scalar, in input order
+    """
+    return _lengths([(n, alpha(n) if k is None else k) for n in numbers])
+
+
+def minchain_lengths(numbers):
+    """Return len(minchain(n)) for many scalars, in input order."""
+    return _lengths([(n, None) for n in numbers])
+
+
+# Work-list opcodes for _build
+_MIN, _CHAIN, _SCALE, _STORE = range(4)
+
+
+def _leaf(n):
+    """Return the fixed or tabulated chain for n, or None."""
+    if is_power_of_two(n):
+        return tuple(1 << i for i in range(log_2(n) + 1))
+    if n == 3:
+        return (1, 2, 3)
+    if _table is not None and n <= _table.bound:
+        return _table[n]
+    return None
+
+
+def _check_args(n, k=None):
+    """
+    Reject targets and parameters the work list cannot decompose.
+
+    Raises:
+        ValueError: Unless n >= 1 and, when given, 1 <= k <= n
+    """
+    if n < 1:
+        raise ValueError(f"n must be a positive integer, not {n}")
+    if k is not None and not 1 <= k <= n:
+        raise ValueError(f"k must satisfy 1 <= k <= n, not k={k} for n={n}")
+
+
+def _minchain(n):
+    """Cached core of :func:`minchain`, returning an immutable tuple."""
+    _check_args(n)
+    cached = _cache.get(n)
+    if cached is not None:
+        return cached
+
+    result = _leaf(n)
+    if result is None:
+        result = _build(n, floor_power_of_two(n >> 1))
+
+    _cache.put(n, result)
+    return result
+
+
+def _chain(n, k):
+    """Cached core of :func:`chain`, returning an immutable tuple."""
+    _check_args(n, k)
+    cached = _cache.get((n, k))
+    if cached is not None:
+        return cached
+
+    result = _build(n, k)
+    _cache.put((n, k), result)
+    return result
+
+
+def _push_chain(stack, out, n, k):
+    """
+    Schedule the subproblems of chain(n, k).
+
+    chain(n, k) is minchain(k) (or chain(k, r) when r != 0), plus
+    k * minchain(q), plus n itself when r != 0. The scaled half is
+    emitted first so that a _SCALE entry can multiply it in place.
+    """
+    q, r = divmod(n, k)
     if r == 0:
-        return sorted(list(set(product(minchain(k), minchain(q)))))
+        stack.append((_MIN, k, 0))
     else:
-        return sorted(list(set(addition(product(chain(k, r), minchain(q)), r))))
\ No newline at end of file
+        out.append(n)
+        stack.append((_CHAIN, k, r))
+    stack.append((_SCALE, k, len(out)))
+    stack.append((_MIN, q, 0))
+
+
+def _build(n, k):
+    """
+    Build chain(n, k) without recursion.
+
+    Subproblems live on an explicit stack and write their elements into a
+    single output buffer, which is sorted and deduplicated once at the
+    end. When the cache is enabled, each general minchain subproblem is
+    also sorted and stored so later scalars can reuse it.
+
+    Args:
+        n (int): Target integer
+        k (int): Chain generation parameter
+
+    Returns:
+        tuple: Sorted, deduplicated addition chain from 1 to n
+    """
+    out = []
+    stack = []
+    _push_chain(stack, out, n, k)
+
+    while stack:
+        op, a, b = stack.pop()
+        if op == _SCALE:
+            # Multiply everything emitted since index b by a
+            out[b:] = [x * a for x in out[b:]]
+        elif op == _MIN:
+            cached = _leaf(a)
+            if cached is None:
+                cached = _cache.get(a)
+            if cached is not None:
+                out.extend(cached)
+                continue
+            stack.append((_STORE, a, len(out)))
+            stack.append((_CHAIN, a, floor_power_of_two(a >> 1)))
+        elif op == _STORE:
+            if _cache.enabled:
+                segment = tuple(sorted(set(out[b:])))
+                del out[b:]
+                out.extend(segment)
+                _cache.put(a, segment)
+        else:  # _CHAIN
+            cached = _cache.get((a, b))
+            if cached is not None:
+                out.extend(cached)
+                continue
+            _push_chain(stack, out, a, b)
+
+    return tuple(sorted(set(out)))
+
+
+def _leaf_length(n):
+    """Return the length of the leaf chain for n, or None."""
+    if is_power_of_two(n):
+        return log_2(n) + 1
+    if n == 3:
+        return 3
+    if _table is not None and n <= _table.bound:
+        return len(_table[n])
+    return None
+
+
+def _lengths(keys):
+    """
+    Compute chain lengths for (n, k) keys, k = None meaning minchain(n).
+
+    By the recurrence in :func:`chain_length`, a length is the sum of the
+    leaf lengths of the decomposition minus one for every split with
+    r == 0, so the work list only accumulates a total. A _STORE entry
+    records each general minchain subproblem's share of the total in the
+    length cache, where later subproblems and scalars find it.
+    """
+    result = []
+    for n, k in keys:
+        _check_args(n, k)
+        key = n if k is None else (n, k)
+        total = _length_cache.get(key)
+        if total is not None:
+            result.append(total)
+            continue
+
+        total = 0
+        stack = [(_MIN, n, 0) if k is None else (_CHAIN, n, k)]
+        while stack:
+            op, a, b = stack.pop()
+            if op == _CHAIN:
+                q, r = divmod(a, b)
+                if r:
+                    stack.append((_CHAIN, b, r))
+                else:
+                    total -= 1
+                    stack.append((_MIN, b, 0))
+                stack.append((_MIN, q, 0))
+            elif op == _MIN:
+                length = _leaf_length(a)
+                if length is None:
+                    length = _length_cache.get(a)
+                if length is not None:
+                    total += length
+                    continue
+                stack.append((_STORE, a, total))
+                stack.append((_CHAIN, a, floor_power_of_two(a >> 1)))
+            else:  # _STORE
+                _length_cache.put(a, total - b)
+
+        _length_cache.put(key, total)
+        result.append(total)
+    return result
@@ -0,0 +1,261 @@
+"""
+Persistent chain cache shared by processes on one machine.
+
+Long-lived exponents (public exponents, curve orders, fixed key scalars)
+are requested again every time a worker restarts. This module keeps
+computed chains in a SQLite database in WAL mode, which allows any number
+of concurrent readers alongside a writer in other processes. Entries are
+keyed by (n, engine, strategy, params) plus a version tag.
+
+- Versioning: entries written under another VERSION are never returned and
+  are the first to go when the cache is evicted. Bump VERSION whenever an
+  engine starts producing different chains.
+- Eviction: once the number of entries exceeds ``max_entries``, the least
+  recently used ones are deleted. The check runs every
+  ``_EVICT_INTERVAL`` writes, so the cache can briefly exceed its bound.
+- Integrity: every chain read back is checked with verify.check_chain;
+  entries that fail are deleted and reported as misses.
+
+Chains are stored in the codec format, whose multi-thousand-bit gaps
+decode at C speed with int.from_bytes.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import codec
+import verify as vf
+
+
+# Bump when any engine's output for a given key changes
+VERSION = 4
+
+# Writes per process between eviction checks
+_EVICT_INTERVAL = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chains (
+    n BLOB NOT NULL,
+    engine TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    params TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    chain BLOB NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (n, engine, strategy, params, version)
+);
+CREATE INDEX IF NOT EXISTS chains_used ON chains (used);
+"""
+
+
+def _key(n, engine, strategy, params, version):
+    """Return the column values identifying an entry."""
+    if n < 1:
+        raise ValueError("n must be a positive integer")
+    blob = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+    text = '' if params is None else json.dumps(params, sort_keys=True)
+    return blob, engine, str(strategy), text, version
+
+
+class DiskCache:
+    """
+    SQLite-backed chain cache.
+
+    Each process and thread uses its own connection, opened on first use,
+    so an instance may be shared by threads and survives os.fork.
+
+    Args:
+        path (str): Database file, created if missing
+        max_entries (int): Entry bound for LRU eviction (None = unbounded)
+        version (int): Version tag written with, and required of, entries
+        timeout (float): Seconds to wait for another process's write lock
+        touch_interval (float): A hit refreshes the entry's LRU timestamp
+            only if it is older than this, so reads rarely need to write
+
+    Raises:
+        ValueError: If max_entries is not None or a positive integer
+    """
+
+    def __init__(self, path, max_entries=100000, version=VERSION,
+                 timeout=30.0, touch_interval=60.0):
+        if max_entries is not None and (
+                isinstance(max_entries, bool) or not isinstance(max_entries, int)
+                or max_entries < 1):
+            raise ValueError(
+                f"max_entries must be None or a positive integer, "
+                f"got {max_entries!r}")
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection, reopening after a fork."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # Autocommit mode: each statement is its own transaction
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, n, engine, strategy='', params=None):
+        """
+        Look up a chain.
+
+        Args:
+            n (int): Target integer
+            engine (str): Engine name, e.g. 'contfrac' or 'window'
+            strategy: Strategy within the engine (stored as str)
+            params: JSON-serializable parameters (None for none)
+
+        Returns:
+            list: The cached chain, or None on a miss or if the stored
+                  chain fails verification
+        """
+        key = _key(n, engine, strategy, params, self.version)
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT chain, used FROM chains WHERE n = ? AND engine = ? '
+            'AND strategy = ? AND params = ? AND version = ?', key).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+
+        result = codec.decode(row[0])
+        if not vf.verify_chain(result, n):
+            conn.execute(
+                'DELETE FROM chains WHERE n = ? AND engine = ? '
+                'AND strategy = ? AND params = ? AND version = ?', key)
+            self._count('rejected')
+            self._count('misses')
+            return None
+
+        now = time.time()
+        if now - row[1] > self.touch_interval:
+            conn.execute(
+                'UPDATE chains SET used = ? WHERE n = ? AND engine = ? '
+                'AND strategy = ? AND params = ? AND version = ?',
+                (now,) + key)
+        self._count('hits')
+        return result
+
+    def put(self, n, engine, strategy, params, chain):
+        """
+        Store a sorted chain, replacing any entry with the same key.
+
+        Args:
+            n (int): Target integer
+            engine (str): Engine name
+            strategy: Strategy within the engine
+            params: JSON-serializable parameters (None for none)
+            chain (list): Sorted, deduplicated chain starting with 1
+
+        Raises:
+            ValueError: If the chain does not start with 1
+        """
+        key = _key(n, engine, strategy, params, self.version)
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO chains '
+            '(n, engine, strategy, params, version, chain, used) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            key + (codec.encode(chain), time.time()))
+        with self._lock:
+            self._writes += 1
+            check = self._writes % _EVICT_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def get_or_compute(self, n, engine, strategy, params, compute):
+        """
+        Return the cached chain, or compute, store and return it.
+
+        Args:
+            compute (callable): Called with no arguments on a miss
+
+        Returns:
+            list: Chain for n
+        """
+        result = self.get(n, engine, strategy, params)
+        if result is None:
+            result = list(compute())
+            self.put(n, engine, strategy, params, result)
+        return result
+
+    def evict(self):
+        """
+        Delete entries of other versions, then the least recently used
+        entries beyond max_entries.
+
+        Returns:
+            int: Number of entries deleted
+        """
+        conn = self._connection()
+        deleted = conn.execute('DELETE FROM chains WHERE version != ?',
+                               (self.version,)).rowcount
+        if self.max_entries is not None:
+            size = conn.execute('SELECT COUNT(*) FROM chains').fetchone()[0]
+            if size > self.max_entries:
+                deleted += conn.execute(
+                    'DELETE FROM chains WHERE rowid IN (SELECT rowid FROM '
+                    'chains ORDER BY used LIMIT ?)',
+                    (size - self.max_entries,)).rowcount
+        return deleted
+
+    def clear(self):
+        """Delete every entry and reset this instance's counters."""
+        self._connection().execute('DELETE FROM chains')
+        with self._lock:
+            self.hits = self.misses = self.rejected = 0
+
+    def info(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: hits, misses and rejected (this instance), size (entries
+                  of this version in the file), max_entries and version
+        """
+        size = self._connection().execute(
+            'SELECT COUNT(*) FROM chains WHERE version = ?',
+            (self.version,)).fetchone()[0]
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'rejected': self.rejected,
+                'size': size,
+                'max_entries': self.max_entries,
+                'version': self.version,
+            }
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.pid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,244 @@
+"""
+Chain evaluation: exponentiation driven by an addition-subtraction chain.
+
+A chain from contfrac.chain or gcf_chain.minchain is a sorted list of
+exponents. This module recovers which earlier elements produce each step,
+drops the steps the target does not need, and executes the rest in a
+user-supplied group, releasing every intermediate as soon as no later step
+reads it.
+
+A group is any object with three methods:
+    - mul(x, y): the group operation
+    - square(x): mul(x, x), possibly faster
+    - inverse(x): the inverse element, used by subtraction steps
+
+Two backends are provided: ModularGroup for modular integers and
+EllipticCurve for points on a short-Weierstrass curve.
+"""
+
+import contfrac as cf
+from tape import ChainTape
+from verify import derive_steps
+
+
+class ModularGroup:
+    """
+    Multiplicative group of integers modulo m.
+
+    Args:
+        modulus (int): Modulus m > 1
+    """
+
+    def __init__(self, modulus):
+        if modulus < 2:
+            raise ValueError("Modulus must be at least 2")
+        self.modulus = modulus
+
+    def mul(self, x, y):
+        """Return x * y mod m."""
+        return x * y % self.modulus
+
+    def square(self, x):
+        """Return x^2 mod m."""
+        return x * x % self.modulus
+
+    def inverse(self, x):
+        """
+        Return the inverse of x mod m.
+
+        Raises:
+            ValueError: If x is not invertible modulo m
+        """
+        gcd, a, _ = cf.gcdExtended(x % self.modulus, self.modulus)
+        if gcd != 1:
+            raise ValueError(f"{x} is not invertible modulo {self.modulus}")
+        return a % self.modulus
+
+
+class EllipticCurve:
+    """
+    Points on y^2 = x^3 + a*x + b over the prime field GF(p).
+
+    Points are (x, y) tuples and None is the point at infinity. The group
+    is written additively, so mul adds points, square doubles a point and
+    inverse negates it.
+
+    Args:
+        a (int): Curve coefficient a
+        b (int): Curve coefficient b
+        p (int): Field prime
+    """
+
+    def __init__(self, a, b, p):
+        self.a = a % p
+        self.b = b % p
+        self.p = p
+
+    def contains(self, point):
+        """Return True if point lies on the curve."""
+        if point is None:
+            return True
+        x, y = point
+        return (y * y - x * x * x - self.a * x - self.b) % self.p == 0
+
+    def _inv(self, x):
+        return cf.gcdExtended(x % self.p, self.p)[1] % self.p
+
+    def mul(self, P, Q):
+        """Return P + Q."""
+        if P is None:
+            return Q
+        if Q is None:
+            return P
+        x1, y1 = P
+        x2, y2 = Q
+        if x1 == x2:
+            if (y1 + y2) % self.p == 0:
+                return None
+            return self.square(P)
+        s = (y2 - y1) * self._inv(x2 - x1) % self.p
+        x3 = (s * s - x1 - x2) % self.p
+        return x3, (s * (x1 - x3) - y1) % self.p
+
+    def square(self, P):
+        """Return 2P."""
+        if P is None:
+            return None
+        x1, y1 = P
+        if y1 % self.p == 0:
+            return None
+        s = (3 * x1 * x1 + self.a) * self._inv(2 * y1) % self.p
+        x3 = (s * s - 2 * x1) % self.p
+        return x3, (s * (x1 - x3) - y1) % self.p
+
+    def inverse(self, P):
+        """Return -P."""
+        if P is None:
+            return None
+        x, y = P
+        return x, -y % self.p
+
+
+def schedule(chain, n=None):
+    """
+    Derive an execution order for a chain.
+
+    Each element other than 1 is expressed as a double, a sum or a
+    difference of two elements computed before it, using the hash-set
+    pass of verify.derive_steps: a subtraction pulls its larger operand
+    forward, so typical chains are scheduled in one near-linear sweep.
+    For a ChainTape the recorded steps are used as is, skipping that
+    search. Elements that do not contribute to n are dropped.
+
+    Args:
+        chain (list or ChainTape): Chain elements (any order), containing
+            1 and n, or a step-annotated tape
+        n (int): Target exponent; defaults to the largest element (the
+            last recorded element for a tape)
+
+    Returns:
+        list: (value, left, right, op) tuples in execution order, with op
+              'double' (value = 2*left), 'add' (value = left + right) or
+              'sub' (value = left - right)
+
+    Raises:
+        ValueError: If some element cannot be derived from the others
+
+    Examples:
+        >>> schedule([1, 2, 3, 6, 7, 10, 20, 40, 80, 87])[:3]
+        [(2, 1, 1, 'double'), (3, 2, 1, 'add'), (6, 3, 3, 'double')]
+    """
+    if isinstance(chain, ChainTape):
+        if n is None:
+            n = chain.values[chain.last]
+        steps = chain.steps()
+        derivation = {step[0]: step[1:] for step in steps}
+        if n != 1 and n not in derivation:
+            raise ValueError(f"{n} is not in the chain")
+        return _prune(steps, derivation, n)
+
+    values = sorted(set(chain))
+    if n is None and values:
+        n = values[-1]
+    if not values or values[0] != 1 or n not in values:
+        raise ValueError("Chain must contain 1 and the target")
+
+    steps = derive_steps(values)
+    derivation = {step[0]: step[1:] for step in steps}
+    return _prune(steps, derivation, n)
+
+
+def _prune(steps, derivation, n):
+    """Keep only the steps that n depends on, in their original order."""
+    needed = {n}
+    stack = [n]
+    while stack:
+        x = stack.pop()
+        if x == 1:
+            continue
+        left, right, _ = derivation[x]
+        for y in (left, right):
+            if y not in needed:
+                needed.add(y)
+                stack.append(y)
+
+    return [step for step in steps if step[0] in needed]
+
+
+def evaluate(chain, base, group, n=None):
+    """
+    Compute base^n in a group by following a chain.
+
+    Intermediates are released as soon as no later step reads them, so
+    only the live working set of the chain is held in memory.
+
+    Args:
+        chain (list or ChainTape): Chain elements (e.g. from
+            contfrac.chain) or a step-annotated tape
+        base: Group element to exponentiate
+        group: Object with mul, square and inverse methods
+        n (int): Target exponent; defaults as in :func:`schedule`
+
+    Returns:
+        The group element base^n (n*base for additive groups)
+
+    Examples:
+        >>> group = ModularGroup(1000003)
+        >>> evaluate(cf.chain(87, cf.alpha(87)), 3, group) == pow(3, 87, 1000003)
+        True
+    """
+    return run(schedule(chain, n), base, group)
+
+
+def run(steps, base, group):
+    """
+    Execute scheduled steps in a group.
+
+    Args:
+        steps (list): Output of :func:`schedule`
+        base: Group element to exponentiate
+        group: Object with mul, square and inverse methods
+
+    Returns:
+        The group element for the last step (base itself if steps is empty)
+    """
+    if not steps:
+        return base
+
+    last_use = {}
+    for i, (_, left, right, _) in enumerate(steps):
+        last_use[left] = i
+        last_use[right] = i
+
+    live = {1: base}
+    for i, (value, left, right, op) in enumerate(steps):
+        if op == 'double':
+            live[value] = group.square(live[left])
+        elif op == 'add':
+            live[value] = group.mul(live[left], live[right])
+        else:
+            live[value] = group.mul(live[left], group.inverse(live[right]))
+        for x in (left, right):
+            if last_use.get(x) == i:
+                live.pop(x, None)
+    return live[steps[-1][0]]
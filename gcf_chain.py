@@ -6,6 +6,7 @@ selection strategies: Binary, Square-root, Factor, Pi, Golden-ratio, etc.
 """
 
 import contfrac as cf
+import intmath as im
 import math as m
 
 
@@ -18,6 +19,118 @@ import math as m
 # 6: Square-root Strategy
 # 7: Seventh Strategy
 # 8: Ones strategy
+#
+# The k-selection functions below cover the named strategies; each returns
+# a parameter 2 <= k < n for n >= 4 using exact integer arithmetic.
+
+# Primes tried by factor_k before giving up
+_SMALL_PRIMES = [p for p in range(2, 1000)
+                 if all(p % d for d in range(2, im.isqrt(p) + 1))]
+
+
+def binary_k(n):
+    """Binary strategy: k = floor(n/2)."""
+    return max(2, n >> 1)
+
+
+def sqrt_k(n):
+    """Square-root strategy: k = floor(sqrt(n))."""
+    return max(2, im.isqrt(n))
+
+
+def factor_k(n):
+    """
+    Factor strategy: k = n/p for the smallest prime p dividing n.
+
+    The gcf remainder is then zero and the chain is a plain product.
+    Only primes below 1000 are tried; otherwise falls back to floor(n/2).
+    """
+    for p in _SMALL_PRIMES:
+        if p * p > n:
+            break
+        if n % p == 0:
+            return n // p
+    return binary_k(n)
+
+
+def pi_k(n):
+    """Pi strategy: k = floor(n/pi), using the convergent 355/113."""
+    return max(2, n * 113 // 355)
+
+
+def golden_k(n):
+    """Golden-ratio strategy: k = floor(n/phi) = floor((sqrt(5n^2) - n)/2)."""
+    return max(2, (im.isqrt(5 * n * n) - n) >> 1)
+
+
+def ones_k(n):
+    """Ones strategy: k = 2^j - 1 with j half the bit length of n."""
+    return max(2, (1 << (n.bit_length() >> 1)) - 1)
+
+
+# Strategy number -> k-selection function, evaluated lazily per subchain
+_STRATEGIES = {
+    1: binary_k,
+    2: sqrt_k,
+    3: factor_k,
+    4: pi_k,
+    5: golden_k,
+    8: ones_k,
+}
+
+
+def register_strategy(strategy_num, select, replace=False):
+    """
+    Register a k-selection function under a strategy number.
+
+    The function is only called for subchains that are not handled by the
+    power-of-two and n == 3 special cases, so it always sees n >= 5.
+
+    Args:
+        strategy_num: Key used as minchain's strategy_num (any hashable)
+        select (callable): Maps n to a parameter 2 <= k < n
+        replace (bool): Allow overriding an existing registration
+
+    Raises:
+        ValueError: If select is not callable, or strategy_num is taken
+            and replace is False
+
+    Examples:
+        >>> register_strategy('third', lambda n: n // 3)
+        >>> minchain(100, 'third')
+        [1, 2, 3, 6, 9, 12, 24, 33, 66, 99, 100]
+    """
+    if not callable(select):
+        raise ValueError(f"Strategy {strategy_num!r} is not callable")
+    if strategy_num in _STRATEGIES and not replace:
+        raise ValueError(f"Strategy {strategy_num!r} is already registered")
+    _STRATEGIES[strategy_num] = select
+
+
+def strategies():
+    """Return the registered strategy numbers, in registration order."""
+    return list(_STRATEGIES)
+
+
+def _selector(strategy_num):
+    """Return the k-selection function for a strategy number."""
+    try:
+        return _STRATEGIES[strategy_num]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown strategy: {strategy_num!r}") from None
+
+
+def select_k(n, strategy_num):
+    """
+    Return the parameter k that a strategy picks for n.
+
+    Raises:
+        ValueError: If the strategy is unknown or returns k outside [2, n)
+    """
+    k = _selector(strategy_num)(n)
+    if not 2 <= k < n:
+        raise ValueError(f"Strategy {strategy_num!r} chose k={k} for n={n}")
+    return k
 
 
 def minchain(n, strategy_num):
@@ -32,27 +145,21 @@ def minchain(n, strategy_num):
         strategy_num (int): Strategy selection:
             1 = Binary Strategy (floor(n/2))
             2 = Square-root Strategy (floor(sqrt(n)))
+            3 = Factor, 4 = Pi, 5 = Golden-ratio, 8 = Ones, or any
+            number added with register_strategy
 
     Returns:
         list: Addition chain from 1 to n
 
+    Raises:
+        ValueError: If the strategy is unknown
+
     Examples:
         >>> minchain(63, strategy_num=1)  # Binary strategy
         [1, 2, 4, 8, 16, 31, 32, 63]
     """
-    l = n.bit_length() - 1
-    strategy = {1: cf.floor(n/2), 2: cf.floor(m.sqrt(n))}
-
-    # Special case: power of 2
-    if n == 1 << l:
-        return [2**(i) for i in range(l+1)]
-
-    # Special case: 3
-    if n == 3:
-        return [1, 2, 3]
-
-    k = strategy[strategy_num]
-    return chain(n, k, strategy_num)
+    _selector(strategy_num)
+    return sorted(set(_build(_MIN, n, 0, strategy_num)))
 
 
 def chain(n, k, strategy_num):
@@ -60,12 +167,14 @@ def chain(n, k, strategy_num):
     Generate addition chain using GCF with specified strategy.
 
     Uses generalized continued fraction coefficients to build the chain
-    recursively with addition/subtraction operations.
+    from three strategy-driven subchains joined by an addition step (see
+    :func:`decompose`). Subchains are scheduled on an explicit work list,
+    so deep decompositions never raise RecursionError.
 
     Args:
         n (int): Target integer
         k (int): Chain generation parameter
-        strategy_num (int): Strategy number for recursive calls
+        strategy_num (int): Strategy number for the subchains
 
     Returns:
         list: Sorted, deduplicated addition chain from 1 to n
@@ -74,26 +183,104 @@ def chain(n, k, strategy_num):
         >>> chain(63, 7, 1)
         [1, 2, 3, 4, 7, 14, 21, 28, 56, 63]
     """
-    u = cf.gcf(n, k)
+    _selector(strategy_num)
+    return sorted(set(_build(_CHAIN, n, k, strategy_num)))
+
+
+def decompose(n, k):
+    """
+    Return the gcf decomposition of n used by :func:`chain`, or None.
 
-    # Check if u1 and u2 are not 0
-    if u[0] == 0 or u[1] == 0:
-        return cf.chain(n, k)
+    The decomposition is (q0, u0, u1) with q0 = gcd(n, k) and u0, u1 the
+    gcf terms of n and k, such that n == q0 * u0 * u1 + q0, so the
+    subchains for q0, u0 and u1 joined by one addition rebuild n. None
+    means chain(n, k) falls back to contfrac.chain(n, k): either a term is
+    zero, the identity does not hold for these terms, a term is not
+    smaller than n (the decomposition could then grow without bound), or
+    the join would be a subtraction, whose minuend exceeds n and would
+    end the sorted chain in place of n.
 
+    Examples:
+        >>> decompose(21, 5)
+        (1, 4, 5)
+        >>> decompose(594, 189) is None
+        True
+    """
+    u0, u1 = cf.gcf(n, k)
+    if u0 <= 0 or u1 == 0 or max(u0, abs(u1)) >= n:
+        return None
     q0 = m.gcd(n, k)
-    q1 = abs(u[0]) * q0
+    u1 = abs(u1)
+    if q0 * u0 * u1 + q0 != n:
+        return None
+    return q0, u0, u1
+
+
+# Work-list opcodes for _build
+_MIN, _CHAIN, _JOIN = range(3)
+
+
+def _build(op, n, k, strategy_num):
+    """
+    Emit the elements of minchain(n) or chain(n, k) into one buffer.
+
+    Every finished subchain pushes (start, top) onto a result stack, where
+    start is the index of its first element in the buffer and top is its
+    largest element. A _JOIN entry then scales the second and third
+    subchains in place, exactly as the nested cf.product calls did.
+
+    Args:
+        op (int): _MIN or _CHAIN
+        n (int): Target integer
+        k (int): Chain generation parameter (ignored for _MIN)
+        strategy_num (int): Strategy number for the subchains
+
+    Returns:
+        list: Unsorted chain elements, possibly with duplicates
+    """
+    out = []
+    done = []
+    stack = [(op, n, k)]
 
-    x0 = minchain(abs(q0), strategy_num)
-    x1 = cf.product(x0, minchain(abs(u[0]), strategy_num))
-    x2 = cf.product(x1, minchain(abs(u[1]), strategy_num))
+    while stack:
+        op, a, b = stack.pop()
+        if op == _MIN:
+            # Special case: power of 2
+            if im.is_power_of_two(a):
+                done.append((len(out), a))
+                out.extend(1 << i for i in range(im.log_2(a) + 1))
+            # Special case: 3
+            elif a == 3:
+                done.append((len(out), 3))
+                out.extend((1, 2, 3))
+            else:
+                stack.append((_CHAIN, a, select_k(a, strategy_num)))
+        elif op == _CHAIN:
+            parts = decompose(a, b)
+            if parts is None:
+                sub = cf.chain(a, b)
+                done.append((len(out), sub[-1]))
+                out.extend(sub)
+                continue
 
-    # Apply addition or subtraction based on sign of u[0]
-    if u[0] < 0:
-        x2 = cf.subtraction(x2, q0)
-    else:
-        x2 = cf.addition(x2, q0)
+            q0, u0, u1 = parts
+            stack.append((_JOIN, q0, 0))
+            stack.append((_MIN, u1, 0))
+            stack.append((_MIN, u0, 0))
+            stack.append((_MIN, q0, 0))
+        else:  # _JOIN
+            q0 = a
+            s2, c = done.pop()
+            s1, b1 = done.pop()
+            s0, a0 = done.pop()
+            out[s1:s2] = [x * a0 for x in out[s1:s2]]
+            ab = a0 * b1
+            out[s2:] = [x * ab for x in out[s2:]]
+            top = ab * c + q0
+            out.append(top)
+            done.append((s0, top))
 
-    return sorted(list(set(x2)))
+    return out
 
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+"""
+Opt-in instrumentation of the chain engines.
+
+Inside a :func:`profile` block the hot functions of contfrac and gcf_chain
+are replaced by timing wrappers that record, per function, the number of
+calls and the cumulative and self time, plus the deepest nesting of
+instrumented calls, the deepest contfrac work list (the iterative
+builder's equivalent of recursion depth) and the subchain cache hit rate.
+Leaving the block restores the original functions, so when no profile is
+active the engines run exactly the code they always do: there is nothing
+to switch off and no overhead.
+
+Results are available as a plain dict or as collapsed stacks
+(``frame;frame;frame value`` lines, value = self time in microseconds)
+that flamegraph.pl, speedscope and similar tools read directly.
+
+Profiling patches module attributes, so it sees every call made through
+them, including calls between functions of the same module. It is not
+thread-safe: only profile one thread at a time.
+
+Example:
+    >>> import contfrac as cf
+    >>> with profile() as p:
+    ...     _ = cf.chain(2**64 - 1, cf.alpha(2**64 - 1))
+    >>> p.calls['contfrac.chain']
+    1
+"""
+
+import time
+from collections import Counter
+
+import contfrac as cf
+import gcf_chain as gcf
+
+
+# Module -> names of the functions instrumented by default
+TARGETS = {
+    cf: ('chain', 'minchain', 'alpha', 'log_2', 'gcf', 'gcdExtended',
+         'product', 'addition', 'subtraction', '_chain', '_minchain',
+         '_build', '_push_chain', '_leaf'),
+    gcf: ('chain', 'minchain', 'select_k', '_build'),
+}
+
+_active = None
+
+
+class Profile:
+    """
+    Measurements collected by :func:`profile`.
+
+    Attributes:
+        calls (Counter): Function name -> number of calls
+        total (Counter): Function name -> cumulative seconds, including
+            instrumented callees (recursive calls are counted once)
+        own (Counter): Function name -> self seconds, excluding
+            instrumented callees
+        stacks (Counter): Tuple of function names -> self seconds
+        max_depth (int): Deepest nesting of instrumented calls
+        max_worklist (int): Most pending entries on a contfrac work list
+        cache (dict): Subchain cache hits, misses and hit_rate during the
+            block (``None`` until the block exits)
+    """
+
+    def __init__(self, targets=None):
+        self.targets = TARGETS if targets is None else targets
+        self.calls = Counter()
+        self.total = Counter()
+        self.own = Counter()
+        self.stacks = Counter()
+        self.max_depth = 0
+        self.max_worklist = 0
+        self.cache = None
+        self._stack = []
+        self._frames = []
+        self._saved = []
+
+    def _wrap(self, name, func):
+        """Return a timing wrapper for func recorded under name."""
+        stack = self._stack
+
+        def wrapper(*args, **kwargs):
+            self.calls[name] += 1
+            if name == 'contfrac._push_chain':
+                # _push_chain(stack, out, n, k) adds up to 3 entries
+                self.max_worklist = max(self.max_worklist, len(args[0]) + 3)
+            outer = name in stack
+            stack.append(name)
+            if len(stack) > self.max_depth:
+                self.max_depth = len(stack)
+            # Children subtract their time from the parent's self time
+            frame = [0.0]
+            self._frames.append(frame)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._frames.pop()
+                if self._frames:
+                    self._frames[-1][0] += elapsed
+                own = elapsed - frame[0]
+                self.own[name] += own
+                self.stacks[tuple(stack)] += own
+                if not outer:
+                    self.total[name] += elapsed
+                stack.pop()
+
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("A profile is already active")
+        # Look everything up first so a bad target patches nothing
+        saved = [(module, name, getattr(module, name))
+                 for module, names in self.targets.items() for name in names]
+        _active = self
+        info = cf.cache_info()
+        self._cache_start = info['hits'], info['misses']
+        for module, name, original in saved:
+            wrapper = self._wrap(f"{module.__name__}.{name}", original)
+            setattr(module, name, wrapper)
+        self._saved = saved
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        for module, name, original in reversed(self._saved):
+            setattr(module, name, original)
+        self._saved = []
+        _active = None
+
+        info = cf.cache_info()
+        hits = max(info['hits'] - self._cache_start[0], 0)
+        misses = max(info['misses'] - self._cache_start[1], 0)
+        lookups = hits + misses
+        self.cache = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+    def as_dict(self):
+        """
+        Return the measurements as a JSON-serializable dict.
+
+        Returns:
+            dict: 'functions' (name -> calls, total and own seconds),
+                  'max_depth', 'max_worklist' and 'cache'
+        """
+        return {
+            'functions': {
+                name: {
+                    'calls': self.calls[name],
+                    'total': self.total[name],
+                    'own': self.own[name],
+                }
+                for name in sorted(self.calls)
+            },
+            'max_depth': self.max_depth,
+            'max_worklist': self.max_worklist,
+            'cache': self.cache,
+        }
+
+    def collapsed(self):
+        """
+        Return the call stacks in collapsed format.
+
+        Returns:
+            str: One ``outer;...;inner microseconds`` line per distinct
+                 stack, sorted by stack
+        """
+        lines = []
+        for frames, seconds in sorted(self.stacks.items()):
+            micros = round(seconds * 1e6)
+            if micros > 0:
+                lines.append(f"{';'.join(frames)} {micros}")
+        return ''.join(line + '\n' for line in lines)
+
+    def write_collapsed(self, path):
+        """Write :meth:`collapsed` to a file for a flame graph tool."""
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+
+def profile(targets=None):
+    """
+    Instrument the chain engines for the duration of a with block.
+
+    Args:
+        targets (dict): Module -> function names to instrument; defaults
+            to TARGETS
+
+    Returns:
+        Profile: Context manager that collects the measurements
+
+    Raises:
+        RuntimeError: On entry, if another profile is already active
+        AttributeError: On entry, if a target function does not exist
+    """
+    return Profile(targets)
@@ -0,0 +1,150 @@
+"""
+Exact integer helpers shared by the chain engines.
+
+Everything here works on Python ints of any size and never goes through
+floats. Logarithms and power-of-two tests use int.bit_length, which reads
+the size of the integer instead of looping over its bits, so they cost the
+same for a 16-bit and a 4096-bit operand.
+"""
+
+import math as m
+
+
+def log_2(x):
+    """
+    Compute floor of log base 2.
+
+    Args:
+        x (int): Input integer
+
+    Returns:
+        int: Floor of log2(x), or 0 for x <= 1
+
+    Examples:
+        >>> log_2(1), log_2(255), log_2(256)
+        (0, 7, 8)
+    """
+    return x.bit_length() - 1 if x > 1 else 0
+
+
+def ceil_log_2(x):
+    """
+    Compute ceiling of log base 2.
+
+    Args:
+        x (int): Input integer
+
+    Returns:
+        int: Ceiling of log2(x), or 0 for x <= 1
+
+    Examples:
+        >>> ceil_log_2(1), ceil_log_2(255), ceil_log_2(256), ceil_log_2(257)
+        (0, 8, 8, 9)
+    """
+    return (x - 1).bit_length() if x > 1 else 0
+
+
+def is_power_of_two(x):
+    """
+    Return True if x is a positive power of 2 (including 1).
+
+    Examples:
+        >>> [x for x in range(10) if is_power_of_two(x)]
+        [1, 2, 4, 8]
+    """
+    return x > 0 and not x & (x - 1)
+
+
+def floor_power_of_two(x):
+    """
+    Return the largest power of 2 not above x.
+
+    Args:
+        x (int): Positive integer
+
+    Returns:
+        int: 2**floor(log2(x))
+
+    Examples:
+        >>> floor_power_of_two(1), floor_power_of_two(87)
+        (1, 64)
+    """
+    return 1 << log_2(x)
+
+
+def floor_div(a, b):
+    """Return floor(a / b) exactly, for ints of any size."""
+    return a // b
+
+
+def ceil_div(a, b):
+    """
+    Return ceil(a / b) exactly, for ints of any size.
+
+    Examples:
+        >>> ceil_div(7, 2), ceil_div(-7, 2), ceil_div(2**100 + 1, 2**50)
+        (4, -3, 1125899906842625)
+    """
+    return -(-a // b)
+
+
+def floor(num):
+    """
+    Return the floor of a number.
+
+    Exact for ``int`` and ``fractions.Fraction`` inputs. Floats carry only
+    53 bits of precision, so ``floor(n / k)`` is wrong for large operands;
+    use :func:`floor_div` instead.
+
+    Args:
+        num: Number to floor
+
+    Returns:
+        int: Floor of the input number
+    """
+    return m.floor(num)
+
+
+def ceil(num):
+    """
+    Return the ceiling of a number.
+
+    Exact for ``int`` and ``fractions.Fraction`` inputs. Floats carry only
+    53 bits of precision, so ``ceil(n / k)`` is wrong for large operands;
+    use :func:`ceil_div` instead.
+
+    Args:
+        num: Number to ceil
+
+    Returns:
+        int: Ceiling of the input number
+    """
+    return m.ceil(num)
+
+
+def _isqrt_newton(n):
+    """
+    Return the integer square root of a non-negative integer.
+
+    Newton iteration on integers, used when ``math.isqrt`` is unavailable
+    (Python < 3.8).
+
+    Args:
+        n (int): Non-negative integer
+
+    Returns:
+        int: Largest integer r such that r*r <= n
+    """
+    if n < 0:
+        raise ValueError("isqrt() argument must be nonnegative")
+    if n == 0:
+        return 0
+    x = 1 << ((n.bit_length() + 1) >> 1)
+    while True:
+        y = (x + n // x) >> 1
+        if y >= x:
+            return x
+        x = y
+
+
+isqrt = getattr(m, 'isqrt', _isqrt_newton)
@@ -0,0 +1,131 @@
+"""
+Strategy portfolio: try several k-selection strategies and keep the best.
+
+No single choice of the parameter k in contfrac.chain(n, k) is shortest for
+every n. This module evaluates a configurable set of selection strategies
+(plus a bounded sweep of k around contfrac.alpha(n)) and returns the
+shortest resulting chain. Candidates are ranked by contfrac.chain_length,
+so only the winning chain is built, and the search stops as soon as a
+candidate reaches the lower bound of ceil(log2 n) steps.
+"""
+
+import contfrac as cf
+import gcf_chain as gcf
+import intmath as im
+
+
+# Strategy name -> k-selection function
+STRATEGIES = {
+    'alpha': cf.alpha,
+    'binary': gcf.binary_k,
+    'sqrt': gcf.sqrt_k,
+    'factor': gcf.factor_k,
+    'pi': gcf.pi_k,
+    'golden': gcf.golden_k,
+    'ones': gcf.ones_k,
+}
+
+
+def lower_bound(n):
+    """
+    Return the minimum number of elements of any chain for n.
+
+    Every step at most doubles the largest element, so a chain for n needs
+    at least ceil(log2 n) steps, i.e. ceil(log2 n) + 1 elements.
+
+    Args:
+        n (int): Target integer (n >= 1)
+
+    Returns:
+        int: ceil(log2 n) + 1
+    """
+    return im.ceil_log_2(n) + 1
+
+
+def candidates(n, strategies=None, sweep=4):
+    """
+    List the distinct (label, k) pairs the portfolio tries for n.
+
+    Args:
+        n (int): Target integer
+        strategies (iterable): Names from STRATEGIES; None uses all of them
+        sweep (int): Also try alpha(n) +/- 1..sweep
+
+    Returns:
+        list: (label, k) pairs with 2 <= k < n, first occurrence of each k
+
+    Raises:
+        ValueError: If a strategy name is unknown or sweep is negative
+    """
+    if strategies is None:
+        strategies = STRATEGIES
+    if sweep < 0:
+        raise ValueError("sweep must be non-negative")
+    pairs = []
+    for name in strategies:
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {name!r}")
+        pairs.append((name, STRATEGIES[name](n)))
+    k = cf.alpha(n)
+    for d in range(1, sweep + 1):
+        pairs.append((f"alpha-{d}", k - d))
+        pairs.append((f"alpha+{d}", k + d))
+
+    seen = set()
+    result = []
+    for label, k in pairs:
+        if 2 <= k < n and k not in seen:
+            seen.add(k)
+            result.append((label, k))
+    return result
+
+
+def search(n, strategies=None, sweep=4, early_exit=True):
+    """
+    Find the shortest contfrac chain for n across a strategy portfolio.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        strategies (iterable): Names from STRATEGIES; None uses all of them
+        sweep (int): Also try alpha(n) +/- 1..sweep. Values of k that are
+            not powers of two have longer Euclid descents, so the sweep
+            dominates the cost for large n
+        early_exit (bool): Stop once a chain meets :func:`lower_bound`
+
+    Returns:
+        tuple: (chain, label, k) for the shortest chain found; ties keep
+               the earliest candidate. For n < 3, or if no candidate
+               applies, the result is (contfrac.minchain(n), 'minchain', None)
+
+    Raises:
+        ValueError: If a strategy name is unknown or sweep is negative
+
+    Examples:
+        >>> search(1000)
+        ([1, 2, 4, 8, 10, 20, 30, 60, 120, 240, 480, 960, 990, 1000], 'alpha-1', 30)
+    """
+    pairs = candidates(n, strategies, sweep)
+    if not pairs:
+        return cf.minchain(n), 'minchain', None
+    # Rank candidates by length alone and build only the winner
+    best = None
+    bound = lower_bound(n)
+    for label, k in pairs:
+        length = cf.chain_length(n, k)
+        if best is None or length < best[0]:
+            best = (length, label, k)
+            if early_exit and length <= bound:
+                break
+    _, label, k = best
+    return cf.chain(n, k), label, k
+
+
+def best_chain(n, strategies=None, sweep=4, early_exit=True):
+    """
+    Return the shortest chain for n found by :func:`search`.
+
+    Examples:
+        >>> len(best_chain(2**64 - 1)) <= len(cf.chain(2**64 - 1, cf.alpha(2**64 - 1)))
+        True
+    """
+    return search(n, strategies, sweep, early_exit)[0]
@@ -0,0 +1,228 @@
+"""
+Exact search for optimal addition and addition-subtraction chains.
+
+The constructive heuristics in contfrac and gcf_chain give short chains
+quickly but cannot say how far from optimal they are. This module finds
+provably shortest chains by iterative deepening: it tries every chain
+length from a lower bound upwards, and for each length runs a depth-first
+branch-and-bound search with the standard pruning rules:
+
+    - doubling bound: a chain whose largest element is m can reach at most
+      m * 2^r after r more steps, so branches with m * 2^r < n are cut
+      (vertical pruning)
+    - candidates are tried largest first, so the first candidate that fails
+      the doubling bound ends the loop (horizontal pruning)
+    - the last step is checked directly with a hash-set lookup for n - x
+    - addition chains are searched in ascending order only, so each chain
+      is visited once; addition-subtraction chains, which need not be
+      ascending, skip element sets already explored at the same depth and
+      never exceed 2n, so they are optimal among chains bounded by 2n
+
+The search is exponential and meant for small and medium n (a few
+thousand), e.g. to certify fixed exponents or to seed table.generate.
+"""
+
+import math as m
+
+import contfrac as cf
+import intmath as im
+
+
+def lower_bound(n, subtraction=False):
+    """
+    Return a lower bound on the number of steps of a chain for n.
+
+    Every step at most doubles the largest element, so ceil(log2 n) steps
+    are needed with or without subtraction. Addition chains also need at
+    least log2(n) + log2(v(n)) - 2.13 steps, where v(n) is the number of
+    one bits (Schönhage, 1975); iterative deepening starts from the larger
+    of the two.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        subtraction (bool): Bound addition-subtraction chains instead
+
+    Returns:
+        int: Minimum possible number of steps
+    """
+    bound = im.ceil_log_2(n)
+    if not subtraction and n > 1:
+        ones = bin(n).count('1')
+        # The small margin keeps float rounding from overshooting
+        schonhage = m.log2(n) + m.log2(ones) - 2.13 - 1e-9
+        bound = max(bound, m.ceil(schonhage))
+    return bound
+
+
+def optimal_chain(n, subtraction=False, max_steps=None):
+    """
+    Find a shortest chain for n.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        subtraction (bool): Allow steps x - y as well as x + y (with all
+            elements at most 2n)
+        max_steps (int): Give up beyond this many steps; None searches up
+            to the length of contfrac.minchain(n), which always succeeds
+
+    Returns:
+        list: Sorted chain with the minimum number of steps, or None if
+              none exists within max_steps. Subtraction chains may contain
+              elements larger than n (e.g. 32 in the chain for 31)
+
+    Raises:
+        ValueError: If n is less than 1
+
+    Examples:
+        >>> optimal_chain(23)
+        [1, 2, 4, 5, 9, 18, 23]
+        >>> optimal_chain(31, subtraction=True)
+        [1, 2, 4, 8, 16, 31, 32]
+    """
+    if n < 1:
+        raise ValueError("n must be a positive integer")
+    if n == 1:
+        return [1]
+    if max_steps is None:
+        max_steps = len(cf.minchain(n)) - 1
+    for steps in range(lower_bound(n, subtraction), max_steps + 1):
+        if subtraction:
+            result = _search_subtraction(n, steps)
+        else:
+            result = _search_addition(n, steps)
+        if result is not None:
+            return sorted(result)
+    return None
+
+
+def optimal_length(n, subtraction=False):
+    """
+    Return the minimum number of steps of a chain for n.
+
+    Examples:
+        >>> optimal_length(127)
+        10
+    """
+    return len(optimal_chain(n, subtraction)) - 1
+
+
+def is_optimal(chain, n=None, subtraction=False):
+    """
+    Certify that no chain for n has fewer steps than the given one.
+
+    Args:
+        chain (list): Chain for n (sorted or in step order)
+        n (int): Target; defaults to the largest element
+        subtraction (bool): Compare against addition-subtraction chains
+
+    Returns:
+        bool: True if the chain has the minimum number of steps
+    """
+    if n is None:
+        n = max(chain)
+    steps = len(set(chain)) - 1
+    if steps <= lower_bound(n, subtraction):
+        return True
+    return optimal_chain(n, subtraction, max_steps=steps - 1) is None
+
+
+def exact_upto(bound, subtraction=False):
+    """
+    Compute optimal chains for every n up to bound.
+
+    With subtraction=False the result can seed table.generate, whose
+    chains must end at their largest element.
+
+    Args:
+        bound (int): Largest n
+        subtraction (bool): Search addition-subtraction chains
+
+    Returns:
+        dict: n -> optimal sorted chain
+
+    Examples:
+        >>> exact_upto(7)[7]
+        [1, 2, 4, 6, 7]
+    """
+    return {n: optimal_chain(n, subtraction) for n in range(1, bound + 1)}
+
+
+def _search_addition(n, steps):
+    """Depth-first search for an ascending addition chain of given length."""
+    chain = [1]
+    members = {1}
+
+    def extend(remaining):
+        top = chain[-1]
+        if top << remaining < n:
+            return False
+        if remaining == 1:
+            # Last step: n = x + y with both in the chain
+            for x in chain:
+                if n - x in members:
+                    chain.append(n)
+                    return True
+            return False
+
+        candidates = set()
+        for i, x in enumerate(chain):
+            for y in chain[:i + 1]:
+                if top < x + y <= n:
+                    candidates.add(x + y)
+        for value in sorted(candidates, reverse=True):
+            if value << (remaining - 1) < n:
+                break
+            chain.append(value)
+            members.add(value)
+            if value == n or extend(remaining - 1):
+                return True
+            members.discard(value)
+            chain.pop()
+        return False
+
+    return chain if extend(steps) else None
+
+
+def _search_subtraction(n, steps):
+    """Depth-first search for an addition-subtraction chain of given length."""
+    chain = [1]
+    members = {1}
+    limit = 2 * n
+    seen = set()
+
+    def extend(remaining):
+        top = max(chain)
+        if top << remaining < n:
+            return False
+        if remaining == 1:
+            # Last step: n = x + y or n = x - y with both in the chain
+            for x in chain:
+                if n - x in members or x - n in members:
+                    chain.append(n)
+                    return True
+            return False
+
+        key = frozenset(members)
+        if key in seen:
+            return False
+        seen.add(key)
+
+        candidates = set()
+        for i, x in enumerate(chain):
+            for y in chain[:i + 1]:
+                for value in (x + y, abs(x - y)):
+                    if 0 < value <= limit and value not in members:
+                        candidates.add(value)
+        for value in sorted(candidates, reverse=True):
+            # Differences below top leave the largest element unchanged
+            if max(value, top) << (remaining - 1) < n:
+                break
+            chain.append(value)
+            members.add(value)
+            if value == n or extend(remaining - 1):
+                return True
+            members.discard(value)
+            chain.pop()
+        return False
+
+    return chain if extend(steps) else None
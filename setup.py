@@ -28,10 +28,11 @@ setup(
         "Programming Language :: Python :: 3.11",
     ],
     python_requires=">=3.7",
-    install_requires=[
-        "numpy>=1.20.0",
-    ],
+    install_requires=[],
     extras_require={
+        "vectorized": [
+            "numpy>=1.20.0",
+        ],
         "dev": [
             "pytest>=6.0",
             "pytest-cov",
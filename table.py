@@ -0,0 +1,285 @@
+"""
+Precomputed chain tables for small n, served from a memory-mapped file.
+
+For small n the heuristics in contfrac are not always shortest, and every
+call repeats the same decomposition. This module computes the best chain
+it can find for every n up to a bound, writes them all to a compact binary
+file, and lets contfrac answer small minchain subproblems from that file.
+The file is opened with ``mmap``, so worker processes share one copy of
+the table through the page cache instead of each loading it into memory.
+
+File layout (all integers little-endian)::
+
+    header   magic b'ACTB', version (uint16), reserved (uint16), bound (uint64)
+    offsets  bound + 1 uint32 byte offsets into the data section
+    data     chain for n = 1..bound, each as gaps between consecutive
+             sorted elements in the codec format
+"""
+
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+
+import codec
+import contfrac as cf
+import verify as vf
+
+
+_MAGIC = b'ACTB'
+_VERSION = 2
+_HEADER = struct.Struct('<4sHHQ')
+
+# Offsets are serialized as 4-byte little-endian integers
+_OFFSET = 'I' if array('I').itemsize == 4 else 'L'
+
+# Rule kinds recorded by _plan
+_BASE, _ADD_ONE, _FACTOR, _SEED = range(4)
+
+
+def _plan(bound, seeds=None):
+    """
+    Choose the shortest construction for every n <= bound.
+
+    Candidates for n are contfrac.minchain(n), chain(n - 1) + [n], and for
+    every factorization n = a*b the product chain(a) U a*chain(b), whose
+    length is len(chain(a)) + len(chain(b)) - 1. Seed chains (for example
+    from an exact search) are used when they are shorter.
+
+    Returns:
+        tuple: (lengths, kinds, args) lists indexed by n
+    """
+    lengths = [0] * (bound + 1)
+    kinds = [_BASE] * (bound + 1)
+    args = [0] * (bound + 1)
+    if bound >= 1:
+        lengths[1] = 1
+
+    for n in range(2, bound + 1):
+        # Factor candidates pushed by smaller n are already in lengths[n]
+        best, kind, arg = lengths[n], kinds[n], args[n]
+        if not best or lengths[n - 1] + 1 < best:
+            best, kind, arg = lengths[n - 1] + 1, _ADD_ONE, 0
+        size = len(cf.minchain(n))
+        if size < best:
+            best, kind, arg = size, _BASE, 0
+        if seeds is not None and n in seeds and len(seeds[n]) < best:
+            best, kind, arg = len(seeds[n]), _SEED, 0
+        lengths[n], kinds[n], args[n] = best, kind, arg
+
+        # Offer n as the first factor of every multiple n*b, b <= n
+        for b in range(2, min(n, bound // n) + 1):
+            target = n * b
+            size = best + lengths[b] - 1
+            if not lengths[target] or size < lengths[target]:
+                lengths[target], kinds[target], args[target] = size, _FACTOR, n
+    return lengths, kinds, args
+
+
+def _materialize(n, kinds, args, seeds):
+    """Build the chain for n from the plan, without recursion."""
+    # Each frame is (n, scale): emit scale * chain(n)
+    out = []
+    stack = [(n, 1)]
+    while stack:
+        x, scale = stack.pop()
+        kind = kinds[x]
+        if x == 1:
+            out.append(scale)
+        elif kind == _ADD_ONE:
+            out.append(scale * x)
+            stack.append((x - 1, scale))
+        elif kind == _FACTOR:
+            a = args[x]
+            stack.append((a, scale))
+            stack.append((x // a, scale * a))
+        elif kind == _SEED:
+            out.extend(scale * y for y in seeds[x])
+        else:
+            out.extend(scale * y for y in cf.minchain(x))
+    return sorted(set(out))
+
+
+def best_chains(bound, seeds=None):
+    """
+    Compute the table contents without writing a file.
+
+    Args:
+        bound (int): Largest n to tabulate
+        seeds (dict): Optional n -> chain overrides, used when shorter
+
+    Returns:
+        list: Chains indexed by n (index 0 is None)
+
+    Examples:
+        >>> best_chains(8)[7]
+        [1, 2, 3, 6, 7]
+    """
+    _, kinds, args = _plan(bound, seeds)
+    return [None] + [_materialize(n, kinds, args, seeds)
+                     for n in range(1, bound + 1)]
+
+
+def generate(bound, path, seeds=None):
+    """
+    Precompute chains for n = 1..bound and write them to a table file.
+
+    Generation visits every factorization of every n <= bound, so it takes
+    O(bound log bound) steps; it is meant to run once, offline.
+
+    Args:
+        bound (int): Largest n to tabulate (at least 1)
+        path (str): Output file
+        seeds (dict): Optional n -> chain overrides, used when shorter
+
+    Returns:
+        int: Total length of all tabulated chains
+
+    Raises:
+        ValueError: If bound is less than 1 or the data exceeds 4 GiB
+    """
+    if bound < 1:
+        raise ValueError("bound must be at least 1")
+    _, kinds, args = _plan(bound, seeds)
+
+    offsets = array(_OFFSET, [0])
+    data = bytearray()
+    total = 0
+    for n in range(1, bound + 1):
+        result = _materialize(n, kinds, args, seeds)
+        total += len(result)
+        data += codec.encode(result)
+        if len(data) >= 1 << 32:
+            raise ValueError("Table data exceeds 4 GiB")
+        offsets.append(len(data))
+
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, 0, bound))
+        f.write(offsets.tobytes())
+        f.write(data)
+    return total
+
+
+class ChainTable:
+    """
+    Read-only, memory-mapped view of a table file.
+
+    ``table[n]`` decodes the chain for 1 <= n <= bound on demand; nothing
+    else is read into memory. Use as a context manager or call close().
+
+    Args:
+        path (str): File written by :func:`generate`
+        verify (bool): Check each chain with verify.check_chain the first
+            time it is read, so a corrupted file cannot hand out an
+            invalid chain
+
+    Raises:
+        ValueError: If the file is not a valid chain table
+    """
+
+    def __init__(self, path, verify=True):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < _HEADER.size:
+                raise ValueError("Truncated chain table")
+            magic, version, _, bound = _HEADER.unpack_from(self._map)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("Not a chain table file")
+            self.bound = bound
+            self._offsets = _HEADER.size
+            self._data = self._offsets + 4 * (bound + 1)
+            if (self._data > len(self._map)
+                    or self._data + self._offset(bound) != len(self._map)):
+                raise ValueError("Chain table has the wrong length")
+            # One flag per n, set once its chain has been checked
+            self._verified = bytearray(bound + 1) if verify else None
+            self._digest = None
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+
+    @property
+    def digest(self):
+        """
+        Hex digest of the whole file, computed on first use.
+
+        Tables with the same bound but different chains (e.g. generated
+        with and without exact seeds) have different digests, so it can
+        key caches of chains built with the table.
+        """
+        if self._digest is None:
+            digest = hashlib.blake2b(self._map, digest_size=16)
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def _offset(self, i):
+        return struct.unpack_from('<I', self._map, self._offsets + 4 * i)[0]
+
+    def __len__(self):
+        return self.bound
+
+    def __contains__(self, n):
+        return isinstance(n, int) and 1 <= n <= self.bound
+
+    def __getitem__(self, n):
+        """
+        Return the chain for n as a sorted tuple.
+
+        Raises:
+            KeyError: If n is outside 1..bound
+            ValueError: If verification is on and the stored chain is not
+                a valid chain ending at n
+        """
+        if n not in self:
+            raise KeyError(n)
+        start = self._data + self._offset(n - 1)
+        end = self._data + self._offset(n)
+        result = tuple(codec.decode(self._map, start, end))
+        if self._verified is not None and not self._verified[n]:
+            if result[-1] != n:
+                raise ValueError(f"Corrupt chain table entry for {n}")
+            try:
+                vf.check_chain(result, n)
+            except ValueError as e:
+                raise ValueError(
+                    f"Corrupt chain table entry for {n}: {e}") from None
+            self._verified[n] = 1
+        return result
+
+    def close(self):
+        """Release the memory map."""
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load(path, verify=True):
+    """
+    Open a table file and use it for contfrac minchain leaves.
+
+    Args:
+        path (str): File written by :func:`generate`
+        verify (bool): Check chains before use (see ChainTable)
+
+    Returns:
+        ChainTable: The installed table
+    """
+    table = ChainTable(path, verify)
+    cf.set_leaf_table(table)
+    return table
+
+
+def unload():
+    """Stop using a table for contfrac leaves and close it."""
+    table = cf._table
+    cf.set_leaf_table(None)
+    if table is not None and hasattr(table, 'close'):
+        table.close()
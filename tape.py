@@ -0,0 +1,401 @@
+"""
+Step-annotated chains ("instruction tapes").
+
+contfrac.chain returns a sorted list of values, which forgets how each
+element was formed. A ChainTape records, for every element, the operation
+(add, sub or double) and the indices of its two operands, stored in
+parallel ``array`` buffers. Tapes are built by the same product / addition
+/ subtraction steps as the list chains, which already know the operation
+at the moment they run, and serialize to compact bytes so precomputed
+chains can be shipped to evaluators without re-analysis.
+"""
+
+import struct
+import sys
+from array import array
+
+import contfrac as cf
+import gcf_chain as gcf
+import intmath as im
+
+
+# Opcodes
+OP_ONE = 0     # The initial element 1
+OP_ADD = 1     # values[left] + values[right]
+OP_SUB = 2     # values[left] - values[right]
+OP_DOUBLE = 3  # 2 * values[left]
+
+OP_NAMES = {OP_ADD: 'add', OP_SUB: 'sub', OP_DOUBLE: 'double'}
+
+# Operand indices are serialized as 4-byte little-endian integers
+_INDEX = 'I' if array('I').itemsize == 4 else 'L'
+
+_MAGIC = b'ACT1'
+_HEADER = struct.Struct('<4sIII')  # magic, count, top, last
+
+
+class ChainTape:
+    """
+    Addition-subtraction chain with per-element provenance.
+
+    Element 0 is always 1. Element i > 0 equals
+    ``values[left[i]] op values[right[i]]`` where op is ``ops[i]`` and both
+    operand indices are smaller than i. Values are unique: appending a
+    value that is already present reuses its index.
+
+    Attributes:
+        values (list): Element values, in execution order
+        ops (array): Opcode per element ('B')
+        left (array): Index of the first operand per element (uint32)
+        right (array): Index of the second operand per element (uint32)
+        top (int): Index of the largest element
+        last (int): Index of the most recently appended element
+    """
+
+    __slots__ = ('values', 'ops', 'left', 'right', 'top', 'last', '_index')
+
+    def __init__(self):
+        self.values = [1]
+        self.ops = array('B', [OP_ONE])
+        self.left = array(_INDEX, [0])
+        self.right = array(_INDEX, [0])
+        self.top = 0
+        self.last = 0
+        self._index = {1: 0}
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"ChainTape({self.values!r})"
+
+    def index(self, value):
+        """
+        Return the position of a value.
+
+        Raises:
+            ValueError: If the value is not in the tape
+        """
+        try:
+            return self._index[value]
+        except KeyError:
+            raise ValueError(f"{value} is not in the chain") from None
+
+    def append(self, op, i, j):
+        """
+        Append values[i] op values[j], reusing an existing equal element.
+
+        Args:
+            op (int): OP_ADD, OP_SUB or OP_DOUBLE
+            i (int): Index of the first operand
+            j (int): Index of the second operand
+
+        Returns:
+            int: Index of the resulting element
+        """
+        if op == OP_ADD:
+            value = self.values[i] + self.values[j]
+        elif op == OP_SUB:
+            value = self.values[i] - self.values[j]
+        else:
+            value = self.values[i] << 1
+        index = self._index.get(value)
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            self.ops.append(op)
+            self.left.append(i)
+            self.right.append(j)
+            self._index[value] = index
+            if value > self.values[self.top]:
+                self.top = index
+        self.last = index
+        return index
+
+    def product(self, other):
+        """
+        Extend with every element of other multiplied by the largest element.
+
+        Mirrors contfrac.product: if x = y op z in other, then k*x is
+        recorded as k*y op k*z, with other's 1 mapped onto k.
+
+        Args:
+            other (ChainTape): Chain to scale and append
+
+        Returns:
+            ChainTape: self
+        """
+        mapping = [self.top]
+        ops, left, right = other.ops, other.left, other.right
+        for i in range(1, len(other.values)):
+            mapping.append(self.append(ops[i], mapping[left[i]],
+                                       mapping[right[i]]))
+        self.last = mapping[other.last]
+        return self
+
+    def addition(self, j):
+        """
+        Append (largest element + j), mirroring contfrac.addition.
+
+        Args:
+            j (int): Value already in the tape
+
+        Returns:
+            ChainTape: self
+        """
+        index = self.index(j)
+        op = OP_DOUBLE if index == self.top else OP_ADD
+        self.append(op, self.top, index)
+        return self
+
+    def subtraction(self, j):
+        """
+        Append (largest element - j), mirroring contfrac.subtraction.
+
+        Args:
+            j (int): Value already in the tape
+
+        Returns:
+            ChainTape: self
+        """
+        self.append(OP_SUB, self.top, self.index(j))
+        return self
+
+    def chain(self):
+        """Return the sorted values, as contfrac.chain would."""
+        return sorted(self.values)
+
+    def steps(self):
+        """
+        Return the tape in evaluator form.
+
+        Returns:
+            list: (value, left, right, op) tuples in execution order,
+                  with operand values and op in 'add', 'sub', 'double'
+        """
+        values = self.values
+        return [(values[i], values[self.left[i]], values[self.right[i]],
+                 OP_NAMES[self.ops[i]]) for i in range(1, len(values))]
+
+    def to_bytes(self):
+        """
+        Serialize to bytes.
+
+        Only the opcodes and operand indices are stored (little-endian);
+        values are recomputed on load.
+
+        Returns:
+            bytes: Serialized tape
+        """
+        left, right = self.left, self.right
+        if sys.byteorder == 'big':
+            left, right = array(_INDEX, left), array(_INDEX, right)
+            left.byteswap()
+            right.byteswap()
+        header = _HEADER.pack(_MAGIC, len(self.values), self.top, self.last)
+        return b''.join((header, self.ops.tobytes(), left.tobytes(),
+                         right.tobytes()))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Rebuild a tape from :meth:`to_bytes` output.
+
+        Args:
+            data (bytes): Serialized tape (bytes, bytearray or memoryview)
+
+        Returns:
+            ChainTape: Decoded tape
+
+        Raises:
+            ValueError: If the data is malformed
+        """
+        data = memoryview(data)
+        if len(data) < _HEADER.size:
+            raise ValueError("Truncated chain tape")
+        magic, count, top, last = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized chain tape")
+        if count < 1 or len(data) != _HEADER.size + 9 * count:
+            raise ValueError("Chain tape has the wrong length")
+
+        offset = _HEADER.size
+        ops = array('B')
+        ops.frombytes(data[offset:offset + count])
+        offset += count
+        left = array(_INDEX)
+        left.frombytes(data[offset:offset + 4 * count])
+        offset += 4 * count
+        right = array(_INDEX)
+        right.frombytes(data[offset:offset + 4 * count])
+        if sys.byteorder == 'big':
+            left.byteswap()
+            right.byteswap()
+
+        tape = cls()
+        for i in range(1, count):
+            if not (left[i] < i and right[i] < i and ops[i] in OP_NAMES):
+                raise ValueError(f"Invalid step {i} in chain tape")
+            if tape.append(ops[i], left[i], right[i]) != i:
+                raise ValueError(f"Duplicate value at step {i} in chain tape")
+        if top != tape.top or last >= count:
+            raise ValueError("Invalid chain tape header")
+        tape.last = last
+        return tape
+
+
+def _leaf(n):
+    """Return the tape for a power of 2 or 3, or None."""
+    if im.is_power_of_two(n):
+        tape = ChainTape()
+        for i in range(im.log_2(n)):
+            tape.append(OP_DOUBLE, i, i)
+        return tape
+    if n == 3:
+        tape = ChainTape()
+        tape.append(OP_DOUBLE, 0, 0)
+        tape.append(OP_ADD, 1, 0)
+        return tape
+    return None
+
+
+def _table_leaf(n):
+    """Return the tape for a chain in contfrac's leaf table, or None."""
+    table = cf._table
+    if table is None or n > table.bound:
+        return None
+    # verify imports this module, so it can only be imported once in use
+    from verify import derive_steps
+
+    tape = ChainTape()
+    for _, left, right, op in derive_steps(list(table[n])):
+        tape.append(_OPCODES[op], tape.index(left), tape.index(right))
+    return tape
+
+
+_OPCODES = {name: op for op, name in OP_NAMES.items()}
+
+# Work-list opcodes
+_MIN, _CHAIN, _JOIN = range(3)
+
+
+def chain_tape(n, k):
+    """
+    Build the tape for contfrac.chain(n, k).
+
+    Args:
+        n (int): Target integer
+        k (int): Chain generation parameter
+
+    Returns:
+        ChainTape: Tape whose sorted values equal contfrac.chain(n, k)
+
+    Examples:
+        >>> chain_tape(28, 7).chain()
+        [1, 2, 4, 6, 7, 14, 28]
+    """
+    return _build(_CHAIN, n, k)
+
+
+def minchain_tape(n):
+    """
+    Build the tape for contfrac.minchain(n).
+
+    Args:
+        n (int): Target integer
+
+    Returns:
+        ChainTape: Tape whose sorted values equal contfrac.minchain(n)
+    """
+    return _build(_MIN, n, 0)
+
+
+def _build(op, n, k):
+    """
+    Post-order work list mirroring contfrac's chain/minchain.
+
+    Like contfrac, minchain leaves up to the bound of a table installed
+    with contfrac.set_leaf_table take the tabulated chain, whose steps are
+    recovered with verify.derive_steps.
+    """
+    results = []
+    stack = [(op, n, k)]
+    while stack:
+        op, a, b = stack.pop()
+        if op == _MIN:
+            tape = _leaf(a)
+            if tape is None:
+                tape = _table_leaf(a)
+            if tape is not None:
+                results.append(tape)
+            else:
+                stack.append((_CHAIN, a, im.floor_power_of_two(a >> 1)))
+        elif op == _CHAIN:
+            q, r = divmod(a, b)
+            stack.append((_JOIN, r, 0))
+            stack.append((_MIN, q, 0))
+            stack.append((_MIN, b, 0) if r == 0 else (_CHAIN, b, r))
+        else:  # _JOIN
+            multiplier = results.pop()
+            tape = results[-1].product(multiplier)
+            if a:
+                tape.addition(a)
+    return results[0]
+
+
+def gcf_chain_tape(n, k, strategy_num):
+    """
+    Build the tape for gcf_chain.chain(n, k, strategy_num).
+
+    Args:
+        n (int): Target integer
+        k (int): Chain generation parameter
+        strategy_num (int): Strategy number for the subchains
+
+    Returns:
+        ChainTape: Tape whose sorted values equal gcf_chain.chain(...)
+    """
+    return _build_gcf(_CHAIN, n, k, strategy_num)
+
+
+def gcf_minchain_tape(n, strategy_num):
+    """
+    Build the tape for gcf_chain.minchain(n, strategy_num).
+
+    Args:
+        n (int): Target integer
+        strategy_num (int): Strategy selection (see gcf_chain.minchain)
+
+    Returns:
+        ChainTape: Tape whose sorted values equal gcf_chain.minchain(...)
+    """
+    return _build_gcf(_MIN, n, 0, strategy_num)
+
+
+def _build_gcf(op, n, k, strategy_num):
+    """Post-order work list mirroring gcf_chain's chain/minchain."""
+    results = []
+    stack = [(op, n, k)]
+    while stack:
+        op, a, b = stack.pop()
+        if op == _MIN:
+            tape = _leaf(a)
+            if tape is not None:
+                results.append(tape)
+            else:
+                stack.append((_CHAIN, a, gcf.select_k(a, strategy_num)))
+        elif op == _CHAIN:
+            parts = gcf.decompose(a, b)
+            if parts is None:
+                results.append(chain_tape(a, b))
+                continue
+            q0, u0, u1 = parts
+            stack.append((_JOIN, q0, 0))
+            stack.append((_MIN, u1, 0))
+            stack.append((_MIN, u0, 0))
+            stack.append((_MIN, q0, 0))
+        else:  # _JOIN
+            x2 = results.pop()
+            x1 = results.pop()
+            results[-1].product(x1).product(x2).addition(a)
+    return results[0]
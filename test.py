@@ -5,6 +5,7 @@ Tests cover the core functionality of the contfrac module including
 chain generation, GCF computation, and chain operations.
 """
 
+import os
 import unittest
 import contfrac as cf
 
@@ -63,6 +64,24 @@ class TestContinuedFraction(unittest.TestCase):
         expected = [1, 2, 3]
         self.assertEqual(result, expected, "Chain for 3 should be [1,2,3]")
 
+    def test_invalid_arguments(self):
+        """Test that n < 1 and k outside [1, n] raise instead of looping."""
+        for n in (0, -5):
+            with self.assertRaises(ValueError):
+                cf.minchain(n)
+            with self.assertRaises(ValueError):
+                cf.minchain_length(n)
+        for k in (0, -1, 10):
+            with self.assertRaises(ValueError):
+                cf.chain(5, k)
+            with self.assertRaises(ValueError):
+                cf.chain_length(5, k)
+        with self.assertRaises(ValueError):
+            cf.chain_lengths([87, 0])
+        self.assertEqual(cf.chain(5, 1), [1, 2, 4, 5])
+        self.assertEqual(cf.chain(5, 5), [1, 2, 4, 5])
+        self.assertEqual(cf.minchain(1), [1])
+
     def test_chain_validity(self):
         """
         Test that generated chains are valid.
@@ -102,6 +121,95 @@ class TestContinuedFraction(unittest.TestCase):
         self.assertEqual(len(result), 2, "GCF should return two coefficients")
         self.assertTrue(isinstance(result, list), "GCF should return a list")
 
+    def test_gcf_truncation(self):
+        """
+        Test that the second GCF coefficient truncates toward zero.
+
+        gcdExtended(87, 10) gives a1 = 3, a2 = -26 and -26/3 truncates to
+        -8; gcdExtended(1000, 87) gives a1 = -2, a2 = 23 and 23/-2
+        truncates to -11. Floor division would give -9 and -12.
+        """
+        self.assertEqual(cf.gcf(87, 10), [8, 30])
+        self.assertEqual(cf.gcf(1000, 87), [-174, 11])
+        self.assertEqual(cf.gcf(10, 87), [-2262, 0])
+
+    def test_gcf_large_operands(self):
+        """Test GCF coefficients against exact rationals beyond 2^53."""
+        from fractions import Fraction
+        import random
+
+        rng = random.Random(2002)
+        for bits in (64, 256, 1024):
+            n = rng.getrandbits(bits) | (1 << (bits - 1))
+            k = cf.alpha(n) + 1
+            _, a1, a2 = cf.gcdExtended(n, k)
+            u2 = 0 if a1 == 0 else -int(Fraction(a2, a1))
+            self.assertEqual(cf.gcf(n, k), sorted([a1 * k, u2]))
+
+    def test_gcd_extended_matches_recursive(self):
+        """Test Bezout coefficients against the original recursion."""
+        import random
+
+        rng = random.Random(2013)
+        pairs = [(0, 0), (0, 5), (5, 0), (240, 46), (46, 240), (-7, 3),
+                 (7, -3), (-7, -3), (12, -18), (2**900, 2**900),
+                 (2**900 + 1, 2**900)]
+        for _ in range(300):
+            bits = rng.choice([8, 64, 256, 700])
+            a, b = rng.getrandbits(bits), rng.getrandbits(bits)
+            pairs += [(a, b), (b, a), (a * 6, b * 9), (a, b >> (bits // 2))]
+        original = cf._LEHMER_THRESHOLD
+        self.addCleanup(setattr, cf, '_LEHMER_THRESHOLD', original)
+        for threshold in (original, 64, 0):
+            cf._LEHMER_THRESHOLD = threshold
+            for a, b in pairs:
+                self.assertEqual(cf.gcdExtended(a, b),
+                                 reference_gcd_extended(a, b), (a, b))
+
+    def test_gcd_extended_huge(self):
+        """Test deep Euclid descents beyond the recursion limit."""
+        import math
+        import random
+
+        f0, f1 = 0, 1
+        for _ in range(6000):
+            f0, f1 = f1, f0 + f1
+        rng = random.Random(2013)
+        for a, b in [(f1, f0), (f0, f1), (rng.getrandbits(8192),
+                                         rng.getrandbits(8192))]:
+            g, x, y = cf.gcdExtended(a, b)
+            self.assertEqual(g, math.gcd(a, b))
+            self.assertEqual(a * x + b * y, g)
+
+    def test_isqrt(self):
+        """Test isqrt and its pre-3.8 fallback against floor(sqrt(n))."""
+        import random
+        import intmath as im
+
+        rng = random.Random(2002)
+        values = list(range(200)) + [2**52 - 1, 2**53 + 1, 10**40]
+        values += [rng.getrandbits(bits) for bits in (256, 1024, 4096)]
+        values += [(1 << 2048) - 1, 1 << 2048]
+        for isqrt in (cf.isqrt, im._isqrt_newton):
+            for n in values:
+                r = isqrt(n)
+                self.assertTrue(r * r <= n < (r + 1) * (r + 1),
+                                f"{isqrt.__name__}({n}) is not floor(sqrt(n))")
+        with self.assertRaises(ValueError):
+            im._isqrt_newton(-1)
+
+    def test_chain_large_operands(self):
+        """Test that chains are exact for 256- to 4096-bit scalars."""
+        import random
+
+        rng = random.Random(2002)
+        for bits in (256, 1024, 4096):
+            n = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+            result = cf.chain(n, cf.alpha(n))
+            self.assertEqual(result[-1], n,
+                             f"{bits}-bit chain should end with n")
+            self.assertEqual(result[0], 1)
+
     def test_product_operation(self):
         """Test chain product operation."""
         v = [1, 2, 4]
@@ -114,6 +222,25 @@ class TestContinuedFraction(unittest.TestCase):
         self.assertEqual(result[:3], [1, 2, 4],
                         "Product should preserve original chain elements")
 
+    def test_product_exact(self):
+        """Test that product never overflows a machine word."""
+        v = [1, 2**40]
+        w = [1, 2**40, 2**3000 + 1]
+        result = cf.product(v, w)
+        self.assertEqual(result, [1, 2**40, 2**40, 2**80, 2**3040 + 2**40])
+        self.assertTrue(all(type(x) is int for x in result))
+
+    def test_import_without_numpy(self):
+        """Test that the core modules do not import NumPy."""
+        import subprocess
+        import sys
+
+        code = ("import sys, contfrac, gcf_chain, bos_coster, cli; "
+                "sys.exit('numpy' in sys.modules)")
+        status = subprocess.call([sys.executable, '-c', code],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(status, 0, "Importing the core modules loaded NumPy")
+
     def test_addition_operation(self):
         """Test chain addition operation."""
         v = [1, 2, 3]
@@ -166,6 +293,260 @@ class TestContinuedFraction(unittest.TestCase):
             self.assertEqual(result, expected,
                            f"log_2({n}) should be {expected}")
 
+    def test_alpha_exact(self):
+        """Test that alpha is exact for operands beyond 2^53."""
+        for bits in (54, 64, 256, 4096):
+            n = (1 << bits) - 1
+            shift = (bits - 1 + 1) // 2
+            self.assertEqual(cf.alpha(n), n >> shift)
+
+
+class TestChainCache(unittest.TestCase):
+    """Test suite for the subchain memoization layer."""
+
+    def setUp(self):
+        cf.set_cache_size(4096)
+        cf.cache_clear()
+
+    def tearDown(self):
+        cf.set_cache_size(4096)
+        cf.cache_clear()
+
+    def test_hits_and_misses(self):
+        """Test that repeated calls are served from the cache."""
+        first = cf.chain(87, cf.alpha(87))
+        misses = cf.cache_info()['misses']
+        second = cf.chain(87, cf.alpha(87))
+        info = cf.cache_info()
+
+        self.assertEqual(first, second)
+        self.assertEqual(info['misses'], misses)
+        self.assertGreaterEqual(info['hits'], 1)
+
+    def test_results_are_not_shared(self):
+        """Test that mutating a returned chain does not corrupt the cache."""
+        result = cf.minchain(87)
+        expected = list(result)
+        cf.product(result, [1, 2])
+        cf.addition(result, 5)
+        self.assertEqual(cf.minchain(87), expected)
+
+    def test_size_bound(self):
+        """Test that the cache never grows beyond its bound."""
+        cf.set_cache_size(8)
+        for n in range(5, 200):
+            cf.minchain(n)
+        self.assertLessEqual(cf.cache_info()['size'], 8)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = cf.ChainCache(maxsize=3)
+        cache.put('a', (1,))
+        cache.put('b', (1, 2))
+        cache.put('c', (1, 2, 3))
+        cache.get('a')  # 'b' is now the least recently used entry
+        cache.put('d', (1, 2, 4))
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), (1,))
+        self.assertEqual(cache.get('c'), (1, 2, 3))
+        self.assertEqual(cache.get('d'), (1, 2, 4))
+
+    def test_invalid_size(self):
+        """Test that negative or non-integer bounds are rejected."""
+        for bad in (-1, 1.5, '8', True):
+            with self.assertRaises(ValueError):
+                cf.set_cache_size(bad)
+            with self.assertRaises(ValueError):
+                cf.ChainCache(maxsize=bad)
+        self.assertEqual(cf.cache_info()['maxsize'], 4096)
+
+    def test_minchain_stored_once(self):
+        """Test that minchain(n) does not keep a second copy under (n, k)."""
+        cf.minchain(87)
+        entry = cf._cache.get((87, 32))
+        self.assertTrue(entry is None or entry is cf._cache.get(87))
+
+    def test_disable(self):
+        """Test that a zero-sized cache stores nothing."""
+        cf.set_cache_size(0)
+        cf.chain(87, cf.alpha(87))
+        info = cf.cache_info()
+        self.assertFalse(info['enabled'])
+        self.assertEqual(info['size'], 0)
+        self.assertEqual(info['hits'], 0)
+        self.assertEqual(info['misses'], 0)
+        self.assertEqual(cf.chain(87, cf.alpha(87)),
+                         [1, 2, 3, 6, 7, 10, 20, 40, 80, 87])
+
+
+def reference_gcd_extended(a, b):
+    """Recursive gcdExtended as originally written, for comparison."""
+    if a == 0:
+        return b, 0, 1
+    gcd, x1, y1 = reference_gcd_extended(b % a, a)
+    return gcd, y1 - (b // a) * x1, x1
+
+
+def reference_minchain(n):
+    """Recursive minchain as originally written, for comparison."""
+    l = n.bit_length() - 1
+    if n == 1 << l:
+        return [2**(i) for i in range(l+1)]
+    if n == 3:
+        return [1, 2, 3]
+    return reference_chain(n, 1 << cf.log_2(n >> 1))
+
+
+def reference_chain(n, k):
+    """Recursive chain as originally written, for comparison."""
+    q, r = divmod(n, k)
+    if r == 0:
+        return sorted(set(cf.product(reference_minchain(k),
+                                     reference_minchain(q))))
+    return sorted(set(cf.addition(cf.product(reference_chain(k, r),
+                                             reference_minchain(q)), r)))
+
+
+def reference_gcf_minchain(n, strategy_num):
+    """Recursive gcf_chain.minchain as originally written."""
+    l = n.bit_length() - 1
+    if n == 1 << l:
+        return [2**(i) for i in range(l+1)]
+    if n == 3:
+        return [1, 2, 3]
+    k = {1: n >> 1, 2: cf.isqrt(n)}[strategy_num]
+    return reference_gcf_chain(n, k, strategy_num)
+
+
+def reference_gcf_chain(n, k, strategy_num):
+    """Recursive gcf_chain.chain as originally written."""
+    import math
+    u = cf.gcf(n, k)
+    if u[0] == 0 or u[1] == 0:
+        return cf.chain(n, k)
+    q0 = math.gcd(n, k)
+    x0 = reference_gcf_minchain(abs(q0), strategy_num)
+    x1 = cf.product(x0, reference_gcf_minchain(abs(u[0]), strategy_num))
+    x2 = cf.product(x1, reference_gcf_minchain(abs(u[1]), strategy_num))
+    if u[0] < 0:
+        x2 = cf.subtraction(x2, q0)
+    else:
+        x2 = cf.addition(x2, q0)
+    return sorted(set(x2))
+
+
+class TestChainLength(unittest.TestCase):
+    """Test suite for the length-only chain mode."""
+
+    def tearDown(self):
+        cf.set_cache_size(4096)
+        cf.cache_clear()
+
+    def test_matches_built_chains(self):
+        """Test lengths against len() of the built chains, cached or not."""
+        import random
+
+        rng = random.Random(2400)
+        numbers = list(range(1, 700))
+        numbers += [rng.getrandbits(bits) | 1 for bits in (64, 256, 1024, 2048)
+                    for _ in range(4)]
+        for size in (4096, 0):
+            cf.set_cache_size(size)
+            cf.cache_clear()
+            for n in numbers:
+                self.assertEqual(cf.minchain_length(n), len(cf.minchain(n)), n)
+                for k in (1, 2, 3, 7, cf.alpha(n), rng.randint(1, n), n):
+                    if 1 <= k <= n:
+                        self.assertEqual(cf.chain_length(n, k),
+                                         len(cf.chain(n, k)), (n, k))
+
+    def test_batch_variants(self):
+        """Test chain_lengths and minchain_lengths."""
+        numbers = [87, 1000, 2**64 - 1, 2**127 - 1, 87]
+        self.assertEqual(cf.chain_lengths(numbers),
+                         [len(cf.chain(n, cf.alpha(n))) for n in numbers])
+        self.assertEqual(cf.chain_lengths(numbers, 7),
+                         [len(cf.chain(n, 7)) for n in numbers])
+        self.assertEqual(cf.minchain_lengths(numbers),
+                         [len(cf.minchain(n)) for n in numbers])
+        self.assertEqual(cf.minchain_lengths([]), [])
+
+    def test_no_chain_cache_use(self):
+        """Test that lengths are computed without building chains."""
+        cf.cache_clear()
+        cf.chain_lengths([2**512 - 1, 2**256 + 12345])
+        info = cf.cache_info()
+        self.assertEqual((info['size'], info['hits'], info['misses']),
+                         (0, 0, 0))
+
+    def test_table_leaves(self):
+        """Test that tabulated leaves count with their table lengths."""
+        import random
+        import tempfile
+        import table as tb
+
+        handle, path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.addCleanup(tb.unload)
+        tb.generate(2000, path)
+        n = random.Random(2401).getrandbits(512)
+        before = cf.minchain_length(n)
+        tb.load(path)
+        self.assertEqual(cf.minchain_length(n), len(cf.minchain(n)))
+        self.assertEqual(cf.chain_length(n, cf.alpha(n)),
+                         len(cf.chain(n, cf.alpha(n))))
+        self.assertLess(cf.minchain_length(n), before)
+        tb.unload()
+        self.assertEqual(cf.minchain_length(n), before)
+
+
+class TestIterativeBuilder(unittest.TestCase):
+    """Test suite for the non-recursive chain builders."""
+
+    def test_matches_recursive_contfrac(self):
+        """Test that contfrac chains equal the recursive construction."""
+        for size in (4096, 0):
+            cf.set_cache_size(size)
+            cf.cache_clear()
+            for n in range(2, 600):
+                self.assertEqual(cf.minchain(n), reference_minchain(n))
+                for k in (2, 3, 7, cf.alpha(n), n):
+                    if k <= n:
+                        self.assertEqual(cf.chain(n, k),
+                                         reference_chain(n, k), (n, k))
+        cf.set_cache_size(4096)
+
+    def test_matches_recursive_gcf_chain(self):
+        """Test that gcf_chain chains equal the recursive construction."""
+        import gcf_chain as gcf
+        for n in range(1, 400):
+            for strategy_num in (1, 2):
+                expected = reference_gcf_minchain(n, strategy_num)
+                # The original missed n where the gcf identity fails; those
+                # now fall back to contfrac.chain
+                if expected[-1] != n:
+                    continue
+                self.assertEqual(gcf.minchain(n, strategy_num), expected,
+                                 (n, strategy_num))
+
+    def test_no_recursion_error(self):
+        """Test that 4096-bit chains build under a tiny recursion limit."""
+        import random
+        import sys
+        import gcf_chain as gcf
+
+        n = random.Random(2003).getrandbits(4096) | (1 << 4095) | 1
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            cf.cache_clear()
+            self.assertEqual(cf.chain(n, cf.alpha(n))[-1], n)
+            self.assertEqual(gcf.minchain(n, 1)[-1], n)
+        finally:
+            sys.setrecursionlimit(limit)
+
 
 class TestGCFChain(unittest.TestCase):
     """Test suite for GCF chain with strategies."""
@@ -178,6 +559,307 @@ class TestGCFChain(unittest.TestCase):
         except ImportError:
             self.fail("Failed to import gcf_chain module")
 
+    def test_k_selectors(self):
+        """Test the k-selection strategies against their definitions."""
+        import gcf_chain as gcf
+
+        self.assertEqual(gcf.binary_k(1000), 500)
+        self.assertEqual(gcf.sqrt_k(1000), 31)
+        self.assertEqual(gcf.factor_k(1001), 143)
+        self.assertEqual(gcf.factor_k(1009), 504)  # prime: binary fallback
+        self.assertEqual(gcf.pi_k(1000), 318)
+        self.assertEqual(gcf.golden_k(1000), 618)
+        self.assertEqual(gcf.ones_k(1000), 31)
+        self.assertEqual(gcf.golden_k(10**12), 618033988749)
+        for f in (gcf.binary_k, gcf.sqrt_k, gcf.factor_k, gcf.pi_k,
+                  gcf.golden_k, gcf.ones_k):
+            for n in range(5, 2000):
+                self.assertTrue(2 <= f(n) < n, (f.__name__, n))
+
+    def test_registry_lazy(self):
+        """Test that strategies are only evaluated for non-special subchains."""
+        import gcf_chain as gcf
+
+        seen = []
+
+        def spy(n):
+            seen.append(n)
+            return n >> 1
+
+        gcf.register_strategy('spy', spy)
+        self.addCleanup(gcf._STRATEGIES.pop, 'spy')
+        self.assertEqual(gcf.minchain(1000, 'spy'), gcf.minchain(1000, 1))
+        self.assertNotIn(1000, gcf.minchain(1024, 'spy')[:-1])
+        self.assertTrue(seen)
+        self.assertFalse([n for n in seen if n & (n - 1) == 0 or n == 3])
+        seen.clear()
+        gcf.minchain(2**40, 'spy')
+        gcf.minchain(3, 'spy')
+        self.assertEqual(seen, [])
+
+    def test_registry_errors(self):
+        """Test registration and dispatch errors."""
+        import gcf_chain as gcf
+
+        self.assertEqual(gcf.strategies()[:3], [1, 2, 3])
+        with self.assertRaises(ValueError):
+            gcf.minchain(100, 99)
+        with self.assertRaises(ValueError):
+            gcf.chain(100, 7, [1])
+        with self.assertRaises(ValueError):
+            gcf.register_strategy(1, gcf.sqrt_k)
+        with self.assertRaises(ValueError):
+            gcf.register_strategy('bad', 42)
+        gcf.register_strategy('bad', lambda n: n)
+        self.addCleanup(gcf._STRATEGIES.pop, 'bad')
+        with self.assertRaises(ValueError):
+            gcf.minchain(100, 'bad')
+        gcf.register_strategy('bad', gcf.binary_k, replace=True)
+        self.assertEqual(gcf.minchain(100, 'bad'), gcf.minchain(100, 1))
+
+    def test_valid_strategies(self):
+        """Test that the binary and factor strategies yield valid chains."""
+        import evaluator as ev
+        import gcf_chain as gcf
+        import tape as tp
+
+        for strategy in (1, 3):
+            for n in range(2, 1000):
+                result = gcf.minchain(n, strategy)
+                self.assertEqual(result[-1], n)
+                ev.schedule(result)
+                self.assertEqual(tp.gcf_minchain_tape(n, strategy).chain(),
+                                 result)
+
+    def test_growing_subproblems_terminate(self):
+        """Test that every strategy yields a valid chain ending at n."""
+        import evaluator as ev
+        import gcf_chain as gcf
+        import tape as tp
+        import verify
+
+        # gcf(29, pi_k(29)) has a coefficient of -36
+        self.assertEqual(cf.gcf(29, gcf.pi_k(29)), [-36, 3])
+        # gcf(594, pi_k(594)) does not rebuild 594
+        self.assertIsNone(gcf.decompose(594, gcf.pi_k(594)))
+        for strategy in gcf.strategies():
+            for n in range(2, 1000):
+                result = gcf.minchain(n, strategy)
+                self.assertEqual(result[-1], n)
+                self.assertTrue(verify.verify_chain(result, n))
+                self.assertEqual(tp.gcf_minchain_tape(n, strategy).chain(),
+                                 result)
+            for bits in (64, 256):
+                n = (1 << bits) - 12345
+                result = gcf.minchain(n, strategy)
+                self.assertEqual(result[-1], n)
+                self.assertTrue(verify.verify_chain(result, n))
+                ev.schedule(result)
+
+
+class TestPortfolio(unittest.TestCase):
+    """Test suite for the strategy portfolio search."""
+
+    def test_never_worse_than_alpha(self):
+        """Test that the portfolio chain is valid and at most alpha's length."""
+        import evaluator as ev
+        import portfolio as pf
+
+        for n in range(4, 1500):
+            result, label, k = pf.search(n)
+            self.assertEqual(result[-1], n)
+            self.assertEqual(result, cf.chain(n, k))
+            self.assertLessEqual(len(result), len(cf.chain(n, cf.alpha(n))))
+            ev.schedule(result)
+
+    def test_small_inputs(self):
+        """Test that inputs without candidates fall back to minchain."""
+        import portfolio as pf
+
+        for n in (1, 2):
+            self.assertEqual(pf.search(n), (cf.minchain(n), 'minchain', None))
+
+    def test_candidates(self):
+        """Test candidate selection, deduplication and the sweep."""
+        import portfolio as pf
+
+        pairs = pf.candidates(1000, ['alpha', 'sqrt', 'binary'], sweep=1)
+        self.assertEqual(pairs, [('alpha', 31), ('binary', 500),
+                                 ('alpha-1', 30), ('alpha+1', 32)])
+        with self.assertRaises(ValueError):
+            pf.candidates(1000, ['nope'])
+        with self.assertRaises(ValueError):
+            pf.candidates(1000, sweep=-1)
+
+    def test_early_exit(self):
+        """Test that search stops at the log2 lower bound."""
+        import portfolio as pf
+
+        n = 3 * 2**20
+        self.assertEqual(pf.lower_bound(n), 23)
+        result, label, _ = pf.search(n)
+        self.assertEqual(len(result), pf.lower_bound(n))
+        self.assertEqual(label, 'alpha')
+        self.assertEqual(pf.search(2**64 - 1, sweep=0)[0],
+                         pf.best_chain(2**64 - 1, sweep=0))
+
+    def test_large_input(self):
+        """Test a 1024-bit search against the alpha chain."""
+        import random
+        import portfolio as pf
+
+        n = random.Random(11).getrandbits(1024) | 1 << 1023
+        result = pf.best_chain(n, sweep=1)
+        self.assertEqual(result[-1], n)
+        self.assertLessEqual(len(result), len(cf.chain(n, cf.alpha(n))))
+
+
+class TestBatch(unittest.TestCase):
+    """Test suite for batch chain generation."""
+
+    numbers = [29, 87, 1000, 2**64 - 1, 3, 16] + list(range(100, 160))
+
+    def test_serial_matches_single_calls(self):
+        """Test that the in-process path equals one call per scalar."""
+        import batch
+        result = list(batch.chains_batch(self.numbers, workers=1))
+        expected = [(n, cf.chain(n, cf.alpha(n))) for n in self.numbers]
+        self.assertEqual(result, expected)
+
+    def test_pool_preserves_order(self):
+        """Test that pooled results come back in input order."""
+        import batch
+        import gcf_chain as gcf
+        result = list(batch.chains_batch(iter(self.numbers), strategy=1,
+                                         workers=2, chunksize=7))
+        expected = [(n, gcf.minchain(n, 1)) for n in self.numbers]
+        self.assertEqual(result, expected)
+
+    def test_pool_unordered(self):
+        """Test that unordered mode yields every result exactly once."""
+        import batch
+        result = list(batch.chains_batch(self.numbers, strategy='minchain',
+                                         workers=2, chunksize=5,
+                                         ordered=False))
+        expected = [(n, cf.minchain(n)) for n in self.numbers]
+        self.assertEqual(sorted(result), sorted(expected))
+
+    def test_registered_strategies(self):
+        """Test that every gcf_chain strategy, custom ones too, is accepted."""
+        import asyncio
+        import aio
+        import batch
+        import gcf_chain as gcf
+
+        gcf.register_strategy('third', lambda n: n // 3)
+        self.addCleanup(gcf._STRATEGIES.pop, 'third')
+        for strategy in gcf.strategies():
+            result = list(batch.chains_batch(self.numbers, strategy=strategy,
+                                             workers=1))
+            self.assertEqual(result, [(n, gcf.minchain(n, strategy))
+                                      for n in self.numbers])
+        self.assertEqual(asyncio.run(aio.achain(1000, 8)),
+                         gcf.minchain(1000, 8))
+
+    def test_invalid_arguments(self):
+        """Test that bad strategies and chunk sizes fail before any work."""
+        import batch
+        with self.assertRaises(ValueError):
+            batch.chains_batch([87], strategy=9)
+        with self.assertRaises(ValueError):
+            batch.chains_batch([87], strategy=True)
+        with self.assertRaises(ValueError):
+            batch.chains_batch([87], chunksize=0)
+
+
+class TestBatchCommand(unittest.TestCase):
+    """Test suite for the streaming `cli.py batch` command."""
+
+    def run_cli(self, stdin, *args):
+        """Run cli.py with the given stdin and return the completed process."""
+        import subprocess
+        import sys
+        here = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(
+            [sys.executable, os.path.join(here, 'cli.py'), 'batch'] + list(args),
+            input=stdin, capture_output=True, text=True, cwd=here)
+
+    def test_read_numbers(self):
+        """Test line parsing, skipping blanks and comments."""
+        import cli
+        lines = ['87\n', '\n', '# comment\n', ' 29 \n']
+        self.assertEqual(list(cli.read_numbers(lines)), [87, 29])
+        with self.assertRaises(ValueError):
+            list(cli.read_numbers(['87\n', 'abc\n']))
+        with self.assertRaises(ValueError):
+            list(cli.read_numbers(['0\n']))
+
+    def test_jsonl_output(self):
+        """Test that every input line yields one JSON record."""
+        import json
+        proc = self.run_cli('87\n29\n1000\n')
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        records = [json.loads(line) for line in proc.stdout.splitlines()]
+        self.assertEqual([r['n'] for r in records], [87, 29, 1000])
+        self.assertEqual(records[0]['chain'],
+                         [1, 2, 3, 6, 7, 10, 20, 40, 80, 87])
+        self.assertEqual(records[0]['length'], 10)
+        self.assertEqual(records[0]['strategy'], 'alpha')
+
+    def test_gcf_strategies(self):
+        """Test that -s accepts every registered gcf_chain strategy."""
+        import json
+        import gcf_chain as gcf
+
+        proc = self.run_cli('87\n', '-s', '4')
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(json.loads(proc.stdout)['chain'], gcf.minchain(87, 4))
+
+    def test_archive_output(self):
+        """Test the binary archive format and its output file check."""
+        import tempfile
+        import codec
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'chains.car')
+            proc = self.run_cli('87\n29\n1000\n', '-f', 'archive',
+                                '-o', path, '-w', '2', '-c', '1')
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            with codec.Archive(path) as archive:
+                self.assertEqual(list(archive),
+                                 [cf.chain(n, cf.alpha(n))
+                                  for n in (87, 29, 1000)])
+            # Signed engines also archive chains whose last element is n
+            for strategy in ('wnaf', 'fractional'):
+                proc = self.run_cli('31\n87\n', '-f', 'archive', '-o', path,
+                                    '-s', strategy)
+                self.assertEqual(proc.returncode, 0, proc.stderr)
+                with codec.Archive(path) as archive:
+                    self.assertEqual([c[-1] for c in archive], [31, 87])
+        proc = self.run_cli('87\n', '-f', 'archive')
+        self.assertNotEqual(proc.returncode, 0)
+        self.assertIn('output file', proc.stderr)
+
+    def test_csv_output_with_workers(self):
+        """Test CSV output from a worker pool keeps input order."""
+        import csv
+        import gcf_chain as gcf
+        proc = self.run_cli('87\n29\n1000\n', '-f', 'csv', '-s', '1',
+                            '-w', '2', '-c', '1')
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        rows = list(csv.DictReader(proc.stdout.splitlines()))
+        self.assertEqual([int(r['n']) for r in rows], [87, 29, 1000])
+        for row in rows:
+            chain = [int(x) for x in row['chain'].split()]
+            self.assertEqual(chain, gcf.minchain(int(row['n']), 1))
+            self.assertEqual(int(row['length']), len(chain))
+
+    def test_invalid_input(self):
+        """Test that a malformed line is reported with its line number."""
+        proc = self.run_cli('87\nabc\n')
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn('line 2', proc.stderr)
+
 
 class TestBOSCoster(unittest.TestCase):
     """Test suite for Bos-Coster NAF implementation."""
@@ -213,6 +895,1634 @@ class TestBOSCoster(unittest.TestCase):
                     self.assertEqual(naf[i + 1], 0,
                                    f"NAF of {n} should have no adjacent non-zeros")
 
+    def test_naf_matches_recursive_definition(self):
+        """Test the iterative NAF against the recursive definition."""
+        import bos_coster as bc
+
+        def recursive_naf(x):
+            if x == 0:
+                return []
+            z = 0 if x % 2 == 0 else 2 - (x % 4)
+            return recursive_naf((x - z) // 2) + [z]
+
+        for n in list(range(-300, 300)) + [587257, 2**200 - 1, -(3**90)]:
+            self.assertEqual(bc.NAF(n), recursive_naf(n), n)
+
+    def test_naf_large(self):
+        """Test a 4096-bit NAF under a small recursion limit."""
+        import random
+        import sys
+        import bos_coster as bc
+
+        n = random.Random(2007).getrandbits(4096) | (1 << 4095)
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            naf = bc.NAF(n)
+        finally:
+            sys.setrecursionlimit(limit)
+        self.assertIn(len(naf), (4096, 4097))
+        self.assertEqual(bc.NAF_inverse(naf), n)
+
+    def test_wnaf_properties(self):
+        """Test digit bounds, window sparsity and round trips of wNAF."""
+        import random
+        import bos_coster as bc
+
+        rng = random.Random(2007)
+        numbers = [1, 2, 7, 1122, 587257] + [rng.getrandbits(300)
+                                            for _ in range(20)]
+        for w in (2, 3, 4, 5, 8):
+            for n in numbers:
+                digits = bc.wNAF(n, w)
+                self.assertEqual(bc.NAF_inverse(digits), n)
+                self.assertNotEqual(digits[0], 0)
+                for i, d in enumerate(digits):
+                    if d != 0:
+                        self.assertEqual(d % 2, 1)
+                        self.assertLess(abs(d), 2 ** (w - 1))
+                        self.assertTrue(all(x == 0 for x in digits[i + 1:i + w]),
+                                        f"wNAF({n}, {w}) window violated")
+
+    def test_wnaf_compact(self):
+        """Test the array output of wNAF."""
+        import bos_coster as bc
+
+        self.assertEqual(bc.wNAF(1122, 3, compact=True).typecode, 'b')
+        self.assertEqual(bc.wNAF(1122, 12, compact=True).typecode, 'h')
+        self.assertEqual(list(bc.NAF(13, compact=True)), [1, 0, -1, 0, 1])
+        self.assertEqual(bc.NAF_inverse(bc.wNAF(-1122, 5, compact=True)), -1122)
+        with self.assertRaises(ValueError):
+            bc.wNAF(13, 1)
+
+    def test_naf_inverse(self):
+        """Test NAF_inverse on known digit strings."""
+        import bos_coster as bc
+
+        self.assertEqual(bc.NAF_inverse([]), 0)
+        self.assertEqual(bc.NAF_inverse([1, 0, -1, 0, 1]), 13)
+        self.assertEqual(bc.NAF_inverse([-1, 0, 1]), -3)
+        self.assertEqual(bc.NAF_inverse([1, 0, 0, 0, 0, 3, 0, 0, 0, 1, 0]), 1122)
+
+
+class TestBosCosterSequence(unittest.TestCase):
+    """Test suite for the Bos-Coster multi-exponent engine."""
+
+    def assertValidSequence(self, result, targets):
+        """Check that every step is a sum of two earlier values."""
+        sequence = result['sequence']
+        self.assertEqual(sequence, sorted(set(sequence)))
+        self.assertEqual(sequence[0], 1)
+        self.assertTrue(set(targets) <= set(sequence))
+        members = set(sequence)
+        for value, left, right, op in result['steps']:
+            self.assertEqual(value, left + right)
+            self.assertIn(left, members)
+            self.assertIn(right, members)
+            self.assertLess(max(left, right), value)
+            self.assertEqual(op, 'double' if left == right else 'add')
+        self.assertEqual(len(result['steps']), len(sequence) - 1)
+        ops = result['operations']
+        self.assertEqual(ops['total'], ops['additions'] + ops['doublings'])
+        self.assertEqual(ops['total'], len(result['steps']))
+
+    def test_small_targets(self):
+        """Test the joint sequence for 87 and 29."""
+        import bos_coster as bc
+        result = bc.addition_sequence([87, 29])
+        self.assertEqual(result['sequence'], [1, 2, 3, 5, 8, 16, 24, 29, 58, 87])
+        self.assertValidSequence(result, [87, 29])
+
+    def test_single_and_duplicate_targets(self):
+        """Test degenerate target sets."""
+        import bos_coster as bc
+        self.assertEqual(bc.addition_sequence([1])['sequence'], [1])
+        self.assertEqual(bc.addition_sequence([87, 87])['sequence'],
+                         cf.minchain(87))
+        with self.assertRaises(ValueError):
+            bc.addition_sequence([])
+        with self.assertRaises(ValueError):
+            bc.addition_sequence([5, 0])
+
+    def test_fewer_operations_than_separate_chains(self):
+        """Test that a joint sequence beats two separate chains."""
+        import random
+        import bos_coster as bc
+
+        rng = random.Random(2008)
+        for bits in (64, 256):
+            targets = [rng.getrandbits(bits) | 1, rng.getrandbits(bits) | 1,
+                       rng.getrandbits(bits) | 1]
+            result = bc.addition_sequence(targets)
+            self.assertValidSequence(result, targets)
+            separate = sum(len(cf.chain(n, cf.alpha(n))) - 1 for n in targets)
+            self.assertLess(result['operations']['total'], separate)
+
+
+class TestEvaluator(unittest.TestCase):
+    """Test suite for chain evaluation in concrete groups."""
+
+    # secp256k1
+    P = 2**256 - 2**32 - 977
+    G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+         0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+    def test_modular_matches_pow(self):
+        """Test modular exponentiation against pow for both engines."""
+        import evaluator as ev
+        import gcf_chain as gcf
+
+        group = ev.ModularGroup(2**127 - 1)
+        for n in list(range(2, 300)) + [2**64 - 1, 26235947428953663183191]:
+            expected = pow(7, n, group.modulus)
+            self.assertEqual(ev.evaluate(cf.chain(n, cf.alpha(n)), 7, group),
+                             expected)
+            self.assertEqual(ev.evaluate(gcf.minchain(n, 1), 7, group),
+                             expected)
+
+    def test_subtraction_step(self):
+        """Test that subtraction steps use the group inverse."""
+        import evaluator as ev
+
+        steps = ev.schedule([1, 2, 4, 8, 16, 32, 31], n=31)
+        self.assertEqual(steps[-1], (31, 32, 1, 'sub'))
+        group = ev.ModularGroup(1000003)
+        self.assertEqual(ev.run(steps, 3, group), pow(3, 31, 1000003))
+
+    def test_signed_chain_schedule(self):
+        """Test that long wNAF chains schedule in near-linear time."""
+        import random
+        import time
+        import evaluator as ev
+        import window as win
+
+        group = ev.ModularGroup(2**127 - 1)
+        n = random.Random(2026).getrandbits(2048) | (1 << 2047)
+        chain = win.wnaf_chain(n)
+        start = time.perf_counter()
+        steps = ev.schedule(chain)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn('sub', {step[3] for step in steps})
+        self.assertEqual(ev.run(steps, 7, group), pow(7, n, group.modulus))
+
+    def test_unneeded_steps_dropped(self):
+        """Test that elements the target does not depend on are skipped."""
+        import evaluator as ev
+
+        steps = ev.schedule([1, 2, 3, 4, 5, 8, 16, 17], n=17)
+        self.assertEqual([s[0] for s in steps], [2, 4, 8, 16, 17])
+
+    def test_invalid_chain(self):
+        """Test that underivable elements are rejected."""
+        import evaluator as ev
+
+        with self.assertRaises(ValueError):
+            ev.schedule([1, 2, 7, 14])
+        with self.assertRaises(ValueError):
+            ev.schedule([2, 4])
+
+    def test_intermediates_released(self):
+        """Test that the live working set stays well below the chain length."""
+        import evaluator as ev
+
+        n = 2**64 - 1
+        steps = ev.schedule(cf.chain(n, cf.alpha(n)))
+        last_use = {}
+        for i, (_, left, right, _) in enumerate(steps):
+            last_use[left] = last_use[right] = i
+        live, peak = {1}, 1
+        for i, (value, left, right, _) in enumerate(steps):
+            live.add(value)
+            live -= {x for x in (left, right) if last_use[x] == i}
+            peak = max(peak, len(live))
+        self.assertLess(peak, len(steps))
+        self.assertEqual(ev.run(steps, 5, ev.ModularGroup(10**9 + 7)),
+                         pow(5, n, 10**9 + 7))
+
+    def test_elliptic_curve(self):
+        """Test scalar multiplication on secp256k1 against double-and-add."""
+        import random
+        import evaluator as ev
+
+        curve = ev.EllipticCurve(0, 7, self.P)
+        k = random.Random(2009).getrandbits(256)
+        result = ev.evaluate(cf.chain(k, cf.alpha(k)), self.G, curve)
+
+        expected = None
+        for bit in bin(k)[2:]:
+            expected = curve.square(expected)
+            if bit == '1':
+                expected = curve.mul(expected, self.G)
+        self.assertEqual(result, expected)
+        self.assertTrue(curve.contains(result))
+        self.assertIsNone(curve.mul(self.G, curve.inverse(self.G)))
+
+
+class TestChainTape(unittest.TestCase):
+    """Test suite for step-annotated chain tapes."""
+
+    def assertWellFormed(self, tape):
+        """Every element must be derived from strictly earlier ones."""
+        import tape as tp
+
+        for i in range(1, len(tape)):
+            left, right = tape.left[i], tape.right[i]
+            self.assertLess(left, i)
+            self.assertLess(right, i)
+            x, y = tape.values[left], tape.values[right]
+            expected = {tp.OP_ADD: x + y, tp.OP_SUB: x - y,
+                        tp.OP_DOUBLE: 2 * x}[tape.ops[i]]
+            self.assertEqual(tape.values[i], expected)
+
+    def test_matches_chains(self):
+        """Test that tape values equal the list chains."""
+        import gcf_chain as gcf
+        import tape as tp
+
+        for n in range(2, 600):
+            k = cf.alpha(n)
+            tape = tp.chain_tape(n, k)
+            self.assertEqual(tape.chain(), cf.chain(n, k))
+            self.assertEqual(tape.values[tape.last], n)
+            self.assertWellFormed(tape)
+            self.assertEqual(tp.minchain_tape(n).chain(), cf.minchain(n))
+            tape = tp.gcf_minchain_tape(n, 1)
+            self.assertEqual(tape.chain(), gcf.minchain(n, 1))
+            self.assertWellFormed(tape)
+
+    def test_large_input(self):
+        """Test a 2048-bit tape against the list chain."""
+        import random
+        import tape as tp
+
+        n = random.Random(10).getrandbits(2048) | 1 << 2047
+        tape = tp.chain_tape(n, cf.alpha(n))
+        self.assertEqual(tape.chain(), cf.chain(n, cf.alpha(n)))
+        self.assertWellFormed(tape)
+
+    def test_table_leaves(self):
+        """Test that tapes take the same tabulated leaves as contfrac."""
+        import random
+        import tempfile
+        import table as tb
+        import tape as tp
+
+        handle, path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.addCleanup(tb.unload)
+        tb.generate(2000, path)
+        tb.load(path)
+        big = random.Random(2014).getrandbits(300) | 1 << 299
+        for n in list(range(5, 3000)) + [big]:
+            k = cf.alpha(n)
+            tape = tp.chain_tape(n, k)
+            self.assertEqual(tape.chain(), cf.chain(n, k), n)
+            self.assertEqual(tp.minchain_tape(n).chain(), cf.minchain(n), n)
+        self.assertWellFormed(tape)
+
+    def test_serialization_round_trip(self):
+        """Test that to_bytes/from_bytes preserve the tape."""
+        import tape as tp
+
+        n = 2**127 - 1
+        tape = tp.chain_tape(n, cf.alpha(n))
+        data = tape.to_bytes()
+        self.assertEqual(len(data), 16 + 9 * len(tape))
+        for buffer in (data, bytearray(data), memoryview(data)):
+            copy = tp.ChainTape.from_bytes(buffer)
+            self.assertEqual(copy.values, tape.values)
+            self.assertEqual(copy.steps(), tape.steps())
+            self.assertEqual((copy.top, copy.last), (tape.top, tape.last))
+
+    def test_malformed_bytes(self):
+        """Test that corrupted serializations raise ValueError."""
+        import tape as tp
+
+        tape = tp.chain_tape(87, cf.alpha(87))
+        data = tape.to_bytes()
+        forward = bytearray(data)
+        forward[16 + len(tape) + 4 * 3] = 9  # left[3] points forward
+        for bad in (b'', data[:10], b'XXXX' + data[4:], data[:-1],
+                    bytes(forward)):
+            with self.assertRaises(ValueError):
+                tp.ChainTape.from_bytes(bad)
+
+    def test_gcf_identity_fallback(self):
+        """Test that gcf tapes fall back where the gcf identity fails."""
+        import gcf_chain as gcf
+        import tape as tp
+
+        self.assertIsNone(gcf.decompose(1314, gcf.sqrt_k(1314)))
+        tape = tp.gcf_minchain_tape(1314, 2)
+        self.assertEqual(tape.chain(), gcf.minchain(1314, 2))
+        self.assertEqual(tape.values[tape.top], 1314)
+
+    def test_evaluate_tape(self):
+        """Test that the evaluator runs tapes without re-deriving steps."""
+        import evaluator as ev
+        import tape as tp
+
+        group = ev.ModularGroup(2**61 - 1)
+        for n in (2, 3, 87, 1000, 2**64 - 1):
+            tape = tp.chain_tape(n, cf.alpha(n))
+            self.assertEqual(ev.schedule(tape)[-1][0], n)
+            self.assertEqual(ev.evaluate(tape, 7, group),
+                             pow(7, n, group.modulus))
+        tape = tp.gcf_minchain_tape(1000, 1)
+        self.assertEqual(ev.evaluate(tape, 7, group), pow(7, 1000, group.modulus))
+
+
+class TestChainTable(unittest.TestCase):
+    """Test suite for precomputed, memory-mapped chain tables."""
+
+    # Optimal addition chain lengths for n = 1..32 (OEIS A003313)
+    OPTIMAL = [0, 1, 2, 2, 3, 3, 4, 3, 4, 4, 5, 4, 5, 5, 5, 4,
+               5, 5, 6, 5, 6, 6, 6, 5, 6, 6, 6, 6, 7, 6, 7, 5]
+
+    def setUp(self):
+        import tempfile
+        import table as tb
+
+        handle, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(tb.unload)
+
+    def test_best_chains(self):
+        """Test that tabulated chains are valid and never longer than minchain."""
+        import evaluator as ev
+        import table as tb
+
+        chains = tb.best_chains(3000)
+        for n in range(2, 3001):
+            self.assertEqual(chains[n][-1], n)
+            self.assertLessEqual(len(chains[n]), len(cf.minchain(n)))
+            ev.schedule(chains[n])
+        # 23 = 20 + 3 is not reachable by the add-one and factor rules
+        self.assertEqual([n for n in range(1, 33)
+                          if len(chains[n]) - 1 != self.OPTIMAL[n - 1]], [23])
+
+    def test_seeds(self):
+        """Test that shorter seed chains replace the planned ones."""
+        import table as tb
+
+        chains = tb.best_chains(50, seeds={23: [1, 2, 3, 5, 10, 20, 23]})
+        self.assertEqual(chains[23], [1, 2, 3, 5, 10, 20, 23])
+        self.assertEqual(chains[46], [1, 2, 3, 5, 10, 20, 23, 46])
+
+    def test_round_trip(self):
+        """Test that the file serves exactly the computed chains."""
+        import table as tb
+
+        total = tb.generate(2000, self.path)
+        chains = tb.best_chains(2000)
+        self.assertEqual(total, sum(len(c) for c in chains[1:]))
+        with tb.ChainTable(self.path) as table:
+            self.assertEqual(len(table), 2000)
+            for n in range(1, 2001):
+                self.assertEqual(table[n], tuple(chains[n]))
+            self.assertNotIn(0, table)
+            self.assertNotIn(2001, table)
+            with self.assertRaises(KeyError):
+                table[2001]
+
+    def test_minchain_leaves(self):
+        """Test that loaded tables shorten chains and can be unloaded."""
+        import random
+        import evaluator as ev
+        import table as tb
+
+        tb.generate(4096, self.path)
+        n = random.Random(14).getrandbits(256)
+        before = cf.minchain(n)
+        table = tb.load(self.path)
+        self.assertEqual(cf.cache_info()['size'], 0)
+        self.assertEqual(cf.minchain(1000), list(table[1000]))
+        after = cf.minchain(n)
+        self.assertEqual(after[-1], n)
+        self.assertLess(len(after), len(before))
+        ev.schedule(after)
+        tb.unload()
+        self.assertEqual(cf.minchain(n), before)
+
+    def test_batch_workers(self):
+        """Test that worker processes use the table file."""
+        import batch
+        import table as tb
+
+        tb.generate(1000, self.path)
+        numbers = [999, 2**40 + 12345]
+        with tb.ChainTable(self.path) as table:
+            expected = list(table[999])
+        results = dict(batch.chains_batch(numbers, 'minchain', workers=2,
+                                          table=self.path))
+        self.assertEqual(results[999], expected)
+        serial = dict(batch.chains_batch(numbers, 'minchain', workers=1,
+                                         table=self.path))
+        self.assertEqual(serial, results)
+        self.assertIsNone(cf._table)
+
+    def test_malformed(self):
+        """Test that invalid files raise ValueError."""
+        import table as tb
+
+        tb.generate(100, self.path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for bad in (b'', data[:10], b'XXXX' + data[4:], data[:-1]):
+            with open(self.path, 'wb') as f:
+                f.write(bad)
+            with self.assertRaises(ValueError):
+                tb.ChainTable(self.path)
+        with self.assertRaises(ValueError):
+            tb.generate(0, self.path)
+
+    def test_corrupt_entry(self):
+        """Test that a tampered chain is rejected when verification is on."""
+        import struct
+        import table as tb
+
+        tb.generate(100, self.path)
+        with open(self.path, 'rb') as f:
+            data = bytearray(f.read())
+        # First gap of the chain for 50 (1 -> 2) becomes 1 -> 3; gaps are
+        # stored shifted left by the codec's inline tag bit
+        offsets = 16
+        start = offsets + 4 * 101 + struct.unpack_from(
+            '<I', data, offsets + 4 * 49)[0]
+        self.assertEqual(data[start], 1 << 1)
+        data[start] = 2 << 1
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+        with tb.ChainTable(self.path) as table:
+            self.assertEqual(table[49][-1], 49)
+            with self.assertRaises(ValueError):
+                table[50]
+        with tb.ChainTable(self.path, verify=False) as table:
+            self.assertEqual(table[50][:2], (1, 3))
+
+
+class TestCodec(unittest.TestCase):
+    """Test suite for the compact chain encoding and archives."""
+
+    def setUp(self):
+        import tempfile
+
+        handle, self.path = tempfile.mkstemp(suffix='.car')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_round_trip(self):
+        """Test encoding of tiny, word-sized and huge gaps."""
+        import random
+        import codec
+        import gcf_chain as gcf
+
+        rng = random.Random(2500)
+        chains = [[1], [1, 2], [1, 2, 4, 8, 16, 31, 32],
+                  [1, 2, 3, 2**1100 + 3, 2**5000],
+                  [1, 1 + 2**48 - 1, 1 + 2**48 - 1 + 2**48],
+                  gcf.minchain(rng.getrandbits(512), 1)]
+        chains += [cf.chain(n, cf.alpha(n))
+                   for n in (rng.getrandbits(bits) | 1
+                             for bits in (16, 63, 256, 2048))]
+        for chain in chains:
+            data = codec.encode(chain)
+            self.assertEqual(codec.decode(data), chain)
+            self.assertEqual(codec.decode(memoryview(bytes(data))), chain)
+            # A record inside a larger buffer decodes without slicing
+            padded = b'xyz' + bytes(data) + b'!'
+            self.assertEqual(codec.decode(padded, 3, 3 + len(data)), chain)
+        # Table-sized gaps take a byte each
+        self.assertEqual(len(codec.encode(list(range(1, 51)))), 49)
+
+    def test_invalid_input(self):
+        """Test rejection of unsorted chains and truncated encodings."""
+        import codec
+
+        for chain in ([], [2, 4], [1, 3, 2], [1, 2, 2]):
+            with self.assertRaises(ValueError):
+                codec.encode(chain)
+        data = bytes(codec.encode([1, 2, 2**100]))
+        # Any cut inside the second gap (after its first byte)
+        for cut in range(2, len(data)):
+            with self.assertRaises(ValueError):
+                codec.decode(data[:cut])
+
+    def test_varints(self):
+        """Test the varint primitives."""
+        import codec
+
+        out = bytearray()
+        values = [0, 1, 127, 128, 300, 2**63, 2**200 + 5]
+        for x in values:
+            codec.write_varint(out, x)
+        i = 0
+        for x in values:
+            value, i = codec.read_varint(out, i)
+            self.assertEqual(value, x)
+        self.assertEqual(i, len(out))
+        with self.assertRaises(ValueError):
+            codec.read_varint(b'\x80\x80', 0)
+
+    def test_archive(self):
+        """Test random access to gap and tape records."""
+        import random
+        import codec
+        import tape as tp
+
+        rng = random.Random(2501)
+        numbers = [rng.getrandbits(bits) | 1 for bits in (8, 64, 1024)]
+        chains = [cf.chain(n, cf.alpha(n)) for n in numbers]
+        tapes = [tp.chain_tape(n, cf.alpha(n)) for n in numbers]
+        with codec.ArchiveWriter(self.path) as writer:
+            self.assertEqual(writer.append(chains[0]), 0)
+            writer.extend(chains[1:] + tapes)
+            self.assertEqual(len(writer), 6)
+
+        with codec.Archive(self.path) as archive:
+            self.assertEqual(len(archive), 6)
+            self.assertEqual(list(archive), chains + chains)
+            self.assertEqual(archive[-1], chains[-1])
+            self.assertEqual(archive.tape(4).values, tapes[1].values)
+            with self.assertRaises(ValueError):
+                archive.tape(0)
+            with self.assertRaises(IndexError):
+                archive[6]
+            record = archive.record(1)
+            self.assertEqual(codec.decode(record), chains[1])
+            record.release()
+
+        self.assertEqual(codec.write_archive(self.path, []), 0)
+        with codec.Archive(self.path) as archive:
+            self.assertEqual(list(archive), [])
+
+    def test_corrupt_archive(self):
+        """Test that damaged archive files are rejected."""
+        import codec
+
+        codec.write_archive(self.path, [[1, 2, 3], [1, 2, 4, 5]])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for damaged in (data[:-1], data + b'\0', b'XXXX' + data[4:], b''):
+            with open(self.path, 'wb') as f:
+                f.write(damaged)
+            with self.assertRaises(ValueError):
+                codec.Archive(self.path)
+
+
+class TestVerify(unittest.TestCase):
+    """Test suite for chain validation."""
+
+    def test_valid_chains(self):
+        """Test that chains from every engine verify in every form."""
+        import random
+        import evaluator as ev
+        import gcf_chain as gcf
+        import tape as tp
+        import verify as vf
+        import window as win
+
+        rng = random.Random(19)
+        for bits in (8, 64, 521, 2048):
+            n = rng.getrandbits(bits) | 1 << (bits - 1) | 1
+            chains = [cf.chain(n, cf.alpha(n)), cf.minchain(n),
+                      gcf.minchain(n, 1), win.wnaf_chain(n),
+                      win.fractional_window_chain(n),
+                      win.sliding_window_chain(n)]
+            for result in chains:
+                self.assertTrue(vf.verify_chain(result, n))
+                vf.check_chain(result[::-1], n)
+            tape = tp.chain_tape(n, cf.alpha(n))
+            self.assertTrue(vf.verify_chain(tape))
+            self.assertTrue(vf.verify_chain(tape, n))
+            self.assertTrue(vf.verify_chain(ev.schedule(tape), n))
+            if bits <= 64:
+                # schedule itself is slow on long signed chains
+                self.assertTrue(vf.verify_chain(ev.schedule(chains[3], n), n))
+        self.assertTrue(vf.verify_chain([1]))
+
+    def test_agrees_with_schedule(self):
+        """Test against evaluator.schedule on random small sets."""
+        import random
+        import evaluator as ev
+        import verify as vf
+
+        rng = random.Random(191)
+        for _ in range(3000):
+            values = sorted({1} | {rng.randrange(1, 40)
+                                   for _ in range(rng.randrange(1, 7))})
+            try:
+                ev.schedule(values)
+                expected = True
+            except ValueError:
+                expected = False
+            self.assertEqual(vf.verify_chain(values), expected, values)
+
+    def test_invalid_chains(self):
+        """Test that corrupted chains are rejected with a reason."""
+        import tape as tp
+        import verify as vf
+
+        self.assertFalse(vf.verify_chain([]))
+        self.assertFalse(vf.verify_chain([2, 4]))
+        self.assertFalse(vf.verify_chain([1, 2, 4], 3))
+        self.assertFalse(vf.verify_chain([1, 2, 3, 6, 7, 11, 20], 20))
+        with self.assertRaisesRegex(ValueError, '11'):
+            vf.check_chain([1, 2, 3, 6, 7, 11, 20])
+
+        tape = tp.chain_tape(87, 10)
+        tape.values[4] += 1
+        self.assertFalse(vf.verify_chain(tape))
+        tape = tp.chain_tape(87, 10)
+        tape.left[3] = 5
+        self.assertFalse(vf.verify_chain(tape))
+        self.assertFalse(vf.verify_chain(tp.chain_tape(87, 10), 88))
+
+        self.assertFalse(vf.verify_chain([(2, 1, 1, 'double'),
+                                          (5, 2, 3, 'add')]))
+        self.assertFalse(vf.verify_chain([(2, 1, 1, 'double'),
+                                          (3, 2, 2, 'add')]))
+        self.assertFalse(vf.verify_chain([(2, 1, 1, 'mul')]))
+
+    def test_batch(self):
+        """Test validating many chains at once."""
+        import verify as vf
+
+        chains = [cf.minchain(n) for n in range(1, 200)]
+        self.assertEqual(vf.verify_chains(chains), [True] * 199)
+        self.assertEqual(vf.verify_chains(chains, range(1, 200)), [True] * 199)
+        self.assertEqual(vf.verify_chains([[1, 2, 3], [1, 3]], [3, 3]),
+                         [True, False])
+
+    def test_linear_on_long_chains(self):
+        """Test that 4096-bit signed chains verify in well under a second."""
+        import time
+        import window as win
+        import verify as vf
+
+        n = (1 << 4095) + 12345678910111213
+        result = win.wnaf_chain(n)
+        start = time.perf_counter()
+        self.assertTrue(vf.verify_chain(result, n))
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+class TestSearch(unittest.TestCase):
+    """Test suite for exact optimal chain search."""
+
+    # Optimal addition chain lengths for n = 1..32 (OEIS A003313)
+    OPTIMAL = TestChainTable.OPTIMAL
+
+    def test_addition_lengths(self):
+        """Test optimal addition chain lengths against OEIS A003313."""
+        import search
+
+        for n in range(1, 33):
+            result = search.optimal_chain(n)
+            self.assertEqual(len(result) - 1, self.OPTIMAL[n - 1], n)
+            self.assertEqual(result[-1], n)
+        # Smallest n needing 9, 10 and 11 steps (OEIS A003064)
+        for n, steps in ((71, 9), (127, 10), (191, 11)):
+            self.assertEqual(search.optimal_length(n), steps)
+            self.assertEqual(search.optimal_length(n - 1), steps - 1)
+
+    def test_subtraction_lengths(self):
+        """Test addition-subtraction search against unpruned breadth-first search."""
+        import evaluator as ev
+        import search
+
+        for n in range(1, 40):
+            result = search.optimal_chain(n, subtraction=True)
+            self.assertEqual(len(result) - 1, reference_subtraction_length(n))
+            if n > 1:
+                ev.schedule(result, n)
+        self.assertEqual(search.optimal_chain(31, subtraction=True),
+                         [1, 2, 4, 8, 16, 31, 32])
+
+    def test_certify(self):
+        """Test certification of given chains."""
+        import search
+
+        self.assertTrue(search.is_optimal([1, 2, 3, 5, 10, 20, 23]))
+        self.assertFalse(search.is_optimal(cf.minchain(23)))
+        self.assertTrue(search.is_optimal([1, 2, 4, 8, 16, 32, 31], 31,
+                                          subtraction=True))
+        self.assertFalse(search.is_optimal([1, 2, 3, 6, 7, 12, 24, 31], 31,
+                                           subtraction=True))
+        self.assertIsNone(search.optimal_chain(71, max_steps=8))
+        with self.assertRaises(ValueError):
+            search.optimal_chain(0)
+
+    def test_lower_bound(self):
+        """Test that the lower bounds never exceed the optimum."""
+        import search
+
+        for n in range(2, 200):
+            length = search.optimal_length(n)
+            self.assertLessEqual(search.lower_bound(n), length)
+            self.assertLessEqual(search.lower_bound(n, subtraction=True),
+                                 search.optimal_length(n, subtraction=True))
+
+    def test_seed_table(self):
+        """Test that exact chains seed an optimal table."""
+        import search
+        import table as tb
+
+        chains = tb.best_chains(32, seeds=search.exact_upto(32))
+        self.assertEqual([len(c) - 1 for c in chains[1:]], self.OPTIMAL)
+
+
+def reference_subtraction_length(n):
+    """Optimal addition-subtraction chain length by plain breadth-first search."""
+    from itertools import combinations_with_replacement
+    level = {frozenset([1])}
+    steps = 0
+    while not any(n in s for s in level):
+        following = set()
+        for s in level:
+            for x, y in combinations_with_replacement(s, 2):
+                for value in (x + y, abs(x - y)):
+                    if 0 < value <= 2 * n and value not in s:
+                        following.add(s | {value})
+        level = following
+        steps += 1
+    return steps
+
+
+class TestWindow(unittest.TestCase):
+    """Test suite for window-based chain engines."""
+
+    ENGINES = ('kary_chain', 'sliding_window_chain', 'wnaf_chain',
+               'fractional_window_chain')
+
+    def test_valid_chains(self):
+        """Test that every engine yields valid chains ending at n."""
+        import evaluator as ev
+        import window as win
+
+        group = ev.ModularGroup(1000003)
+        for name in self.ENGINES:
+            engine = getattr(win, name)
+            self.assertEqual(engine(1), [1])
+            for n in range(2, 1200):
+                result = engine(n)
+                self.assertEqual(result[-1], n, name)
+                self.assertEqual(result, sorted(set(result)))
+                self.assertEqual(result[0], 1)
+                ev.schedule(result)
+        # The target is found without passing n
+        self.assertEqual(ev.evaluate(win.wnaf_chain(31), 3, group),
+                         pow(3, 31, 1000003))
+
+    def test_fixed_widths(self):
+        """Test that explicit widths give chains ending at n."""
+        import evaluator as ev
+        import window as win
+
+        for n in (87, 1000, 2**61 - 1, 3**40):
+            for width in (1, 2, 3, 4, 6):
+                for result in (win.kary_chain(n, width),
+                               win.sliding_window_chain(n, width)):
+                    self.assertEqual(result[-1], n)
+                    ev.schedule(result)
+                result = win.fractional_window_chain(n, 2 * width - 1)
+                self.assertEqual(result[-1], n)
+                ev.schedule(result)
+                if width > 1:
+                    result = win.wnaf_chain(n, width)
+                    self.assertEqual(result[-1], n)
+                    ev.schedule(result)
+        self.assertEqual(win.kary_chain(87, 2),
+                         [1, 2, 3, 4, 5, 10, 20, 21, 42, 84, 87])
+        self.assertEqual(win.wnaf_chain(31, 2), [1, 2, 4, 8, 15, 16, 31])
+
+    def test_fractional_generalizes_wnaf(self):
+        """Test that m = 2^(w-1) - 1 gives the same chain as wNAF_w."""
+        import random
+        import window as win
+
+        rng = random.Random(16)
+        for _ in range(50):
+            n = rng.getrandbits(300) | 1
+            for width in (2, 3, 4, 5):
+                self.assertEqual(
+                    win.fractional_window_chain(n, (1 << (width - 1)) - 1),
+                    win.wnaf_chain(n, width))
+
+    def test_shorter_than_gcf_at_256_bits(self):
+        """Test that window chains beat the alpha chain for 256-bit scalars."""
+        import random
+        import window as win
+
+        rng = random.Random(256)
+        for _ in range(5):
+            n = rng.getrandbits(256) | 1 << 255
+            alpha = len(cf.chain(n, cf.alpha(n)))
+            lengths = [len(getattr(win, name)(n)) for name in self.ENGINES]
+            self.assertLess(min(lengths), alpha)
+            # Signed digits and fractional windows never do worse than wNAF
+            self.assertLessEqual(lengths[3], lengths[2])
+
+    def test_invalid_arguments(self):
+        """Test that invalid parameters raise ValueError."""
+        import window as win
+
+        for call in (lambda: win.kary_chain(0), lambda: win.kary_chain(87, 0),
+                     lambda: win.sliding_window_chain(87, 0),
+                     lambda: win.wnaf_chain(87, 1),
+                     lambda: win.fractional_window_chain(87, 4),
+                     lambda: win.fractional_window_chain(87, -1)):
+            with self.assertRaises(ValueError):
+                call()
+
+    def test_batch_engines(self):
+        """Test that batch exposes the window engines."""
+        import batch
+        import window as win
+
+        results = dict(batch.chains_batch([87, 1000], 'sliding', workers=1))
+        self.assertEqual(results[87], win.sliding_window_chain(87))
+        self.assertEqual(batch.generate(31, 'wnaf'), win.wnaf_chain(31))
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test suite for the benchmark suite."""
+
+    def small_report(self, **kwargs):
+        import benchmark as bm
+        return bm.run(bit_sizes=(16, 64), engines=('alpha', 'wnaf'),
+                      samples=2, repeat=2, **kwargs)
+
+    def test_scalars_are_seeded(self):
+        """Test that scalars have the exact bit size and are reproducible."""
+        import benchmark as bm
+
+        for bits in (16, 521, 4096):
+            values = bm.scalars(bits, 4, seed=7)
+            self.assertEqual(values, bm.scalars(bits, 4, seed=7))
+            self.assertTrue(all(v.bit_length() == bits for v in values))
+        self.assertNotEqual(bm.scalars(64, 4, 1), bm.scalars(64, 4, 2))
+
+    def test_percentile(self):
+        """Test linear-interpolation percentiles."""
+        import benchmark as bm
+
+        self.assertEqual(bm.percentile([3, 1, 2, 4], 50), 2.5)
+        self.assertEqual(bm.percentile([5], 99), 5)
+        self.assertEqual(bm.percentile(list(range(101)), 90), 90)
+        self.assertEqual(bm.percentile([1, 2], 0), 1)
+        self.assertEqual(bm.percentile([1, 2], 100), 2)
+
+    def test_report(self):
+        """Test the records of a small sweep."""
+        import benchmark as bm
+
+        seen = []
+        report = self.small_report(progress=seen.append)
+        results = report['results']
+        self.assertEqual(seen, results)
+        # 2 engines x (2 random sizes + 2 Mersenne + 2 group orders)
+        self.assertEqual(len(results), 12)
+        self.assertEqual(report['meta']['bit_sizes'], [16, 64])
+        for record in results:
+            seconds = record['seconds']
+            self.assertLessEqual(seconds['min'], seconds['p50'])
+            self.assertLessEqual(seconds['p50'], seconds['p90'])
+            self.assertLessEqual(seconds['p99'], seconds['max'])
+            self.assertGreater(record['peak_bytes'], 0)
+            self.assertGreaterEqual(record['length_per_bit'], 1)
+
+        alpha = [r for r in results
+                 if r['engine'] == 'alpha' and r['case'] == 'random'
+                 and r['bits'] == 64][0]
+        expected = [len(cf.chain(n, cf.alpha(n)))
+                    for n in bm.scalars(64, 2)]
+        self.assertEqual(alpha['length']['min'], min(expected))
+        self.assertEqual(alpha['length']['max'], max(expected))
+
+    def test_engine_limits(self):
+        """Test that engines are skipped above their bit-size limit."""
+        import benchmark as bm
+
+        report = bm.run(bit_sizes=(1024, 2048), engines=('portfolio',),
+                        samples=1, repeat=1, hard=False)
+        self.assertEqual([r['bits'] for r in report['results']], [1024])
+        with self.assertRaises(ValueError):
+            bm.run(bit_sizes=(16,), engines=('nope',))
+
+    def test_save_load_compare(self):
+        """Test the JSON round trip and regression detection."""
+        import copy
+        import tempfile
+        import benchmark as bm
+
+        report = self.small_report(hard=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.json')
+            bm.save(report, path)
+            loaded = bm.load(path)
+        self.assertEqual(loaded, report)
+        self.assertEqual(bm.compare(loaded, report), [])
+
+        slower = copy.deepcopy(report)
+        slower['results'][0]['seconds']['p50'] *= 2
+        slower['results'][1]['length']['mean'] += 1
+        regressions = bm.compare(report, slower)
+        self.assertEqual([r['metric'] for r in regressions],
+                         ['seconds.p50', 'length.mean'])
+        self.assertEqual(regressions[0]['engine'],
+                         report['results'][0]['engine'])
+        # Within tolerance, and records missing from the baseline, pass
+        self.assertEqual(bm.compare(report, slower, tolerance=1.5)[0]['metric'],
+                         'length.mean')
+        self.assertEqual(bm.compare({'results': []}, slower), [])
+
+    def test_cli_suite(self):
+        """Test the suite mode of `cli.py benchmark`."""
+        import json
+        import subprocess
+        import sys
+        import tempfile
+
+        here = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.json')
+            command = [sys.executable, os.path.join(here, 'cli.py'),
+                       'benchmark', '-b', '16', '-e', 'alpha,kary',
+                       '--samples', '1', '--repeat', '1', '--no-hard']
+            proc = subprocess.run(command + ['-o', path], capture_output=True,
+                                  text=True, cwd=here)
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            with open(path) as f:
+                self.assertEqual(len(json.load(f)['results']), 2)
+            proc = subprocess.run(command + ['--compare', path,
+                                             '--tolerance', '1000'],
+                                  capture_output=True, text=True, cwd=here)
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            self.assertIn('No regressions', proc.stdout)
+
+
+class TestInstrument(unittest.TestCase):
+    """Test suite for the opt-in instrumentation."""
+
+    def test_restores_functions(self):
+        """Test that profiling leaves no wrappers behind, even on errors."""
+        import gcf_chain as gcf
+        import instrument as ins
+
+        originals = {(module, name): getattr(module, name)
+                     for module, names in ins.TARGETS.items()
+                     for name in names}
+        with ins.profile():
+            self.assertIsNot(cf.chain, originals[(cf, 'chain')])
+            self.assertIs(cf.chain.__wrapped__, originals[(cf, 'chain')])
+        with self.assertRaises(ZeroDivisionError):
+            with ins.profile():
+                gcf.minchain(87, 1)
+                1 / 0
+        for (module, name), func in originals.items():
+            self.assertIs(getattr(module, name), func)
+
+        with self.assertRaises(AttributeError):
+            with ins.profile({cf: ('chain', 'missing')}):
+                pass
+        self.assertIs(cf.chain, originals[(cf, 'chain')])
+
+    def test_counts_and_results(self):
+        """Test call counts, depths and that results are unchanged."""
+        import gcf_chain as gcf
+        import instrument as ins
+
+        n = 2**127 - 1
+        expected = cf.minchain(n), gcf.minchain(n, 1)
+        cf.cache_clear()
+        with ins.profile() as prof:
+            results = cf.minchain(n), gcf.minchain(n, 1)
+            cf.minchain(n)
+        self.assertEqual(results, expected)
+        self.assertEqual(prof.calls['contfrac.minchain'], 2)
+        self.assertEqual(prof.calls['gcf_chain.minchain'], 1)
+        self.assertEqual(prof.calls['contfrac._build'], 1)
+        self.assertEqual(prof.calls['contfrac.gcf'],
+                         prof.calls['gcf_chain.select_k'])
+        self.assertGreaterEqual(prof.max_depth, 4)
+        self.assertGreater(prof.max_worklist, 3)
+        # The repeated minchain(n) is a cache hit
+        self.assertGreaterEqual(prof.cache['hits'], 1)
+        self.assertGreater(prof.cache['misses'], 0)
+        self.assertAlmostEqual(
+            prof.cache['hit_rate'],
+            prof.cache['hits'] / (prof.cache['hits'] + prof.cache['misses']))
+
+    def test_timing_and_export(self):
+        """Test self/total time bookkeeping and the exported formats."""
+        import json
+        import instrument as ins
+
+        with ins.profile() as prof:
+            cf.chain(2**200 + 12345, 2**100)
+        for name in prof.calls:
+            self.assertLessEqual(prof.own[name], prof.total[name] + 1e-9)
+        self.assertAlmostEqual(sum(prof.stacks.values()),
+                               prof.total['contfrac.chain'], places=6)
+
+        data = json.loads(json.dumps(prof.as_dict()))
+        self.assertEqual(data['functions']['contfrac.chain']['calls'], 1)
+        self.assertEqual(data['max_depth'], prof.max_depth)
+
+        lines = prof.collapsed().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            frames, value = line.rsplit(' ', 1)
+            self.assertTrue(frames.startswith('contfrac.chain'))
+            self.assertGreater(int(value), 0)
+
+    def test_not_reentrant(self):
+        """Test that nested profiles are rejected."""
+        import instrument as ins
+
+        with ins.profile():
+            with self.assertRaises(RuntimeError):
+                with ins.profile():
+                    pass
+            self.assertTrue(hasattr(cf.chain, '__wrapped__'))
+        self.assertFalse(hasattr(cf.chain, '__wrapped__'))
+
+
+def _disk_cache_writer(path, start):
+    """Worker for TestDiskCache: store chains for a range of n."""
+    import diskcache as dc
+
+    with dc.DiskCache(path) as cache:
+        for n in range(start, start + 50):
+            cache.put(n, 'contfrac', 'minchain', None, cf.minchain(n))
+
+
+class TestDiskCache(unittest.TestCase):
+    """Test suite for the persistent SQLite chain cache."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'chains.db')
+
+    def test_round_trip(self):
+        """Test that stored chains come back under exactly their key."""
+        import diskcache as dc
+        import window as win
+
+        n = 2**521 - 1
+        with dc.DiskCache(self.path) as cache:
+            self.assertIsNone(cache.get(n, 'contfrac', 'minchain'))
+            cache.put(n, 'contfrac', 'minchain', None, cf.minchain(n))
+            cache.put(n, 'window', 'wnaf', {'w': 5}, win.wnaf_chain(n, 5))
+            self.assertEqual(cache.get(n, 'contfrac', 'minchain'),
+                             cf.minchain(n))
+            self.assertEqual(cache.get(n, 'window', 'wnaf', {'w': 5}),
+                             win.wnaf_chain(n, 5))
+            self.assertIsNone(cache.get(n, 'window', 'wnaf', {'w': 4}))
+            self.assertIsNone(cache.get(n, 'contfrac', 'alpha'))
+            self.assertIsNone(cache.get(n - 2, 'contfrac', 'minchain'))
+            info = cache.info()
+            self.assertEqual((info['hits'], info['misses'], info['size']),
+                             (2, 4, 2))
+
+        # A new instance (e.g. a restarted worker) sees the same entries
+        with dc.DiskCache(self.path) as cache:
+            calls = []
+            result = cache.get_or_compute(n, 'contfrac', 'minchain', None,
+                                          lambda: calls.append(1))
+            self.assertEqual(result, cf.minchain(n))
+            self.assertEqual(calls, [])
+            result = cache.get_or_compute(87, 'contfrac', 'minchain', None,
+                                          lambda: cf.minchain(87))
+            self.assertEqual(cache.get(87, 'contfrac', 'minchain'), result)
+
+    def test_corrupt_entry(self):
+        """Test that entries failing verification are dropped."""
+        import sqlite3
+        import codec
+        import diskcache as dc
+
+        with dc.DiskCache(self.path) as cache:
+            cache.put(1000, 'contfrac', 'minchain', None, cf.minchain(1000))
+            conn = sqlite3.connect(self.path)
+            with conn:
+                conn.execute('UPDATE chains SET chain = ?',
+                             (codec.encode([1, 2, 5, 1000]),))
+            conn.close()
+            self.assertIsNone(cache.get(1000, 'contfrac', 'minchain'))
+            info = cache.info()
+            self.assertEqual((info['rejected'], info['size']), (1, 0))
+
+    def test_eviction(self):
+        """Test the LRU bound and that recently read entries survive."""
+        import diskcache as dc
+
+        with dc.DiskCache(self.path, max_entries=10,
+                          touch_interval=0) as cache:
+            for n in range(2, 12):
+                cache.put(n, 'contfrac', 'minchain', None, cf.minchain(n))
+            # Reading 2 makes 3 the least recently used entry
+            self.assertIsNotNone(cache.get(2, 'contfrac', 'minchain'))
+            cache.put(12, 'contfrac', 'minchain', None, cf.minchain(12))
+            self.assertEqual(cache.evict(), 1)
+            self.assertIsNotNone(cache.get(2, 'contfrac', 'minchain'))
+            self.assertIsNone(cache.get(3, 'contfrac', 'minchain'))
+
+            for n in range(13, 200):
+                cache.put(n, 'contfrac', 'minchain', None, cf.minchain(n))
+            # Eviction runs every _EVICT_INTERVAL writes, so the bound is
+            # exceeded by less than that in between
+            size = cache.info()['size']
+            self.assertLess(size, 10 + dc._EVICT_INTERVAL)
+            self.assertEqual(cache.evict(), size - 10)
+            self.assertEqual(cache.info()['size'], 10)
+            self.assertIsNotNone(cache.get(199, 'contfrac', 'minchain'))
+            self.assertIsNone(cache.get(12, 'contfrac', 'minchain'))
+
+        with self.assertRaises(ValueError):
+            dc.DiskCache(self.path, max_entries=0)
+
+    def test_versions(self):
+        """Test that entries of other versions are invisible and evicted."""
+        import diskcache as dc
+
+        old = dc.DiskCache(self.path, version=1)
+        new = dc.DiskCache(self.path, version=2)
+        old.put(87, 'contfrac', 'minchain', None, cf.minchain(87))
+        self.assertIsNone(new.get(87, 'contfrac', 'minchain'))
+        new.put(87, 'contfrac', 'minchain', None, cf.minchain(87))
+        self.assertEqual(new.evict(), 1)
+        self.assertIsNone(old.get(87, 'contfrac', 'minchain'))
+        self.assertEqual(new.get(87, 'contfrac', 'minchain'), cf.minchain(87))
+        old.close()
+        new.close()
+
+    def test_concurrent_processes(self):
+        """Test that several processes can write the same file at once."""
+        import multiprocessing
+        import diskcache as dc
+
+        processes = [multiprocessing.Process(target=_disk_cache_writer,
+                                             args=(self.path, start))
+                     for start in (1, 26, 51, 76)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join(60)
+            self.assertEqual(p.exitcode, 0)
+        with dc.DiskCache(self.path) as cache:
+            self.assertEqual(cache.info()['size'], 125)
+            for n in range(1, 126):
+                self.assertEqual(cache.get(n, 'contfrac', 'minchain'),
+                                 cf.minchain(n))
+
+    def test_batch(self):
+        """Test that batch workers read and fill the disk cache."""
+        import batch
+        import diskcache as dc
+
+        numbers = [87, 2**127 - 1, 2**64 + 13]
+        expected = {n: cf.minchain(n) for n in numbers}
+        for workers in (2, 1):
+            results = dict(batch.chains_batch(numbers, 'minchain',
+                                              workers=workers, chunksize=1,
+                                              disk_cache=self.path))
+            self.assertEqual(results, expected)
+        self.assertIsNone(batch._disk_cache)
+        with dc.DiskCache(self.path) as cache:
+            self.assertEqual(cache.info()['size'], 3)
+            # Entries written by the batch are found under its key
+            self.assertEqual(cache.get(87, *batch._cache_key('minchain')),
+                             expected[87])
+        self.assertEqual(batch._cache_key(1), ('gcf_chain', 1, None))
+        self.assertEqual(batch._cache_key('wnaf'), ('window', 'wnaf', None))
+
+    def test_table_key(self):
+        """Test that tables with one bound but different chains differ."""
+        import tempfile
+        import batch
+        import search
+        import table as tb
+
+        paths = []
+        for seeds in (None, search.exact_upto(60)):
+            handle, path = tempfile.mkstemp(suffix='.bin')
+            os.close(handle)
+            self.addCleanup(os.remove, path)
+            tb.generate(100, path, seeds)
+            paths.append(path)
+        self.addCleanup(tb.unload)
+        keys = []
+        for path in paths + paths[:1]:
+            table = tb.load(path)
+            keys.append(batch._cache_key('minchain'))
+            self.assertEqual(keys[-1][2],
+                             {'table': 100, 'digest': table.digest})
+            tb.unload()
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[2])
+
+
+class TestAio(unittest.TestCase):
+    """Test suite for the asyncio service front-end."""
+
+    def test_coalescing(self):
+        """Test that concurrent requests for one n share a computation."""
+        import asyncio
+        import aio
+
+        async def main():
+            async with aio.ChainService(workers=2) as service:
+                n = 2**255 - 19
+                results = await asyncio.gather(
+                    *[service.chain(n, 'minchain') for _ in range(20)],
+                    *[service.chain(n + i) for i in range(5)])
+                return service.stats(), results
+
+        stats, results = asyncio.run(main())
+        self.assertEqual(stats['requests'], 25)
+        self.assertEqual(stats['coalesced'], 19)
+        self.assertEqual(stats['computed'], 6)
+        self.assertEqual(stats['in_flight'], 0)
+        n = 2**255 - 19
+        self.assertEqual(results[0], cf.minchain(n))
+        self.assertIsNot(results[0], results[1])
+        self.assertEqual(results[20:],
+                         [cf.chain(n + i, cf.alpha(n + i)) for i in range(5)])
+
+    def test_backpressure(self):
+        """Test that at most max_pending computations run at once."""
+        import asyncio
+        import threading
+        import time
+        import aio
+        import batch
+
+        running = []
+        peak = []
+        lock = threading.Lock()
+        original = batch.generate
+
+        def slow(n, strategy):
+            with lock:
+                running.append(n)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(n)
+            return original(n, strategy)
+
+        async def main():
+            async with aio.ChainService(workers=4, max_pending=2) as service:
+                return await asyncio.gather(
+                    *[service.chain(n) for n in range(100, 110)])
+
+        batch.generate = slow
+        try:
+            results = asyncio.run(main())
+        finally:
+            batch.generate = original
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(results[0], cf.chain(100, cf.alpha(100)))
+
+    def test_cancel_and_errors(self):
+        """Test that cancelling one caller spares the others, and errors."""
+        import asyncio
+        import aio
+
+        async def main():
+            async with aio.ChainService() as service:
+                first = asyncio.ensure_future(service.chain(2**200 + 1))
+                second = asyncio.ensure_future(service.chain(2**200 + 1))
+                await asyncio.sleep(0)
+                first.cancel()
+                result = await second
+                with self.assertRaises(ValueError):
+                    await service.chain(87, 'nope')
+                return first.cancelled(), result
+
+        cancelled, result = asyncio.run(main())
+        self.assertTrue(cancelled)
+        self.assertEqual(result, cf.chain(2**200 + 1, cf.alpha(2**200 + 1)))
+        self.assertEqual(asyncio.run(aio.achain(87, 'minchain')),
+                         cf.minchain(87))
+        with self.assertRaises(ValueError):
+            aio.ChainService(max_pending=0)
+
+    def test_separate_disk_caches(self):
+        """Test that thread-mode services each keep their own disk cache."""
+        import asyncio
+        import tempfile
+        import aio
+        import batch
+        import diskcache as dc
+
+        async def main(first_path, second_path):
+            first = aio.ChainService(disk_cache=first_path)
+            second = aio.ChainService(disk_cache=second_path)
+            await first.chain(87, 'minchain')
+            first.close()
+            # Closing the first service leaves the second one's cache open
+            await second.chain(1000, 'minchain')
+            second.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, name) for name in ('a.db', 'b.db')]
+            asyncio.run(main(*paths))
+            self.assertIsNone(batch._disk_cache)
+            for path, n in zip(paths, (87, 1000)):
+                with dc.DiskCache(path) as cache:
+                    self.assertEqual(cache.info()['size'], 1)
+                    self.assertEqual(cache.get(n, *batch._cache_key('minchain')),
+                                     cf.minchain(n))
+
+    def test_processes(self):
+        """Test the process-pool executor."""
+        import asyncio
+        import aio
+
+        import window as win
+
+        async def main():
+            async with aio.ChainService(workers=2, processes=True) as service:
+                return await asyncio.gather(service.chain(87),
+                                            service.chain(1000, 'wnaf'))
+
+        self.assertEqual(asyncio.run(main()),
+                         [cf.chain(87, cf.alpha(87)), win.wnaf_chain(1000)])
+
+    def test_server(self):
+        """Test the JSON-lines protocol over a Unix socket."""
+        import asyncio
+        import json
+        import tempfile
+        import aio
+        import gcf_chain as gcf
+
+        requests = [{'id': 1, 'n': 87}, {'id': 2, 'n': '1000', 'strategy': '1'},
+                    {'id': 3, 'n': 0}, {'id': 4, 'n': 87, 'strategy': 'x'},
+                    {'id': 5, 'n': 87, 'strategy': 'minchain'}]
+
+        async def main(path):
+            async with aio.ChainService() as service:
+                server = await aio.serve(service, path=path)
+                reader, writer = await asyncio.open_unix_connection(path)
+                for request in requests:
+                    writer.write(json.dumps(request).encode() + b'\n')
+                writer.write(b'not json\n')
+                await writer.drain()
+                responses = [json.loads(await reader.readline())
+                             for _ in range(len(requests) + 1)]
+                writer.write(b'{"op": "stats"}\n')
+                stats = json.loads(await reader.readline())
+                writer.close()
+                # The server closes its side once it has seen EOF
+                self.assertEqual(await reader.read(), b'')
+                server.close()
+                await server.wait_closed()
+                return responses, stats
+
+        with tempfile.TemporaryDirectory() as tmp:
+            responses, stats = asyncio.run(main(os.path.join(tmp, 's.sock')))
+        by_id = {r['id']: r for r in responses}
+        self.assertEqual(by_id[1]['chain'], [1, 2, 3, 6, 7, 10, 20, 40, 80, 87])
+        self.assertEqual(by_id[1]['length'], 10)
+        self.assertEqual(by_id[2]['chain'], gcf.minchain(1000, 1))
+        self.assertIn('error', by_id[3])
+        self.assertIn('Unknown strategy', by_id[4]['error'])
+        self.assertEqual(by_id[5]['chain'], cf.minchain(87))
+        self.assertIn('error', by_id[None])
+        # Requests with an unknown strategy are rejected before counting
+        self.assertEqual(stats['requests'], 3)
+        self.assertIn('hits', stats['cache'])
+
+    def test_server_backpressure(self):
+        """Test that a flooding client has at most max_pending requests open."""
+        import asyncio
+        import json
+        import tempfile
+        import aio
+
+        async def main(path):
+            async with aio.ChainService(workers=4, max_pending=3) as service:
+                chain = service.chain
+                open_calls = []
+                peak = [0]
+
+                async def counted(n, strategy=None):
+                    open_calls.append(n)
+                    peak[0] = max(peak[0], len(open_calls))
+                    try:
+                        return await chain(n, strategy)
+                    finally:
+                        open_calls.remove(n)
+
+                service.chain = counted
+                server = await aio.serve(service, path=path)
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b''.join(
+                    json.dumps({'id': i, 'n': 2**200 + i}).encode() + b'\n'
+                    for i in range(200)))
+                await writer.drain()
+                responses = [json.loads(await reader.readline())
+                             for _ in range(200)]
+                writer.close()
+                # The server closes its side once it has seen EOF
+                self.assertEqual(await reader.read(), b'')
+                server.close()
+                await server.wait_closed()
+                return responses, peak[0]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            responses, peak = asyncio.run(main(os.path.join(tmp, 's.sock')))
+        self.assertLessEqual(peak, 3)
+        self.assertEqual(sorted(r['id'] for r in responses), list(range(200)))
+        n = 2**200 + 7
+        by_id = {r['id']: r for r in responses}
+        self.assertEqual(by_id[7]['chain'], cf.chain(n, cf.alpha(n)))
+
+
+class TestIntMath(unittest.TestCase):
+    """Test suite for the exact integer helpers."""
+
+    def values(self):
+        import random
+
+        rng = random.Random(2300)
+        values = list(range(-3, 300))
+        values += [2**k + d for k in (52, 53, 63, 64, 521, 4096)
+                   for d in (-1, 0, 1)]
+        values += [rng.getrandbits(bits) for bits in (256, 2048, 8192)]
+        return values
+
+    def test_logarithms(self):
+        """Test log_2 and ceil_log_2 against a bit-by-bit reference."""
+        import intmath as im
+
+        for x in self.values():
+            floor_log = 0
+            while 1 << (floor_log + 1) <= x:
+                floor_log += 1
+            ceil_log = 0
+            while 1 << ceil_log < x:
+                ceil_log += 1
+            self.assertEqual(im.log_2(x), floor_log, x)
+            self.assertEqual(im.ceil_log_2(x), ceil_log, x)
+            if x >= 1:
+                self.assertEqual(im.floor_power_of_two(x), 1 << floor_log)
+        self.assertIs(cf.log_2, im.log_2)
+
+    def test_powers_of_two(self):
+        """Test the power-of-two predicate."""
+        import intmath as im
+
+        powers = {1 << k for k in range(4100)}
+        for x in self.values():
+            self.assertEqual(im.is_power_of_two(x), x in powers, x)
+
+    def test_exact_division(self):
+        """Test floor/ceil division and rounding beyond float precision."""
+        from fractions import Fraction
+        import intmath as im
+
+        values = [v for v in self.values() if v]
+        for a in values[::7]:
+            for b in values[::11]:
+                q = Fraction(a, b)
+                self.assertEqual(im.floor_div(a, b), im.floor(q))
+                self.assertEqual(im.ceil_div(a, b), im.ceil(q))
+                self.assertTrue(im.floor(q) <= q <= im.ceil(q))
+        self.assertEqual(im.ceil_div(2**64 + 1, 2), 2**63 + 1)
+
+
+def _has_numpy():
+    """True if NumPy can be imported, without importing it."""
+    import importlib.util
+    return importlib.util.find_spec('numpy') is not None
+
+
+@unittest.skipUnless(_has_numpy(), "NumPy is not installed")
+class TestVectorized(unittest.TestCase):
+    """Test suite for the NumPy batch engine."""
+
+    def scalars(self, seed, count=3000):
+        import random
+
+        rng = random.Random(seed)
+        numbers = [rng.getrandbits(rng.randint(2, 63)) | 2
+                   for _ in range(count)]
+        return numbers + list(range(2, 600)) + [2**62, 2**63 - 1]
+
+    def test_matches_scalar_engines(self):
+        """Test that every chain equals contfrac's, element for element."""
+        import vectorized as vz
+
+        numbers = self.scalars(22)
+        result = vz.chains(numbers)
+        self.assertEqual(result.values.dtype.name, 'uint64')
+        self.assertEqual(len(result), len(numbers))
+        self.assertEqual(result.tolist(),
+                         [cf.chain(n, cf.alpha(n)) for n in numbers])
+        self.assertEqual(vz.minchains([1] + numbers).tolist(),
+                         [cf.minchain(n) for n in [1] + numbers])
+
+    def test_explicit_k(self):
+        """Test per-scalar and shared parameters."""
+        import random
+        import numpy as np
+        import vectorized as vz
+
+        numbers = self.scalars(23, 500)
+        rng = random.Random(23)
+        ks = [rng.randint(1, n) for n in numbers]
+        self.assertEqual(vz.chains(np.array(numbers, dtype=np.uint64),
+                                   np.array(ks)).tolist(),
+                         [cf.chain(n, k) for n, k in zip(numbers, ks)])
+        self.assertEqual(vz.chains([28, 87, 1000], 7).tolist(),
+                         [cf.chain(28, 7), cf.chain(87, 7), cf.chain(1000, 7)])
+        for bad in (0, 100, [1, 2, 3], [1, 100]):
+            with self.assertRaises(ValueError):
+                vz.chains([28, 87], bad)
+
+    def test_ragged_layout(self):
+        """Test the values and offsets buffers and chunking."""
+        import vectorized as vz
+
+        numbers = self.scalars(24, 300)
+        whole = vz.chains(numbers)
+        self.assertEqual(whole.offsets[0], 0)
+        self.assertEqual(whole.offsets[-1], len(whole.values))
+        self.assertEqual(whole.lengths().tolist(),
+                         [len(c) for c in whole.tolist()])
+        self.assertEqual(whole[-1].tolist(), whole.tolist()[-1])
+        self.assertEqual([row.tolist() for row in whole], whole.tolist())
+        chunked = vz.chains(numbers, chunksize=7)
+        self.assertEqual(chunked.values.tolist(), whole.values.tolist())
+        self.assertEqual(chunked.offsets.tolist(), whole.offsets.tolist())
+        empty = vz.chains([])
+        self.assertEqual((len(empty), empty.tolist()), (0, []))
+        with self.assertRaises(IndexError):
+            whole[len(whole)]
+
+    def test_word_functions(self):
+        """Test bit_length, log_2, alpha and NAF against the scalar code."""
+        import bos_coster as bc
+        import numpy as np
+        import vectorized as vz
+
+        numbers = self.scalars(25) + [2**k + d for k in range(2, 63)
+                                      for d in (-1, 0, 1)]
+        self.assertEqual(vz.bit_length(numbers).tolist(),
+                         [n.bit_length() for n in numbers])
+        self.assertEqual(vz.log_2(numbers).tolist(),
+                         [cf.log_2(n) for n in numbers])
+        self.assertEqual(vz.alpha(numbers).tolist(),
+                         [cf.alpha(n) for n in numbers])
+        self.assertEqual(vz.naf([1] + numbers).tolist(),
+                         [bc.NAF(n) for n in [1] + numbers])
+        positive, negative = vz.naf_masks(np.array(numbers, dtype=np.uint64))
+        self.assertEqual((positive - negative).tolist(), numbers)
+        self.assertFalse(np.any(positive & negative))
+        self.assertFalse(np.any((positive | negative)
+                                & ((positive | negative) >> np.uint64(1))))
+
+    def test_scalar_range(self):
+        """Test that scalars outside 1 <= n < 2**63 are rejected."""
+        import numpy as np
+        import vectorized as vz
+
+        for bad in ([0], [2**63], [-5], [1.5], [True],
+                    np.array([0, 5]), np.array([1.0])):
+            with self.assertRaises(ValueError):
+                vz.as_scalars(bad)
+        array = np.array([5, 6], dtype=np.uint64)
+        self.assertIs(vz.as_scalars(array), array)
+
+    def test_table_leaves(self):
+        """Test that tabulated leaves are used like in contfrac."""
+        import tempfile
+        import table as tb
+        import vectorized as vz
+
+        handle, path = tempfile.mkstemp(suffix='.bin')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        self.addCleanup(tb.unload)
+        tb.generate(1000, path)
+        tb.load(path)
+        numbers = self.scalars(26, 500)
+        self.assertEqual(vz.chains(numbers).tolist(),
+                         [cf.chain(n, cf.alpha(n)) for n in numbers])
+        self.assertEqual(vz.minchains(numbers).tolist(),
+                         [cf.minchain(n) for n in numbers])
 
 def run_tests():
     """Run all tests with verbose output."""
@@ -221,8 +2531,28 @@ def run_tests():
 
     # Add all test classes
     suite.addTests(loader.loadTestsFromTestCase(TestContinuedFraction))
+    suite.addTests(loader.loadTestsFromTestCase(TestIntMath))
+    suite.addTests(loader.loadTestsFromTestCase(TestChainCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestChainLength))
+    suite.addTests(loader.loadTestsFromTestCase(TestIterativeBuilder))
     suite.addTests(loader.loadTestsFromTestCase(TestGCFChain))
+    suite.addTests(loader.loadTestsFromTestCase(TestPortfolio))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatch))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchCommand))
     suite.addTests(loader.loadTestsFromTestCase(TestBOSCoster))
+    suite.addTests(loader.loadTestsFromTestCase(TestBosCosterSequence))
+    suite.addTests(loader.loadTestsFromTestCase(TestEvaluator))
+    suite.addTests(loader.loadTestsFromTestCase(TestChainTape))
+    suite.addTests(loader.loadTestsFromTestCase(TestChainTable))
+    suite.addTests(loader.loadTestsFromTestCase(TestVerify))
+    suite.addTests(loader.loadTestsFromTestCase(TestCodec))
+    suite.addTests(loader.loadTestsFromTestCase(TestDiskCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestAio))
+    suite.addTests(loader.loadTestsFromTestCase(TestVectorized))
+    suite.addTests(loader.loadTestsFromTestCase(TestSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestWindow))
+    suite.addTests(loader.loadTestsFromTestCase(TestBenchmark))
+    suite.addTests(loader.loadTestsFromTestCase(TestInstrument))
 
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
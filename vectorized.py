@@ -0,0 +1,396 @@
+"""
+Vectorized chain generation for word-sized scalars.
+
+For scalars below 2^63 the per-element Python work in contfrac.chain,
+alpha, log_2 and bos_coster.NAF dominates the running time. This module
+runs the same algorithms on NumPy uint64 arrays. Each step of the contfrac
+decomposition (a quotient/remainder split, a leaf, or a scaling) is applied
+to the pending subproblems of every scalar at once, so the Python overhead
+is paid per level of the decomposition rather than per element.
+
+Results use a ragged layout instead of one Python list per scalar: a flat
+``values`` buffer holding every row back to back and an ``offsets`` array
+where row i is ``values[offsets[i]:offsets[i + 1]]``. Chains are identical,
+element for element, to contfrac.chain and contfrac.minchain, including
+leaves from a table installed with contfrac.set_leaf_table.
+
+NumPy is an optional dependency (``pip install -e .[vectorized]``) and only
+this module imports it.
+
+Example:
+    >>> chains([87, 28]).tolist()
+    [[1, 2, 3, 6, 7, 10, 20, 40, 80, 87], [1, 2, 4, 6, 7, 14, 28]]
+"""
+
+import numpy as np
+
+import contfrac as cf
+
+
+# Largest accepted bit length; n + n // 2 must fit in a uint64
+MAX_BITS = 63
+
+# Scalars expanded together, bounding the size of the temporary arrays
+CHUNK_SIZE = 1 << 16
+
+_ONE = np.uint64(1)
+
+
+class Ragged:
+    """
+    Variable-length rows stored in one flat buffer.
+
+    Attributes:
+        values (numpy.ndarray): Every row, back to back
+        offsets (numpy.ndarray): int64 array of len(rows) + 1 entries;
+            row i is values[offsets[i]:offsets[i + 1]]
+    """
+
+    __slots__ = ('values', 'offsets')
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        count = len(self)
+        if i < 0:
+            i += count
+        if not 0 <= i < count:
+            raise IndexError("Ragged index out of range")
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def lengths(self):
+        """Return the length of every row as an int64 array."""
+        return np.diff(self.offsets)
+
+    def tolist(self):
+        """Return the rows as lists of Python ints."""
+        flat = self.values.tolist()
+        bounds = self.offsets.tolist()
+        return [flat[bounds[i]:bounds[i + 1]] for i in range(len(self))]
+
+
+def as_scalars(ns):
+    """
+    Convert scalars to a flat uint64 array.
+
+    Args:
+        ns (iterable or numpy.ndarray): Integers with 1 <= n < 2**63
+
+    Returns:
+        numpy.ndarray: uint64 array (ns itself if it already is one)
+
+    Raises:
+        ValueError: If a scalar is not an integer or is out of range
+    """
+    if isinstance(ns, np.ndarray):
+        if ns.dtype.kind not in 'iu':
+            raise ValueError(f"Scalars must be integers, got {ns.dtype}")
+        array = ns if ns.ndim == 1 else ns.reshape(-1)
+        if array.size and (int(array.min()) < 1
+                           or int(array.max()) >> MAX_BITS):
+            raise ValueError(f"Scalars must satisfy 1 <= n < 2**{MAX_BITS}")
+        return array.astype(np.uint64, copy=False)
+
+    values = list(ns)
+    for n in values:
+        if isinstance(n, bool) or not isinstance(n, (int, np.integer)):
+            raise ValueError(f"Scalars must be integers, got {n!r}")
+        if n < 1 or int(n) >> MAX_BITS:
+            raise ValueError(
+                f"Scalars must satisfy 1 <= n < 2**{MAX_BITS}, got {n}")
+    return np.array(values, dtype=np.uint64)
+
+
+def _bit_length(x):
+    """Bit length of every element of a uint64 array (0 for 0)."""
+    length = np.frexp(x.astype(np.float64))[1].astype(np.int64)
+    # Rounding to 53 bits can carry into the next power of two
+    shift = np.maximum(length - 1, 0).astype(np.uint64)
+    length -= (length > 0) & (x >> shift == 0)
+    return length
+
+
+def bit_length(ns):
+    """
+    Return int.bit_length of every scalar.
+
+    Examples:
+        >>> bit_length([1, 87, 2**62]).tolist()
+        [1, 7, 63]
+    """
+    return _bit_length(as_scalars(ns))
+
+
+def log_2(ns):
+    """
+    Return floor(log2(n)) of every scalar, like contfrac.log_2.
+
+    Examples:
+        >>> log_2([1, 87, 2**62]).tolist()
+        [0, 6, 62]
+    """
+    return _bit_length(as_scalars(ns)) - 1
+
+
+def _alpha(ns):
+    """contfrac.alpha of every element of a checked uint64 array."""
+    shift = (_bit_length(ns) >> 1).astype(np.uint64)
+    return ns >> shift
+
+
+def alpha(ns):
+    """
+    Return contfrac.alpha of every scalar.
+
+    Examples:
+        >>> alpha([87, 2**62]).tolist()
+        [10, 2147483648]
+    """
+    return _alpha(as_scalars(ns))
+
+
+def naf_masks(ns):
+    """
+    Return the non-adjacent form of every scalar as two bit masks.
+
+    Bit i of ``positive`` (``negative``) is set where NAF digit i, counted
+    from the least significant, is +1 (-1), so n = positive - negative.
+
+    Returns:
+        tuple: (positive, negative) uint64 arrays
+
+    Examples:
+        >>> [m.tolist() for m in naf_masks([7])]
+        [[8], [1]]
+    """
+    ns = as_scalars(ns)
+    half = ns >> _ONE
+    sum3 = ns + half  # 3n / 2, below 2**64 for n < 2**63
+    carries = half ^ sum3
+    return sum3 & carries, half & carries
+
+
+def naf(ns):
+    """
+    Return the NAF digits of every scalar, like bos_coster.NAF.
+
+    Returns:
+        Ragged: int8 digits of each scalar, most significant first
+
+    Examples:
+        >>> naf([7, 87]).tolist()
+        [[1, 0, 0, -1], [1, 0, -1, 0, -1, 0, 0, -1]]
+    """
+    positive, negative = naf_masks(ns)
+    lengths = _bit_length(positive)
+    # Column j holds digit 63 - j, so each row's digits are a suffix
+    shifts = np.arange(63, -1, -1, dtype=np.uint64)
+    digits = ((positive[:, None] >> shifts) & _ONE).astype(np.int8)
+    digits -= ((negative[:, None] >> shifts) & _ONE).astype(np.int8)
+    used = np.arange(64) >= 64 - lengths[:, None]
+    return Ragged(digits[used], _offsets(lengths))
+
+
+def chains(ns, k=None, chunksize=CHUNK_SIZE):
+    """
+    Generate contfrac.chain(n, k) for every scalar.
+
+    Args:
+        ns (iterable or numpy.ndarray): Scalars, 1 <= n < 2**63
+        k (int or array): Parameter per scalar, or one for all; None uses
+            alpha(n) like the batch 'alpha' strategy (so n must be >= 2)
+        chunksize (int): Scalars expanded together
+
+    Returns:
+        Ragged: uint64 chains, sorted and deduplicated
+
+    Raises:
+        ValueError: If a scalar is out of range or a k is not in [1, n]
+    """
+    ns = as_scalars(ns)
+    if k is None:
+        ks = _alpha(ns)
+    elif np.ndim(k) == 0:
+        k = int(k)
+        if not 1 <= k < 1 << MAX_BITS:
+            raise ValueError("Each k must satisfy 1 <= k <= n")
+        ks = np.full(ns.shape, k, dtype=np.uint64)
+    else:
+        ks = np.asarray(k)
+        if ks.dtype.kind not in 'iu' or ks.shape != ns.shape:
+            raise ValueError("k must be an int or one int per scalar")
+        if ks.dtype.kind == 'i' and ks.size and ks.min() < 1:
+            raise ValueError("Each k must satisfy 1 <= k <= n")
+        ks = ks.astype(np.uint64)
+    if np.any((ks < _ONE) | (ks > ns)):
+        raise ValueError("Each k must satisfy 1 <= k <= n")
+    return _batched(ns, ks, chunksize)
+
+
+def minchains(ns, chunksize=CHUNK_SIZE):
+    """
+    Generate contfrac.minchain(n) for every scalar.
+
+    Args:
+        ns (iterable or numpy.ndarray): Scalars, 1 <= n < 2**63
+        chunksize (int): Scalars expanded together
+
+    Returns:
+        Ragged: uint64 chains, sorted and deduplicated
+
+    Examples:
+        >>> minchains([1, 87]).tolist()
+        [[1], [1, 2, 4, 5, 9, 18, 23, 32, 64, 87]]
+    """
+    return _batched(as_scalars(ns), None, chunksize)
+
+
+def _batched(ns, ks, chunksize):
+    """Expand ns in chunks and join the results."""
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    values, lengths = [], []
+    for start in range(0, len(ns), chunksize):
+        stop = start + chunksize
+        part = _expand(ns[start:stop], None if ks is None else ks[start:stop])
+        values.append(part[0])
+        lengths.append(part[1])
+    if not values:
+        return Ragged(np.zeros(0, dtype=np.uint64), np.zeros(1, np.int64))
+    return Ragged(np.concatenate(values), _offsets(np.concatenate(lengths)))
+
+
+def _offsets(lengths):
+    """Return the offsets array for rows of the given lengths."""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _ranks(counts):
+    """Return 0..c-1 for every c in counts, concatenated."""
+    starts = np.cumsum(counts) - counts
+    return np.arange(int(counts.sum())) - np.repeat(starts, counts)
+
+
+def _expand(ns, ks):
+    """
+    Expand chain(n, k) (or minchain(n) when ks is None) level by level.
+
+    Pending subproblems are rows of parallel arrays: the scalar they belong
+    to, their operands, and the product of the k factors above them, which
+    contfrac applies with a _SCALE entry. Every emitted element is
+    multiplied by its scale and tagged with its scalar; sorting by (scalar,
+    value) at the end yields the chains.
+
+    Returns:
+        tuple: (values, lengths) for the scalars in order
+    """
+    count = len(ns)
+    owners = np.arange(count)
+    scales = np.ones(count, dtype=np.uint64)
+    empty = np.zeros(0, dtype=np.uint64)
+    if ks is None:
+        mins = (owners, ns, scales)
+        pending = (owners[:0], empty, empty, empty)
+    else:
+        mins = (owners[:0], empty, empty)
+        pending = (owners, ns, ks, scales)
+
+    table = cf._table
+    out_owners, out_values = [], []
+    while True:
+        # minchain(a): emit the leaves, split the rest as chain(a, 2^(l-1))
+        owner, a, scale = mins
+        if len(a):
+            l = _bit_length(a) - 1
+            power = a == _ONE << l.astype(np.uint64)
+            counts = l[power] + 1
+            out_owners.append(np.repeat(owner[power], counts))
+            out_values.append(np.repeat(scale[power], counts)
+                              << _ranks(counts).astype(np.uint64))
+
+            three = a == np.uint64(3)
+            for factor in (1, 2, 3):
+                out_owners.append(owner[three])
+                out_values.append(scale[three] * np.uint64(factor))
+
+            split = ~(power | three)
+            if table is not None:
+                tabled = split & (a <= np.uint64(table.bound))
+                if tabled.any():
+                    _emit_table(table, owner[tabled], a[tabled],
+                                scale[tabled], out_owners, out_values)
+                    split &= ~tabled
+            k = _ONE << (l[split] - 1).astype(np.uint64)
+            pending = tuple(np.concatenate(pair) for pair in zip(
+                pending, (owner[split], a[split], k, scale[split])))
+
+        # chain(a, k): n itself when r != 0, then minchain(k) or
+        # chain(k, r), plus k * minchain(q)
+        owner, a, k, scale = pending
+        if not len(a):
+            break
+        q = a // k
+        r = a - q * k
+        rem = r != 0
+        out_owners.append(owner[rem])
+        out_values.append(a[rem] * scale[rem])
+        exact = ~rem
+        mins = (np.concatenate((owner, owner[exact])),
+                np.concatenate((q, k[exact])),
+                np.concatenate((scale * k, scale[exact])))
+        pending = (owner[rem], k[rem], r[rem], scale[rem])
+
+    return _collect(np.concatenate(out_owners), np.concatenate(out_values),
+                    count)
+
+
+def _collect(owners, values, count):
+    """
+    Sort and deduplicate the values of each owner.
+
+    A full (owner, value) lexsort is the slowest step by far. Grouping by
+    owner is a radix sort on small integers, and each group is then short
+    enough to sort in a padded (count, longest) matrix.
+
+    Returns:
+        tuple: (values, lengths) grouped by owner in order
+    """
+    key = owners.astype(np.uint16 if count <= 1 << 16 else np.int64)
+    order = np.argsort(key, kind='stable')
+    owners = owners[order]
+    values = values[order]
+    counts = np.bincount(owners, minlength=count)
+    starts = np.cumsum(counts) - counts
+
+    # Pad with a sentinel above every chain element, which sorts last
+    pad = np.uint64(np.iinfo(np.uint64).max)
+    matrix = np.full((count, int(counts.max(initial=0))), pad)
+    matrix[owners, np.arange(len(values)) - starts[owners]] = values
+    matrix.sort(axis=1)
+    keep = matrix != pad
+    keep[:, 1:] &= matrix[:, 1:] != matrix[:, :-1]
+    return matrix[keep], keep.sum(axis=1)
+
+
+def _emit_table(table, owner, a, scale, out_owners, out_values):
+    """Emit the tabulated chains of a, each looked up once."""
+    unique, inverse = np.unique(a, return_inverse=True)
+    entries = [table[n] for n in unique.tolist()]
+    sizes = np.array([len(e) for e in entries], dtype=np.int64)
+    flat = np.array([x for e in entries for x in e], dtype=np.uint64)
+    starts = np.cumsum(sizes) - sizes
+    counts = sizes[inverse]
+    index = np.repeat(starts[inverse], counts) + _ranks(counts)
+    out_owners.append(np.repeat(owner, counts))
+    out_values.append(flat[index] * np.repeat(scale, counts))
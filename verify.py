@@ -0,0 +1,249 @@
+"""
+Validation of chains from untrusted sources.
+
+Chains read from disk or received from another process must be checked
+before a group exponentiation trusts them: a corrupted element silently
+produces a wrong power. A chain is valid if it contains 1 and its target,
+and every other element is a double, sum or difference of elements that
+can be computed before it.
+
+Three input forms are accepted:
+    - a ChainTape, whose recorded operands make every check O(1)
+    - a step list as returned by evaluator.schedule, likewise O(1) per step
+    - a plain list of values in any order, like contfrac.chain returns;
+      elements are checked in ascending order against a hash set, trying
+      the larger partners first, which finds the partner of typical chain
+      elements within a few lookups. Adversarial inputs can take time
+      quadratic in the length or worse.
+"""
+
+from bisect import insort
+
+from tape import OP_ADD, OP_DOUBLE, OP_SUB, ChainTape
+
+
+def check_chain(chain, n=None):
+    """
+    Validate a chain, explaining the first problem found.
+
+    Args:
+        chain (list, ChainTape or list of steps): Chain to check
+        n (int): Target the chain must reach; defaults to the largest
+            element (the last recorded element for a tape, the last step
+            for a step list)
+
+    Raises:
+        ValueError: If the chain is invalid or does not contain n
+    """
+    if isinstance(chain, ChainTape):
+        _check_tape(chain, n)
+    elif chain and isinstance(chain[0], tuple):
+        _check_steps(chain, n)
+    else:
+        _check_values(chain, n)
+
+
+def verify_chain(chain, n=None):
+    """
+    Return True if a chain is valid, False otherwise.
+
+    Args:
+        chain (list, ChainTape or list of steps): Chain to check
+        n (int): Target, as in :func:`check_chain`
+
+    Returns:
+        bool: Whether the chain is valid and contains n
+
+    Examples:
+        >>> verify_chain([1, 2, 3, 6, 7, 10, 20, 40, 80, 87], 87)
+        True
+        >>> verify_chain([1, 2, 4, 8, 16, 31, 32], 31)
+        True
+        >>> verify_chain([1, 2, 3, 6, 7, 11, 20], 20)
+        False
+    """
+    try:
+        check_chain(chain, n)
+    except (ValueError, TypeError, IndexError):
+        return False
+    return True
+
+
+def verify_chains(chains, targets=None):
+    """
+    Validate many chains.
+
+    Args:
+        chains (iterable): Chains in any form accepted by check_chain
+        targets (iterable): Target per chain; None uses each default
+
+    Returns:
+        list: One bool per chain, in input order
+    """
+    if targets is None:
+        return [verify_chain(c) for c in chains]
+    return [verify_chain(c, n) for c, n in zip(chains, targets)]
+
+
+def _check_tape(tape, n):
+    """Check every recorded step of a tape."""
+    values, ops, left, right = tape.values, tape.ops, tape.left, tape.right
+    count = len(values)
+    if not count or values[0] != 1:
+        raise ValueError("Chain must start with 1")
+    if not len(ops) == len(left) == len(right) == count:
+        raise ValueError("Chain tape buffers have different lengths")
+    for i in range(1, count):
+        a, b, op = left[i], right[i], ops[i]
+        if a >= i or b >= i:
+            raise ValueError(f"Step {i} uses a later element")
+        if op == OP_ADD:
+            expected = values[a] + values[b]
+        elif op == OP_SUB:
+            expected = values[a] - values[b]
+        elif op == OP_DOUBLE:
+            expected = values[a] << 1
+        else:
+            raise ValueError(f"Step {i} has an unknown opcode {op}")
+        if values[i] != expected:
+            raise ValueError(f"Step {i} should be {expected}, not {values[i]}")
+    if n is not None and n not in values:
+        raise ValueError(f"{n} is not in the chain")
+
+
+def _check_steps(steps, n):
+    """Check (value, left, right, op) steps in execution order."""
+    computed = {1}
+    for value, a, b, op in steps:
+        if a not in computed or b not in computed:
+            raise ValueError(f"{value} uses an element not computed before it")
+        if op == 'add':
+            expected = a + b
+        elif op == 'sub':
+            expected = a - b
+        elif op == 'double':
+            expected = a << 1
+        else:
+            raise ValueError(f"Unknown operation {op!r}")
+        if value != expected:
+            raise ValueError(f"Step for {value} computes {expected}")
+        computed.add(value)
+    if n is None:
+        n = steps[-1][0]
+    if n not in computed:
+        raise ValueError(f"{n} is not in the chain")
+
+
+def _check_values(chain, n):
+    """Check a plain collection of values."""
+    values = sorted(set(chain))
+    if not values or values[0] != 1:
+        raise ValueError("Chain must contain 1")
+    if n is None:
+        n = values[-1]
+    if n not in values:
+        raise ValueError(f"{n} is not in the chain")
+    derive_steps(values)
+
+
+def derive_steps(values):
+    """
+    Express every element of a sorted chain through earlier elements.
+
+    Additions and doublings only need smaller elements, so one ascending
+    pass places every element of an addition chain. A difference x = y - z
+    needs a larger y, which is pulled forward when it is itself a sum.
+    Anything else (e.g. differences of differences) is placed by repeated
+    sweeps over the few elements left over.
+
+    Args:
+        values (list): Sorted, deduplicated chain starting with 1
+
+    Returns:
+        list: (value, left, right, op) tuples in execution order, with op
+              'double', 'add' or 'sub', as evaluator.schedule returns
+
+    Raises:
+        ValueError: If some element is not a sum or difference of others
+    """
+    ordered = [1]
+    members = {1}
+    steps = []
+    pending = []
+    for i in range(1, len(values)):
+        x = values[i]
+        if x not in members:
+            step = (_sum_step(x, ordered, members)
+                    or _pull_difference(x, values, i, ordered, members, steps))
+            if step is None:
+                pending.append(x)
+                continue
+            steps.append((x,) + step)
+            members.add(x)
+        ordered.append(x)
+
+    while pending:
+        remaining = []
+        for x in pending:
+            step = (_sum_step(x, ordered, members)
+                    or _difference_step(x, ordered, members))
+            if step is None:
+                remaining.append(x)
+            else:
+                steps.append((x,) + step)
+                insort(ordered, x)
+                members.add(x)
+        if len(remaining) == len(pending):
+            raise ValueError(
+                f"{remaining[0]} is not a sum or difference of other elements")
+        pending = remaining
+    return steps
+
+
+def _sum_step(x, ordered, members):
+    """Return (y, z, op) with x = y + z for y, z in members, or None."""
+    if not x & 1 and x >> 1 in members:
+        return x >> 1, x >> 1, 'double'
+    for i in range(len(ordered) - 1, -1, -1):
+        y = ordered[i]
+        # Past x/2 every pair has already been tried with its larger half
+        if y << 1 < x:
+            return None
+        if x - y in members:
+            return y, x - y, 'add'
+    return None
+
+
+def _pull_difference(x, values, i, ordered, members, steps):
+    """
+    Return (y, z, 'sub') with x = y - z for z in members and a larger
+    y = values[j] that is a member or a sum of members, or None. A y that
+    was not yet a member is added to members and its step to steps.
+    """
+    # z <= ordered[-1], so only y up to x + ordered[-1] can work
+    limit = x + ordered[-1]
+    for j in range(i + 1, len(values)):
+        y = values[j]
+        if y > limit:
+            return None
+        if y - x not in members:
+            continue
+        if y not in members:
+            step = _sum_step(y, ordered, members)
+            if step is None:
+                continue
+            steps.append((y,) + step)
+            members.add(y)
+        return y, y - x, 'sub'
+    return None
+
+
+def _difference_step(x, ordered, members):
+    """Return (y, z, 'sub') with x = y - z for y, z in members, or None."""
+    for i in range(len(ordered) - 1, -1, -1):
+        y = ordered[i]
+        if y <= x:
+            return None
+        if y - x in members:
+            return y, y - x, 'sub'
+    return None
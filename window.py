@@ -0,0 +1,281 @@
+"""
+Window-based chain generators.
+
+These engines build chains the way windowed exponentiation does: a small
+table of precomputed multiples, then one pass over the digits of n with a
+doubling per bit and one addition (or subtraction) per non-zero digit.
+They run in time linear in the bit length of n and, for 256-521 bit
+scalars, often give shorter chains than the GCF engines.
+
+Four recodings are provided:
+    - k-ary: base-2^k digits 0 .. 2^k - 1
+    - sliding window: odd windows of at most w bits separated by zeros
+    - wNAF: signed odd digits below 2^(w-1) (bos_coster.wNAF)
+    - fractional window: signed odd digits up to any odd bound m, so the
+      precomputation can grow in steps of one element (Möller, 2002)
+
+Every function returns a sorted, deduplicated list like contfrac.chain,
+ending at n. Precomputed multiples are only built up to the largest digit
+actually used. When a signed recoding ends with a negative digit d, the
+last step forms acc + (acc + d) instead of 2*acc + d, so no element of
+the chain exceeds n.
+"""
+
+import bos_coster as bc
+
+
+def _check(n):
+    if n < 1:
+        raise ValueError("n must be a positive integer")
+
+
+def _horner(digits):
+    """
+    Build the chain for a signed-digit expansion.
+
+    Args:
+        digits (list): Digits at consecutive bit positions, most
+            significant first; leading zeros are ignored
+
+    Returns:
+        list: Sorted chain covering the precomputed digit values and every
+              intermediate of the left-to-right evaluation, ending at the
+              value of the expansion
+    """
+    start = 0
+    while not digits[start]:
+        start += 1
+    digits = digits[start:]
+    largest = max(abs(d) for d in digits)
+    odd_only = all(d % 2 for d in digits if d)
+    if odd_only:
+        # 1, 2, 3, 5, ..., largest: one doubling, then steps of +2
+        chain = {1}
+        if largest > 1:
+            chain.add(2)
+            chain.update(range(3, largest + 1, 2))
+    else:
+        # 1, 2, 3, ..., largest: steps of +1
+        chain = set(range(1, largest + 1))
+
+    last = max(i for i, d in enumerate(digits) if d)
+    acc = digits[0]
+    for i in range(1, len(digits)):
+        d = digits[i]
+        if i == last and d < 0 and acc + d > 0:
+            # 2*acc + d as acc + (acc + d): as many steps, but 2*acc
+            # would be the only element above the result
+            chain.add(acc + d)
+            acc += acc + d
+            chain.add(acc)
+            continue
+        acc <<= 1
+        chain.add(acc)
+        if d:
+            acc += d
+            chain.add(acc)
+    return sorted(chain)
+
+
+def _shortest(n, recode, widths):
+    """Return (chain, width) for the shortest chain over the widths."""
+    best = None
+    for w in widths:
+        result = _horner(recode(n, w))
+        if best is None or len(result) < len(best[0]):
+            best = result, w
+    return best
+
+
+def _widths(n, low):
+    """Candidate window widths for n, from low up to log2(log2 n) + 2."""
+    return range(low, max(low, n.bit_length().bit_length() + 2) + 1)
+
+
+def _kary_digits(n, k):
+    """Base-2^k digits of n, spread over bit positions."""
+    digits = []
+    mask = (1 << k) - 1
+    while n:
+        digits.append(n & mask)
+        digits.extend([0] * (k - 1))
+        n >>= k
+    # Each base-2^k digit sits at the low end of its k positions
+    digits.reverse()
+    return digits
+
+
+def kary_chain(n, k=None):
+    """
+    Generate a chain with the 2^k-ary method.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        k (int): Digit width in bits; None picks the width giving the
+            shortest chain
+
+    Returns:
+        list: Sorted addition chain from 1 to n
+
+    Raises:
+        ValueError: If n < 1 or k < 1
+
+    Examples:
+        >>> kary_chain(87, 2)
+        [1, 2, 3, 4, 5, 10, 20, 21, 42, 84, 87]
+    """
+    _check(n)
+    if k is not None and k < 1:
+        raise ValueError("Digit width k must be at least 1")
+    if k is None:
+        return _shortest(n, _kary_digits, _widths(n, 1))[0]
+    return _horner(_kary_digits(n, k))
+
+
+def _sliding_digits(n, w):
+    """Odd windows of at most w bits, most significant first."""
+    bits = bin(n)[2:]
+    digits = []
+    i = 0
+    while i < len(bits):
+        if bits[i] == '0':
+            digits.append(0)
+            i += 1
+            continue
+        # Longest window starting here that ends with a one bit
+        j = min(i + w, len(bits)) - 1
+        while bits[j] == '0':
+            j -= 1
+        digits.extend([0] * (j - i))
+        digits.append(int(bits[i:j + 1], 2))
+        i = j + 1
+    return digits
+
+
+def sliding_window_chain(n, w=None):
+    """
+    Generate a chain with the sliding-window method.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        w (int): Maximum window width in bits; None picks the width giving
+            the shortest chain
+
+    Returns:
+        list: Sorted addition chain from 1 to n
+
+    Raises:
+        ValueError: If n < 1 or w < 1
+
+    Examples:
+        >>> sliding_window_chain(87, 3)
+        [1, 2, 3, 5, 7, 10, 20, 40, 80, 87]
+    """
+    _check(n)
+    if w is not None and w < 1:
+        raise ValueError("Window width w must be at least 1")
+    if w is None:
+        return _shortest(n, _sliding_digits, _widths(n, 1))[0]
+    return _horner(_sliding_digits(n, w))
+
+
+def wnaf_chain(n, w=None):
+    """
+    Generate an addition-subtraction chain from the width-w NAF of n.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        w (int): wNAF width (at least 2); None picks the width giving the
+            shortest chain
+
+    Returns:
+        list: Sorted addition-subtraction chain from 1 to n
+
+    Raises:
+        ValueError: If n < 1 or w < 2
+
+    Examples:
+        >>> wnaf_chain(31, 2)
+        [1, 2, 4, 8, 15, 16, 31]
+    """
+    _check(n)
+    if w is None:
+        return _shortest(n, bc.wNAF, _widths(n, 2))[0]
+    return _horner(bc.wNAF(n, w))
+
+
+def _fractional_digits(n, m):
+    """
+    Signed fractional window recoding with odd digits |d| <= m.
+
+    With W = bit_length(m + 1) + 1, each odd residue is first reduced
+    modulo 2^W into (-2^(W-1), 2^(W-1)); if that digit exceeds m the
+    narrower residue modulo 2^(W-1) is used, which is always within m.
+    Like bos_coster.wNAF this is a single pass over the bits with a carry.
+    """
+    W = (m + 1).bit_length() + 1
+    bits = bin(n)[:1:-1]  # Least significant bit first
+    length = len(bits)
+
+    digits = []
+    carry = 0
+    i = 0
+    while i < length or carry:
+        bit = 1 if i < length and bits[i] == '1' else 0
+        if bit == carry:
+            digits.append(0)
+            i += 1
+            continue
+        value = int(bits[i:i + W][::-1] or '0', 2) + carry
+        for width in (W, W - 1):
+            d = value & ((1 << width) - 1)
+            carry = 0
+            if d >= 1 << (width - 1):
+                d -= 1 << width
+                carry = 1
+            if abs(d) <= m:
+                break
+        digits.append(d)
+        digits.extend([0] * (width - 1))
+        i += width
+
+    while digits and digits[-1] == 0:
+        digits.pop()
+    digits.reverse()
+    return digits
+
+
+def fractional_window_chain(n, m=None):
+    """
+    Generate an addition-subtraction chain with a fractional window.
+
+    Digits are odd with absolute value at most m, so the precomputed table
+    is {1, 2, 3, 5, ..., m}. m = 2^(w-1) - 1 reproduces wNAF_w, and odd
+    values in between trade table size against digit density one element
+    at a time.
+
+    Args:
+        n (int): Target integer (n >= 1)
+        m (int): Largest digit, odd and at least 1; None picks the bound
+            giving the shortest chain
+
+    Returns:
+        list: Sorted addition-subtraction chain from 1 to n
+
+    Raises:
+        ValueError: If n < 1 or m is not a positive odd integer
+
+    Examples:
+        >>> fractional_window_chain(87, 5)
+        [1, 2, 3, 4, 5, 8, 11, 16, 22, 43, 44, 87]
+    """
+    _check(n)
+    if m is not None and (m < 1 or m % 2 == 0):
+        raise ValueError("Digit bound m must be a positive odd integer")
+    if m is None:
+        # Scan the bounds between wNAF_(w-1) and wNAF_(w+1) around the
+        # best integral width w
+        w = _shortest(n, bc.wNAF, _widths(n, 2))[1]
+        bounds = range(max(1, (1 << (w - 2)) - 1), 1 << w, 2)
+        return _shortest(n, _fractional_digits, bounds)[0]
+    return _horner(_fractional_digits(n, m))